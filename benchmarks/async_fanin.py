@@ -0,0 +1,131 @@
+"""
+Бенчмарк конкурентного чтения объявлений одним ASGI-процессом.
+
+Поднимает тестовую БД, наполняет её объявлениями и одновременно отправляет --concurrency
+запросов прямо в ASGI-приложение (без сети) — сначала в синхронный AdsViewSet (/board/ads/),
+затем в асинхронный путь (/board/async/ads/). Итог печатается в JSON.
+
+Запуск (нужны переменные окружения БД, как для manage.py):
+
+    python -m benchmarks.async_fanin --ads 2000 --concurrency 50 --rounds 5
+
+Под ASGI каждый одновременный запрос держит своё соединение с БД, поэтому --concurrency
+должен быть меньше max_connections сервера PostgreSQL.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.common import benchmark_database, latency_summary, setup_django
+
+
+def seed(ads_count):
+    from board.models import Ads
+    from users.models import User
+
+    author = User.objects.create(email="bench@example.com", first_name="Bench", last_name="Mark", is_active=True)
+    Ads.objects.bulk_create(
+        (
+            Ads(title=f"Объявление {i}", price=i, description=f"Описание объявления {i}", author=author)
+            for i in range(ads_count)
+        ),
+        batch_size=1000,
+    )
+
+
+async def asgi_get(application, path, query_string=""):
+    """Один GET-запрос в ASGI-приложение; возвращает статус и время ответа в секундах."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    disconnected = asyncio.Event()
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Django слушает отключение клиента до конца ответа — держим соединение открытым
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    result = {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    disconnected.set()
+    return result.get("status"), time.perf_counter() - started
+
+
+async def run_round(application, path, concurrency, query_string):
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(asgi_get(application, path, query_string) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for status, _ in responses if status != 200)
+    return elapsed, [latency for _, latency in responses], errors
+
+
+async def measure(application, path, concurrency, rounds, query_string):
+    await asgi_get(application, path, query_string)  # Прогрев: соединение с БД, импорты, кэш шаблонов
+    wall, latencies, errors = 0.0, [], 0
+    for _ in range(rounds):
+        elapsed, round_latencies, round_errors = await run_round(application, path, concurrency, query_string)
+        wall += elapsed
+        latencies.extend(round_latencies)
+        errors += round_errors
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / wall, 1),
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ads", type=int, default=2000, help="Сколько объявлений создать")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных запросов в раунде")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--query", default="page_size=20", help="Строка запроса к списку")
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.core.asgi import get_asgi_application
+
+    with benchmark_database():
+        seed(args.ads)
+        application = get_asgi_application()
+        report = {
+            "ads": args.ads,
+            "concurrency": args.concurrency,
+            "rounds": args.rounds,
+            "sync": asyncio.run(measure(application, "/board/ads/", args.concurrency, args.rounds, args.query)),
+            "async": asyncio.run(measure(application, "/board/async/ads/", args.concurrency, args.rounds, args.query)),
+        }
+        report["speedup"] = round(report["async"]["requests_per_second"] / report["sync"]["requests_per_second"], 2)
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Общие части бенчмарков: настройка Django, временная база, статистика задержек."""
+
+import os
+import statistics
+import subprocess
+from contextlib import contextmanager
+
+
+def setup_django(use_cache=False):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    if not use_cache:
+        # Ответы не должны браться из кэша списков, иначе меряется кэш, а не представления
+        os.environ["CACHE_BACKEND"] = "django.core.cache.backends.dummy.DummyCache"
+    import django
+    from django.conf import settings
+
+    django.setup()
+    # Без DEBUG: отладочные middleware и журнал SQL искажают результат
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ["localhost", "testserver"]
+    # Нагрузка идёт с одного адреса — ограничения частоты входа и регистрации её бы отсекли
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Временная тестовая база (test_<NAME>); с keepdb она сохраняется между запусками вместе с данными."""
+    from django.db import connection, connections
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    for alias in connections:
+        if connections[alias].settings_dict.get("TEST", {}).get("MIRROR"):
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        if not keepdb:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def latency_summary(latencies):
+    """Перцентили задержки в миллисекундах."""
+    if not latencies:
+        return {}
+    return {
+        "p50": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean": round(statistics.fmean(latencies) * 1000, 2),
+        "max": round(max(latencies) * 1000, 2),
+    }
+
+
+def git_revision():
+    """Коммит, на котором запущен бенчмарк, — чтобы результаты можно было сравнивать между коммитами."""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip()
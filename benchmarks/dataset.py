@@ -0,0 +1,104 @@
+"""Синтетический набор данных для бенчмарков: пользователи, объявления и отзывы массовыми вставками."""
+
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+
+from board.cache import bump_generation
+from board.models import Ads, Review
+from board.stats import refresh_daily_stats
+from users.models import User
+
+PASSWORD = "benchmark-password"
+
+ITEMS = ("телефон", "велосипед", "диван", "ноутбук", "куртка", "холодильник", "коляска", "гитара", "часы", "палатка")
+QUALITIES = ("новый", "почти новый", "б/у", "в отличном состоянии", "требует ремонта", "с гарантией")
+REVIEWS = ("Отличный продавец", "Всё как в описании", "Быстро ответил", "Цена завышена", "Рекомендую")
+
+# Даты создания разносятся на год назад, чтобы сортировка и курсорная пагинация шли по реальным данным
+SPREAD_DATES_SQL = """
+UPDATE {table}
+SET created_at = now() - random() * interval '365 days'
+WHERE id >= %s
+"""
+SYNC_UPDATED_AT_SQL = "UPDATE {table} SET updated_at = created_at WHERE id >= %s"
+
+RECOUNT_REVIEWS_SQL = """
+UPDATE {ads} AS ads
+SET review_count = counters.review_count, last_review_at = counters.last_review_at
+FROM (
+    SELECT ad_id, COUNT(*) AS review_count, MAX(created_at) AS last_review_at FROM {reviews} GROUP BY ad_id
+) AS counters
+WHERE counters.ad_id = ads.id
+"""
+
+
+def user_email(index):
+    return f"bench{index}@example.com"
+
+
+def generate(users=100, ads=10000, reviews=50000, seed=0, batch_size=2000):
+    """
+    Создаёт набор данных заданного размера и возвращает его описание.
+
+    Вставки идут через bulk_create, поэтому сигналы не срабатывают: счётчики отзывов
+    пересчитываются одним UPDATE, сводка по дням — целиком, а кэш списков сбрасывается явно.
+    """
+    rng = random.Random(seed)
+    # Хэш пароля один на всех: PBKDF2 на каждого пользователя занял бы минуты
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        start = (User.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        User.objects.bulk_create(
+            (
+                User(email=user_email(start + i), username=f"bench{start + i}", password=password, is_active=True)
+                for i in range(users)
+            ),
+            batch_size=batch_size,
+        )
+        user_ids = list(User.objects.filter(id__gte=start).values_list("id", flat=True))
+
+        first_ad = (Ads.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        Ads.objects.bulk_create(
+            (
+                Ads(
+                    title=f"{rng.choice(ITEMS).capitalize()} {rng.choice(QUALITIES)}",
+                    price=rng.randrange(100, 200000),
+                    description=f"Продаю {rng.choice(ITEMS)}, {rng.choice(QUALITIES)}. Торг уместен.",
+                    author_id=rng.choice(user_ids),
+                )
+                for _ in range(ads)
+            ),
+            batch_size=batch_size,
+        )
+        ad_ids = list(Ads.objects.filter(id__gte=first_ad).values_list("id", flat=True))
+
+        first_review = (Review.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        if ad_ids:
+            Review.objects.bulk_create(
+                (
+                    Review(text=rng.choice(REVIEWS), author_id=rng.choice(user_ids), ad_id=rng.choice(ad_ids))
+                    for _ in range(reviews)
+                ),
+                batch_size=batch_size,
+            )
+
+        with connection.cursor() as cursor:
+            for model, first_id in ((Ads, first_ad), (Review, first_review)):
+                cursor.execute("SELECT setseed(%s)", [rng.random()])
+                cursor.execute(SPREAD_DATES_SQL.format(table=model._meta.db_table), [first_id])
+                cursor.execute(SYNC_UPDATED_AT_SQL.format(table=model._meta.db_table), [first_id])
+            cursor.execute(RECOUNT_REVIEWS_SQL.format(ads=Ads._meta.db_table, reviews=Review._meta.db_table))
+        # Сводка по дням считается после разнесения дат
+        refresh_daily_stats()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Ads._meta.db_table}, {Review._meta.db_table}, {User._meta.db_table}")
+
+    bump_generation("ads", "review")
+    return describe()
+
+
+def describe():
+    return {"users": User.objects.count(), "ads": Ads.objects.count(), "reviews": Review.objects.count()}
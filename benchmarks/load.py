@@ -0,0 +1,311 @@
+"""
+Нагрузочный бенчмарк API по реальным маршрутам.
+
+Создаёт синтетический набор данных (benchmarks.dataset) и по очереди нагружает сценарии —
+список, фильтры, поиск, пагинацию и детали объявлений, отзывы и вход. Для каждого сценария
+считаются пропускная способность, перцентили задержки и число SQL-запросов на запрос.
+Результат — JSON с коммитом, размером данных и параметрами запуска, чтобы сравнивать прогоны.
+
+Модели нагрузки:
+  * замкнутая (по умолчанию): --concurrency потоков шлют запросы друг за другом;
+  * открытая: --rate запросов в секунду по расписанию, не больше --concurrency одновременно;
+    задержка считается от запланированного момента, поэтому очередь не прячется в паузах клиента.
+
+По умолчанию запросы идут в WSGI-приложение в том же процессе (django.test.Client) на временной
+базе. С --base-url нагружается запущенный сервер, а число SQL-запросов берётся из заголовка
+X-DB-Query-Count (есть только при DEBUG). Данные тогда создаются в настроенной базе сервера: это
+разрешено только для базы test_* или с явным --use-configured-db.
+
+    python -m benchmarks.load --ads 10000 --reviews 20000 --concurrency 8 --requests 300 --output before.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import ExitStack, nullcontext
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.common import benchmark_database, git_revision, latency_summary, setup_django
+
+# Сценарий получает контекст (данные набора, генератор случайных чисел, состояние потока)
+# и возвращает (метод, путь, параметры).
+
+
+def ads_list(ctx):
+    return "GET", "/board/ads/", None
+
+
+def ads_paginate(ctx):
+    # Каждый поток листает ленту по ссылкам next и начинает сначала на последней странице
+    next_url = (ctx.last_json or {}).get("next")
+    if next_url:
+        parts = urlsplit(next_url)
+        return "GET", f"{parts.path}?{parts.query}", None
+    return "GET", "/board/ads/", {"page_size": 20}
+
+
+def ads_filter(ctx):
+    return "GET", "/board/ads/", {"title": ctx.rng.choice(ctx.items)}
+
+
+def ads_search(ctx):
+    return "GET", "/board/ads/", {"search": ctx.rng.choice(ctx.items)}
+
+
+def ads_detail(ctx):
+    return "GET", f"/board/ads/{ctx.rng.choice(ctx.ad_ids)}/", None
+
+
+def ad_reviews(ctx):
+    return "GET", f"/board/ads/{ctx.rng.choice(ctx.ad_ids)}/reviews/", None
+
+
+def reviews_list(ctx):
+    return "GET", "/board/reviews/", None
+
+
+def login(ctx):
+    return "POST", "/users/login/", {"email": ctx.rng.choice(ctx.emails), "password": ctx.password}
+
+
+SCENARIOS = {
+    "ads_list": ads_list,
+    "ads_paginate": ads_paginate,
+    "ads_filter": ads_filter,
+    "ads_search": ads_search,
+    "ads_detail": ads_detail,
+    "ad_reviews": ad_reviews,
+    "reviews_list": reviews_list,
+    "login": login,
+}
+
+
+class Context:
+    def __init__(self, data, seed):
+        self.rng = random.Random(seed)
+        self.ad_ids = data["ad_ids"]
+        self.emails = data["emails"]
+        self.items = data["items"]
+        self.password = data["password"]
+        self.last_json = None
+
+
+class InProcessTransport:
+    """Запросы в WSGI-приложение текущего процесса; SQL-запросы считаются execute_wrapper."""
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, params):
+        from django.db import connections
+
+        from config.middleware import QueryRecorder
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            if method == "GET":
+                response = self.client.get(path, params)
+            else:
+                response = self.client.post(path, params, content_type="application/json")
+        return response.status_code, response.content, recorder.count
+
+    def close(self):
+        from django.db import connections
+
+        connections.close_all()
+
+
+class HTTPTransport:
+    """Запросы к запущенному серверу через keep-alive соединение потока."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=60)
+        self.prefix = parts.path.rstrip("/")
+
+    def request(self, method, path, params):
+        body = None
+        headers = {"Accept": "application/json"}
+        if method == "GET" and params:
+            path = f"{path}?{urlencode(params)}"
+        elif params:
+            body = json.dumps(params)
+            headers["Content-Type"] = "application/json"
+        self.connection.request(method, self.prefix + path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        queries = response.getheader("X-DB-Query-Count")
+        return response.status, content, int(queries) if queries is not None else None
+
+    def close(self):
+        self.connection.close()
+
+
+def run_scenario(name, data, make_transport, requests, concurrency, rate, seed):
+    scenario = SCENARIOS[name]
+    results = []
+    counter = itertools.count()
+    started = time.perf_counter()
+
+    def worker(worker_id):
+        ctx = Context(data, seed * 1000 + worker_id)
+        transport = make_transport()
+        try:
+            while (index := next(counter)) < requests:
+                if rate:
+                    scheduled = started + index / rate
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                else:
+                    scheduled = time.perf_counter()
+                method, path, params = scenario(ctx)
+                try:
+                    status, content, queries = transport.request(method, path, params)
+                except Exception as exc:
+                    status, content, queries = repr(exc), b"", None
+                latency = time.perf_counter() - scheduled
+                try:
+                    ctx.last_json = json.loads(content) if content else None
+                except ValueError:
+                    ctx.last_json = None
+                results.append((latency, status, queries))
+        finally:
+            transport.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, _, _ in results]
+    queries = [count for _, _, count in results if count is not None]
+    statuses = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": len(results),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        "latency_ms": latency_summary(latencies),
+        "queries_per_request": (
+            {"mean": round(sum(queries) / len(queries), 2), "max": max(queries)} if queries else None
+        ),
+    }
+
+
+def load_data():
+    from benchmarks.dataset import ITEMS, PASSWORD
+    from board.models import Ads
+    from users.models import User
+
+    return {
+        "ad_ids": list(Ads.objects.values_list("id", flat=True)),
+        "emails": list(User.objects.filter(email__startswith="bench").values_list("email", flat=True)),
+        "items": ITEMS,
+        "password": PASSWORD,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--ads", type=int, default=10000)
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0, help="Зерно генерации данных и выбора запросов")
+    parser.add_argument("--skip-generate", action="store_true", help="Не создавать данные, использовать имеющиеся")
+    parser.add_argument("--keepdb", action="store_true", help="Сохранить временную базу с данными между запусками")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Сценарии через запятую")
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=8, help="Потоков (одновременных запросов)")
+    parser.add_argument("--rate", type=float, help="Открытая модель: запросов в секунду")
+    parser.add_argument("--base-url", help="Нагружать запущенный сервер, например http://localhost:8000")
+    parser.add_argument(
+        "--use-configured-db",
+        action="store_true",
+        help="С --base-url: разрешить создание данных в настроенной базе, даже если она не test_*",
+    )
+    parser.add_argument("--cache", action="store_true", help="Не отключать кэш (меряется путь с кэшем ответов)")
+    parser.add_argument("--output", help="Файл для JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    setup_django(use_cache=args.cache)
+    from django.db import connection
+
+    from benchmarks import dataset
+
+    # С --base-url сервер работает с настроенной базой — данные создаются в ней же, поэтому рабочую базу
+    # бенчмарк не трогает без явного разрешения
+    db_name = connection.settings_dict["NAME"]
+    if args.base_url and not args.skip_generate and not args.use_configured_db and not db_name.startswith("test_"):
+        parser.error(
+            f"--base-url создаёт данные в настроенной базе {db_name}; укажите базу test_*, "
+            "добавьте --use-configured-db или запустите с --skip-generate"
+        )
+    database = nullcontext() if args.base_url else benchmark_database(keepdb=args.keepdb)
+    with database:
+        if args.skip_generate:
+            sizes = dataset.describe()
+        else:
+            sizes = dataset.generate(args.users, args.ads, args.reviews, seed=args.seed)
+        data = load_data()
+        if not data["ad_ids"] or not data["emails"]:
+            parser.error("В базе нет данных бенчмарка: запустите без --skip-generate")
+
+        if args.base_url:
+            make_transport = lambda: HTTPTransport(args.base_url)  # noqa: E731
+        else:
+            make_transport = InProcessTransport
+        report = {
+            "revision": git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "dataset": sizes,
+            "config": {
+                "target": args.base_url or "in-process",
+                "model": "open" if args.rate else "closed",
+                "concurrency": args.concurrency,
+                "rate": args.rate,
+                "requests": args.requests,
+                "cache": args.cache,
+                "seed": args.seed,
+            },
+            "scenarios": {},
+        }
+        for name in scenarios:
+            # Прогрев: соединения, импорты, планы запросов
+            run_scenario(name, data, make_transport, min(args.concurrency, 10), 1, None, args.seed)
+            report["scenarios"][name] = run_scenario(
+                name, data, make_transport, args.requests, args.concurrency, args.rate, args.seed
+            )
+            print(f"{name}: {report['scenarios'][name]['throughput_rps']} rps", file=sys.stderr)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Микробенчмарк страницы списка: сериализатор DRF с JSONRenderer против быстрого пути board.fastread.
+
+Для каждого пути отдельно меряются чтение строк из БД, преобразование и рендеринг JSON;
+перед замером проверяется, что оба пути дают одинаковые байты.
+
+    python -m benchmarks.serialization --ads 5000 --rows 100 --iterations 200
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import benchmark_database, git_revision, latency_summary, setup_django
+
+
+def serializer_path(queryset, rows):
+    from rest_framework.renderers import JSONRenderer
+
+    from board.serializer import AdsSerializer
+
+    started = time.perf_counter()
+    page = list(queryset[:rows])
+    fetched = time.perf_counter()
+    data = AdsSerializer(page, many=True).data
+    converted = time.perf_counter()
+    content = JSONRenderer().render(data)
+    return content, (fetched - started, converted - fetched, time.perf_counter() - converted)
+
+
+def fast_path(queryset, rows):
+    from board.fastread import get_converter
+    from board.serializer import AdsSerializer
+    from config.renderers import ORJSONRenderer
+
+    converter = get_converter(AdsSerializer)
+    started = time.perf_counter()
+    page = list(queryset.values(*converter.columns)[:rows])
+    fetched = time.perf_counter()
+    data = converter.convert_many(page)
+    converted = time.perf_counter()
+    content = ORJSONRenderer().render(data)
+    return content, (fetched - started, converted - fetched, time.perf_counter() - converted)
+
+
+def measure(path, queryset, rows, iterations):
+    stages = ([], [], [], [])
+    for _ in range(iterations):
+        _, timings = path(queryset, rows)
+        for stage, value in zip(stages, (*timings, sum(timings))):
+            stage.append(value)
+    return {name: latency_summary(values) for name, values in zip(("fetch", "convert", "render", "total"), stages)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ads", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=100, help="Строк на странице")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keepdb", action="store_true", help="Сохранить временную базу с данными между запусками")
+    parser.add_argument("--skip-generate", action="store_true", help="Не создавать данные, использовать имеющиеся")
+    parser.add_argument("--output", help="Файл для JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from benchmarks import dataset
+    from board.models import Ads
+
+    with benchmark_database(keepdb=args.keepdb):
+        if args.skip_generate:
+            sizes = dataset.describe()
+        else:
+            sizes = dataset.generate(users=50, ads=args.ads, reviews=0, seed=args.seed)
+        queryset = Ads.objects.order_by("-created_at", "-id")
+
+        expected, _ = serializer_path(queryset, args.rows)
+        content, _ = fast_path(queryset, args.rows)
+        if content != expected:
+            sys.exit("Быстрый путь дал другой JSON, чем сериализатор")
+
+        # Прогрев: планы запросов, сборка конвертера
+        measure(serializer_path, queryset, args.rows, 10)
+        measure(fast_path, queryset, args.rows, 10)
+        results = {
+            "serializer": measure(serializer_path, queryset, args.rows, args.iterations),
+            "fast": measure(fast_path, queryset, args.rows, args.iterations),
+        }
+
+    report = {
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "dataset": sizes,
+        "config": {"rows": args.rows, "iterations": args.iterations, "response_bytes": len(expected)},
+        "latency_ms": results,
+        "speedup": {
+            stage: round(results["serializer"][stage]["p50"] / results["fast"][stage]["p50"], 2)
+            for stage in ("convert", "render", "total")
+            if results["fast"][stage]["p50"]
+        },
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
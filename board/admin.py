@@ -3,4 +3,8 @@ from django.contrib import admin
 from .models import Ads, Review
 
 admin.site.register(Ads)
-admin.site.register(Review)
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_select_related = ("author", "ad")  # Review.__str__ обращается к автору и объявлению
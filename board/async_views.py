@@ -0,0 +1,100 @@
+"""
+Асинхронный путь чтения объявлений и отзывов для ASGI (uvicorn, daphne).
+
+Представления повторяют list/retrieve из AdsViewSet и ReviewViewSet: те же фильтры,
+пагинация, сериализаторы и формат JSON, но запросы к БД идут через асинхронный ORM
+и не занимают поток воркера на время ожидания ответа базы.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .filters import AdFilter
+from .models import Ads, Review
+from .paginators import AdsPaginator
+from .permissions import IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly
+from .serializer import AdsSerializer, ReviewSerializer
+from .views import AdsViewSet
+
+# Те же классы прав, что у ViewSet для безопасных методов: для GET/HEAD они не обращаются к БД
+READ_PERMISSIONS = (IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly)
+
+
+def _render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type="application/json")
+
+
+def _check_permissions(request, obj=None):
+    for permission_class in READ_PERMISSIONS:
+        permission = permission_class()
+        if not permission.has_permission(request, None):
+            return False
+        if obj is not None and not permission.has_object_permission(request, None, obj):
+            return False
+    return True
+
+
+def _forbidden():
+    return _render({"detail": "You do not have permission to perform this action."}, status.HTTP_403_FORBIDDEN)
+
+
+async def _filter_ads(request):
+    filterset = AdFilter(request.GET, queryset=Ads.objects.all(), request=request)
+    if not filterset.is_valid():
+        return None, filterset.errors
+    if "search" in request.GET:
+        # Полнотекстовый поиск может проверить результат в БД (fallback на триграммы) — уводим в поток
+        return await sync_to_async(lambda: filterset.qs)(), None
+    return filterset.qs, None
+
+
+@require_safe
+async def ads_list(request):
+    if not _check_permissions(request):
+        return _forbidden()
+    queryset, errors = await _filter_ads(request)
+    if errors:
+        return _render(errors, status.HTTP_400_BAD_REQUEST)
+
+    paginator = AdsPaginator()
+    try:
+        # Экземпляр AdsViewSet нужен пагинатору для ?ordering= (OrderingFilter и ordering_fields)
+        page = await paginator.apaginate_queryset(queryset, Request(request), view=AdsViewSet())
+    except APIException as exc:
+        return _render({"detail": exc.detail}, exc.status_code)
+    return _render(paginator.get_paginated_response(AdsSerializer(page, many=True).data).data)
+
+
+@require_safe
+async def ads_detail(request, pk):
+    try:
+        ad = await Ads.objects.aget(pk=pk)
+    except Ads.DoesNotExist:
+        return _render({"detail": NotFound.default_detail}, status.HTTP_404_NOT_FOUND)
+    if not _check_permissions(request, ad):
+        return _forbidden()
+    return _render(AdsSerializer(ad).data)
+
+
+@require_safe
+async def reviews_list(request):
+    if not _check_permissions(request):
+        return _forbidden()
+    reviews = [review async for review in Review.objects.all().aiterator(chunk_size=500)]
+    return _render(ReviewSerializer(reviews, many=True).data)
+
+
+@require_safe
+async def review_detail(request, pk):
+    try:
+        review = await Review.objects.aget(pk=pk)
+    except Review.DoesNotExist:
+        return _render({"detail": NotFound.default_detail}, status.HTTP_404_NOT_FOUND)
+    if not _check_permissions(request, review):
+        return _forbidden()
+    return _render(ReviewSerializer(review).data)
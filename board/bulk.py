@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import Ads
+from .serializer import AdsSerializer
+from .stats import batched_refresh
+
+
+def _item(index, operation, status, **extra):
+    result = {"index": index, "op": operation["op"], "status": status}
+    if "id" in operation:
+        result["id"] = operation["id"]
+    result.update(extra)
+    return result
+
+
+def validate_ads_bulk(operations, user):
+    """
+    Проверяет пакет операций целиком: данные, существование объявлений и права на них.
+
+    Возвращает (errors, creates, updates, deletes, days): errors — {индекс: ошибки}, creates/updates/deletes —
+    списки (индекс, операция, проверенные данные), готовые к записи, days — дни создания затронутых объявлений.
+    """
+    errors = {}
+    indexed = defaultdict(list)
+    for index, operation in enumerate(operations):
+        indexed[operation["op"]].append((index, operation))
+
+    # Данные всех операций одного типа проверяются одним списочным сериализатором
+    validated = {}
+    for op, partial in (("create", False), ("update", True)):
+        serializer = AdsSerializer(
+            data=[operation["data"] for _, operation in indexed[op]], many=True, partial=partial
+        )
+        if serializer.is_valid():
+            validated[op] = serializer.validated_data
+        else:
+            validated[op] = [{}] * len(indexed[op])
+            for (index, _), item_errors in zip(indexed[op], serializer.errors):
+                if item_errors:
+                    errors[index] = item_errors
+
+    # Права на все изменяемые объявления проверяются одним запросом
+    ids = [operation["id"] for op in ("update", "delete") for _, operation in indexed[op]]
+    existing = Ads.objects.filter(pk__in=ids).values_list("id", "author_id", "created_at") if ids else []
+    owners = {}
+    days = set()
+    for pk, author_id, created_at in existing:
+        owners[pk] = author_id
+        days.add(timezone.localdate(created_at))
+    seen = set()
+    for op in ("update", "delete"):
+        for index, operation in indexed[op]:
+            pk = operation["id"]
+            if pk in seen:
+                errors.setdefault(index, {})["id"] = ["Объявление уже встречается в этом пакете."]
+            elif pk not in owners:
+                errors.setdefault(index, {})["id"] = ["Объявление не найдено."]
+            elif not user.is_staff and owners[pk] != user.id:
+                errors.setdefault(index, {})["id"] = ["Нет прав на изменение этого объявления."]
+            seen.add(pk)
+
+    creates = [(index, operation, data) for (index, operation), data in zip(indexed["create"], validated["create"])]
+    updates = [(index, operation, data) for (index, operation), data in zip(indexed["update"], validated["update"])]
+    deletes = [(index, operation, None) for index, operation in indexed["delete"]]
+    return errors, creates, updates, deletes, days
+
+
+def apply_ads_bulk(operations, user):
+    """
+    Выполняет пакет операций над объявлениями в одной транзакции.
+
+    Если хотя бы одна операция не проходит проверку, ничего не записывается.
+    Возвращает (ok, results) с результатом по каждой операции в исходном порядке.
+    """
+    errors, creates, updates, deletes, days = validate_ads_bulk(operations, user)
+    if errors:
+        results = [
+            (
+                _item(index, operation, "error", errors=errors[index])
+                if index in errors
+                else _item(index, operation, "valid")
+            )
+            for index, operation in enumerate(operations)
+        ]
+        return False, results
+
+    results = [None] * len(operations)
+    # Дни изменённых и созданных объявлений добавляем в пересчёт сводки сами, удалённых — добавят сигналы;
+    # пересчёт один на весь пакет
+    with transaction.atomic(), batched_refresh() as refresh_days:
+        refresh_days.update(days)
+        created = Ads.objects.bulk_create(
+            [Ads(**{**data, "author": user}) for _, _, data in creates], batch_size=settings.BOARD_BULK_BATCH_SIZE
+        )
+        for (index, operation, _), ad in zip(creates, created):
+            results[index] = _item(index, operation, "created", id=ad.pk)
+            refresh_days.add(timezone.localdate(ad.created_at))
+
+        # bulk_update пишет одинаковый набор столбцов, поэтому группируем обновления по набору полей
+        now = timezone.now()
+        groups = defaultdict(list)
+        for index, operation, data in updates:
+            groups[tuple(sorted(data))].append(Ads(pk=operation["id"], updated_at=now, **data))
+            results[index] = _item(index, operation, "updated")
+        for fields, objs in groups.items():
+            Ads.objects.bulk_update(objs, [*fields, "updated_at"], batch_size=settings.BOARD_BULK_BATCH_SIZE)
+
+        if deletes:
+            Ads.objects.filter(pk__in=[operation["id"] for _, operation, _ in deletes]).delete()
+            for index, operation, _ in deletes:
+                results[index] = _item(index, operation, "deleted")
+
+    # bulk_create/bulk_update не отправляют сигналы, поэтому кэш списков сбрасываем сами
+    bump_generation("ads")
+    return True, results
@@ -0,0 +1,145 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from config.compression import negotiate_encoding
+from config.routers import read_from_primary
+
+GENERATION_KEY = "board:generation:{namespace}"
+MODIFIED_KEY = "board:modified:{namespace}"
+RESPONSE_KEY = "board:response:{namespace}:{generation}:{digest}"
+COMPRESSED_KEY = "{key}:{encoding}"
+STATS_KEY = "board:cache-stats:{namespace}:{event}"
+
+CACHE_NAMESPACES = ("ads", "review")
+
+
+def _incr(key, initial):
+    """Атомарный инкремент счётчика в кэше; отсутствующий ключ заводится со значением initial."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+def get_generation(namespace):
+    """Текущее поколение закэшированных ответов для пространства имён."""
+    generation = cache.get(GENERATION_KEY.format(namespace=namespace))
+    if generation is None:
+        # Начинаем от текущего времени, чтобы после вытеснения ключа не вернуться к старому поколению
+        generation = _incr(GENERATION_KEY.format(namespace=namespace), time.time_ns())
+    return generation
+
+
+def bump_generation(*namespaces):
+    """Делает недействительными все закэшированные ответы указанных пространств имён."""
+    now = time.time()
+    for namespace in namespaces:
+        _incr(GENERATION_KEY.format(namespace=namespace), time.time_ns())
+        cache.set(MODIFIED_KEY.format(namespace=namespace), now, timeout=None)
+
+
+def get_last_modified(namespace):
+    """Время последней записи в пространстве имён (Unix time) для заголовка Last-Modified."""
+    modified = cache.get(MODIFIED_KEY.format(namespace=namespace))
+    if modified is None:
+        # Момент записи неизвестен (ключ вытеснен) — считаем, что данные изменились сейчас
+        modified = time.time()
+        cache.add(MODIFIED_KEY.format(namespace=namespace), modified, timeout=None)
+    return modified
+
+
+def record_event(namespace, event):
+    _incr(STATS_KEY.format(namespace=namespace, event=event), 1)
+
+
+def get_stats():
+    """Счётчики попаданий и промахов по каждому пространству имён."""
+    keys = {
+        (namespace, event): STATS_KEY.format(namespace=namespace, event=event)
+        for namespace in CACHE_NAMESPACES
+        for event in ("hit", "miss")
+    }
+    values = cache.get_many(keys.values())
+    return {
+        namespace: {event: values.get(keys[(namespace, event)], 0) for event in ("hit", "miss")}
+        for namespace in CACHE_NAMESPACES
+    }
+
+
+def response_cache_key(request, namespace):
+    # Ссылки next/previous абсолютные, поэтому в ключ входят схема и хост
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    raw = "|".join((request.scheme, request.get_host(), request.path, query, request.accepted_renderer.format))
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return RESPONSE_KEY.format(namespace=namespace, generation=get_generation(namespace), digest=digest)
+
+
+class CachedListMixin:
+    """
+    Кэширует отрендеренные ответы list() для анонимных GET-запросов.
+
+    Ключ включает поколение пространства имён, которое увеличивается сигналами
+    после коммита любой записи в Ads/Review (board.signals), поэтому после записи старые
+    страницы больше не отдаются и просто вытесняются по таймауту.
+    Страница для кэша читается с основной базы: отстающая реплика (ReplicaReadMixin) могла бы
+    сохранить старые данные под новым поколением.
+    """
+
+    cache_namespace = None
+
+    def is_cacheable(self, request):
+        # HTML browsable API содержит CSRF-токен посетителя, поэтому кэшируем только JSON
+        return (
+            request.method in ("GET", "HEAD")
+            and request.accepted_renderer.format == "json"
+            and not request.user.is_authenticated
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+
+        key = response_cache_key(request, self.cache_namespace)
+        # Сжатый вариант страницы (config.compression) читается вместе с ней одним обращением к кэшу
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING"))
+        compressed_key = COMPRESSED_KEY.format(key=key, encoding=encoding)
+        found = cache.get_many([key, compressed_key] if encoding else [key])
+        cached = found.get(key)
+        if cached is not None:
+            record_event(self.cache_namespace, "hit")
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["X-Cache"] = "HIT"
+            if compressed_key in found:
+                response.precompressed = {encoding: found[compressed_key]}
+            response.store_compressed = self._compressed_store(key)
+            return response
+
+        record_event(self.cache_namespace, "miss")
+        with read_from_primary():
+            response = super().list(request, *args, **kwargs)
+        response["X-Cache"] = "MISS"
+        if response.status_code == 200:
+
+            def store(rendered):
+                cache.set(key, (rendered.content, rendered["Content-Type"]), settings.BOARD_CACHE_TIMEOUT)
+
+            response.add_post_render_callback(store)
+            response.store_compressed = self._compressed_store(key)
+        return response
+
+    @staticmethod
+    def _compressed_store(key):
+        """Сохраняет сжатое CompressionMiddleware тело рядом с закэшированной страницей: сжатие одно на поколение."""
+
+        def store(encoding, content):
+            cache.set(COMPRESSED_KEY.format(key=key, encoding=encoding), content, settings.BOARD_CACHE_TIMEOUT)
+
+        return store
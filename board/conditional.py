@@ -0,0 +1,98 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from config.routers import read_from_primary
+
+from .cache import response_cache_key
+
+
+def _quote(raw):
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _set_validators(response, etag, last_modified=None):
+    if etag is not None and response.status_code in (200, 304):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Строгие ETag для list/retrieve, Last-Modified для retrieve и If-Match для update.
+
+    Валидаторы считаются до сериализации: для объекта — по одному столбцу updated_at,
+    для списка — по поколению кэша (board.cache), которое меняется при любой записи,
+    в том числе при удалении. Совпавший If-None-Match/If-Modified-Since даёт 304
+    без загрузки строк, несовпавший If-Match на PUT/PATCH — 412. Проверка If-Match
+    и запись идут в одной транзакции под блокировкой строки.
+
+    Список читается с основной базы: поколение сдвигается после коммита на ней, и отстающая
+    реплика (ReplicaReadMixin) отдала бы под новым ETag старые строки, а дальше до следующей
+    записи — 304 на них. Last-Modified у списка нет: с точностью до секунды вторая запись
+    в ту же секунду дала бы 304 по If-Modified-Since.
+    """
+
+    def get_object_validators(self, request, lock=False):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            if lock:
+                queryset = queryset.select_for_update(of=("self",))
+            updated_at = queryset.values_list("updated_at", flat=True).first()
+        except (TypeError, ValueError, ValidationError):
+            updated_at = None
+        if updated_at is None:
+            return None, None  # Объекта нет — 404 вернёт обычный обработчик
+        etag = _quote(
+            f"{self.cache_namespace}:{self.kwargs[lookup_url_kwarg]}:"
+            f"{updated_at.isoformat()}:{request.accepted_renderer.format}"
+        )
+        return etag, int(updated_at.timestamp())
+
+    def get_list_etag(self, request):
+        return _quote(response_cache_key(request, self.cache_namespace))
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            with read_from_primary():
+                response = super().list(request, *args, **kwargs)
+        return _set_validators(response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_object_validators(request)
+        response = None
+        if etag is not None:
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return _set_validators(response, etag, last_modified)
+
+    def update(self, request, *args, **kwargs):
+        if "HTTP_IF_MATCH" not in request.META and "HTTP_IF_UNMODIFIED_SINCE" not in request.META:
+            response = super().update(request, *args, **kwargs)
+        else:
+            # Сжатый ответ несёт ослабленный ETag (config.compression), но он обозначает ту же версию объекта
+            if "HTTP_IF_MATCH" in request.META:
+                request.META["HTTP_IF_MATCH"] = request.META["HTTP_IF_MATCH"].replace('W/"', '"')
+            # Строка заблокирована от проверки до записи: второй клиент с тем же ETag дождётся коммита
+            # первого и получит 412, а не перезапишет его изменения
+            with transaction.atomic():
+                etag, last_modified = self.get_object_validators(request, lock=True)
+                response = None
+                if etag is not None:
+                    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is not None:
+                    return response
+                response = super().update(request, *args, **kwargs)
+        if response.status_code == 200:
+            etag, last_modified = self.get_object_validators(request)
+            _set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,78 @@
+import csv
+import datetime
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Ads, Review
+
+EXPORT_MODELS = {"ads": Ads, "reviews": Review}
+EXPORT_FIELDS = {
+    "ads": (
+        "id",
+        "title",
+        "price",
+        "description",
+        "author_id",
+        "created_at",
+        "updated_at",
+        "review_count",
+        "last_review_at",
+    ),
+    "reviews": ("id", "text", "author_id", "ad_id", "created_at", "updated_at"),
+}
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _prepare(value):
+    # Полная точность (с микросекундами), чтобы created_at последней строки можно было использовать как водяной знак
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(kind, since=None, chunk_size=None):
+    """
+    Строки выгрузки в порядке (created_at, id) через серверный курсор.
+
+    since — водяной знак: выгружаются только строки, созданные строго позже него. Строки моложе
+    BOARD_EXPORT_LAG секунд не выгружаются: created_at ставится до коммита, и без этого запаса
+    водяной знак мог бы обогнать ещё не закоммиченную строку, а следующая выгрузка её бы пропустила.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.BOARD_EXPORT_LAG)
+    queryset = (
+        EXPORT_MODELS[kind]
+        .objects.filter(created_at__lt=cutoff)
+        .order_by("created_at", "id")
+        .values_list(*EXPORT_FIELDS[kind])
+    )
+    if since is not None:
+        queryset = queryset.filter(created_at__gt=since)
+    return queryset.iterator(chunk_size=chunk_size or settings.BOARD_EXPORT_CHUNK_SIZE)
+
+
+def iter_ndjson(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, map(_prepare, row))), ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_prepare(value) for value in row])
+
+
+RENDERERS = {"ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def iter_export(kind, output_format, since=None, chunk_size=None):
+    return RENDERERS[output_format](export_rows(kind, since, chunk_size), EXPORT_FIELDS[kind])
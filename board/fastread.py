@@ -0,0 +1,153 @@
+"""
+Быстрый путь чтения list/retrieve (включается BOARD_FAST_READ).
+
+Строки читаются .values() только по столбцам сериализатора и превращаются в ответ конвертером,
+собранным один раз на класс сериализатора, — без экземпляров модели и без обхода полей DRF
+на каждую строку. Ответ совпадает с обычным путём байт в байт, рендерит его ORJSONRenderer.
+"""
+
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from config.renderers import ORJSONRenderer
+
+# Поля, у которых значение из БД уже совпадает с представлением (to_representation вернул бы его же)
+PLAIN_FIELDS = (
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+_converters = {}
+
+
+def _representation(field):
+    """Преобразование значения поля; часовой пояс запроса передаётся снаружи, один раз на страницу."""
+    if (
+        isinstance(field, serializers.DateTimeField)
+        and settings.USE_TZ
+        and not hasattr(field, "timezone")
+        and str(getattr(field, "format", api_settings.DATETIME_FORMAT)).lower() == ISO_8601
+    ):
+        # То же, что DateTimeField.to_representation, но без поиска текущего пояса на каждое значение
+        def iso_datetime(value, tz):
+            if timezone.is_naive(value):
+                return field.to_representation(value)
+            value = value.astimezone(tz).isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        return iso_datetime
+    return lambda value, tz: field.to_representation(value)
+
+
+class RowConverter:
+    """Представление строк .values() в формате сериализатора: поля в том же порядке, те же значения."""
+
+    def __init__(self, serializer_class, fields=None, extra_columns=()):
+        model = serializer_class.Meta.model
+        names, columns, converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only or (fields is not None and name not in fields):
+                continue
+            plain = type(field) in PLAIN_FIELDS
+            if not plain and isinstance(field, (serializers.BaseSerializer, serializers.RelatedField)):
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: вложенные поля не поддерживаются")
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is None or not model_field.concrete or model_field.many_to_many:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: источник не столбец {model.__name__}")
+            names.append(name)
+            columns.append(model_field.attname)
+            if not plain:
+                converters.append((name, _representation(field)))
+
+        self.model = model
+        self.names = tuple(names)
+        self.converters = tuple(converters)
+        self._getter = itemgetter(*columns) if len(columns) > 1 else lambda row: (row[columns[0]],)
+        # attname (author_id, а не author): из строки можно собрать экземпляр модели для проверки прав.
+        # extra_columns читаются, но в ответ не попадают (ключи сортировки и курсора)
+        extra = (model._meta.get_field(name).attname for name in extra_columns)
+        self.columns = tuple(dict.fromkeys((*columns, *extra)))
+
+    def convert(self, row, tz=None):
+        item = dict(zip(self.names, self._getter(row)))
+        if tz is None:
+            tz = timezone.get_current_timezone()
+        for name, to_representation in self.converters:
+            value = item[name]
+            if value is not None:
+                item[name] = to_representation(value, tz)
+        return item
+
+    def convert_many(self, rows):
+        tz = timezone.get_current_timezone()
+        return [self.convert(row, tz) for row in rows]
+
+
+def get_converter(serializer_class, fields=None, extra_columns=()):
+    key = (serializer_class, fields, extra_columns)
+    converter = _converters.get(key)
+    if converter is None:
+        converter = _converters[key] = RowConverter(serializer_class, fields, extra_columns)
+    return converter
+
+
+class FastReadMixin:
+    """
+    Миксин ModelViewSet: list и retrieve по быстрому пути, если включён BOARD_FAST_READ.
+
+    Фильтры, сортировка и пагинация те же; быстрый путь обходится без сериализатора, поэтому
+    работает только для JSON и для serializer_class самого представления.
+    """
+
+    def use_fast_read(self, request):
+        return (
+            settings.BOARD_FAST_READ
+            and request.accepted_renderer.format == "json"
+            and self.get_serializer_class() is self.serializer_class
+        )
+
+    def get_row_converter(self):
+        return get_converter(self.serializer_class)
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if settings.BOARD_FAST_READ:
+            renderers = [ORJSONRenderer() if type(renderer) is JSONRenderer else renderer for renderer in renderers]
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_read(request):
+            return super().list(request, *args, **kwargs)
+        converter = self.get_row_converter()
+        queryset = self.filter_queryset(self.get_queryset())
+        # Аннотации (ранг поиска) нужны пагинатору для сортировки и позиции курсора
+        rows = queryset.values(*converter.columns, *queryset.query.annotations)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(converter.convert_many(page))
+        return Response(converter.convert_many(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_read(request):
+            return super().retrieve(request, *args, **kwargs)
+        converter = self.get_row_converter()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows = self.filter_queryset(self.get_queryset()).values(*converter.columns)
+        row = get_object_or_404(rows, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        # Экземпляр без запросов к БД: права на объект проверяются по его полям
+        self.check_object_permissions(request, converter.model(**row))
+        return Response(converter.convert(row))
@@ -0,0 +1,118 @@
+from rest_framework.exceptions import ValidationError
+
+from .cache import get_generation, get_last_modified
+from .conditional import _quote
+from .fastread import get_converter
+
+_available_fields = {}
+
+
+def available_fields(serializer_class):
+    """Поля, которые сериализатор отдаёт в ответе: {имя: источник}."""
+    fields = _available_fields.get(serializer_class)
+    if fields is None:
+        fields = _available_fields[serializer_class] = {
+            name: field.source for name, field in serializer_class().fields.items() if not field.write_only
+        }
+    return fields
+
+
+def _split(value):
+    return tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+
+
+class SparseFieldsMixin:
+    """
+    Миксин ModelViewSet: ?fields=id,title,price и ?expand=author для list и retrieve.
+
+    fields сужает и ответ сериализатора, и SELECT (only()); expand встраивает автора объектом
+    PublicUserSerializer, который читается тем же запросом через select_related. Сериализатор
+    должен поддерживать fields/expand (board.serializer.FieldsetSerializerMixin).
+
+    Стоит в MRO перед ConditionalGetMixin: ETag объекта зависит от набора полей.
+    """
+
+    fieldset_actions = ("list", "retrieve")
+
+    def get_fieldset(self):
+        """(fields, expand) текущего запроса: fields — None, если не сужены; неизвестные имена дают 400."""
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = self._parse_fieldset()
+        return self._fieldset
+
+    def _parse_fieldset(self):
+        if self.action not in self.fieldset_actions:
+            return None, ()
+        params = self.request.query_params
+        available = available_fields(self.serializer_class)
+        expandable = self.serializer_class.expandable_fields
+        fields = _split(params["fields"]) if params.get("fields") else None
+        expand = _split(params.get("expand", ""))
+
+        errors = {}
+        unknown = set(fields or ()) - set(available)
+        if unknown:
+            errors["fields"] = [f"Неизвестные поля: {', '.join(sorted(unknown))}."]
+        if set(expand) - set(expandable):
+            errors["expand"] = [f"Можно встроить только: {', '.join(sorted(expandable))}."]
+        if errors:
+            raise ValidationError(errors)
+        # Связь, которой нет среди запрошенных полей, встраивать незачем
+        return fields, tuple(name for name in expand if fields is None or name in fields)
+
+    def get_required_columns(self):
+        """Столбцы, нужные помимо запрошенных полей: id и ключи сортировки и курсора пагинации."""
+        ordering = (*(getattr(self, "ordering", None) or ()), *(getattr(self, "ordering_fields", None) or ()))
+        if self.pagination_class is not None:
+            ordering += tuple(getattr(self.pagination_class, "ordering", None) or ())
+        return tuple(dict.fromkeys(("id", *(name.lstrip("-") for name in ordering))))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, expand = self.get_fieldset()
+        if fields is None and not expand:
+            return queryset
+        available = available_fields(self.serializer_class)
+        columns = [available[name] for name in (fields or available)]
+        for name in expand:
+            related = available_fields(self.serializer_class.expandable_fields[name])
+            columns += [f"{available[name]}__{source}" for source in related.values()]
+        queryset = queryset.only(*columns, *self.get_required_columns())
+        if expand:
+            queryset = queryset.select_related(*(available[name] for name in expand))
+        return queryset
+
+    def get_object_validators(self, request, lock=False):
+        etag, last_modified = super().get_object_validators(request, lock)
+        fields, expand = self.get_fieldset()
+        if etag is None or (fields is None and not expand):
+            return etag, last_modified
+        raw = f"{etag}:{','.join(fields or ())}:{','.join(expand)}"
+        if expand:
+            # Встроенный автор меняется без записи в само объявление: изменения пользователей
+            # сдвигают поколение кэша (board.signals), поэтому оно входит в ETag
+            raw += f":{get_generation(self.cache_namespace)}"
+            last_modified = max(last_modified, int(get_last_modified(self.cache_namespace)))
+        return _quote(raw), last_modified
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_fieldset()
+        # Сериализаторы отдельных действий (отзывы объявления) поля не выбирают
+        if self.get_serializer_class() is self.serializer_class:
+            if fields is not None:
+                kwargs.setdefault("fields", fields)
+            if expand:
+                kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
+
+    # Быстрый путь чтения (board.fastread.FastReadMixin)
+
+    def use_fast_read(self, request):
+        # Встроенные объекты собирает только сериализатор
+        return super().use_fast_read(request) and not self.get_fieldset()[1]
+
+    def get_row_converter(self):
+        fields, _ = self.get_fieldset()
+        if fields is None:
+            return super().get_row_converter()
+        return get_converter(self.serializer_class, fields, self.get_required_columns())
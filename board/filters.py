@@ -1,11 +1,50 @@
 import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
 
 from .models import Ads
 
+SEARCH_CONFIG = "russian"  # Должен совпадать с конфигурацией в триггере board_ads_search_vector_update
+SEARCH_RANK_ANNOTATION = "search_rank"  # По этой аннотации AdsPaginator сортирует результаты поиска
+
+_trigram_available = {}
+
+
+def trigram_available(using="default"):
+    """Установлено ли расширение pg_trgm (проверяется один раз на процесс)."""
+    if using not in _trigram_available:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[using] = cursor.fetchone() is not None
+    return _trigram_available[using]
+
 
 class AdFilter(django_filters.FilterSet):
     title = django_filters.CharFilter(field_name="title", lookup_expr="icontains")  # Поиск по названию (буквально)
+    search = django_filters.CharFilter(method="filter_search")  # Полнотекстовый поиск по названию и описанию
+    price_min = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    price_max = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    # По id автора без проверки его существования: ModelChoiceFilter стоил бы лишнего запроса
+    author = django_filters.NumberFilter(field_name="author_id")
+    created_after = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="lt")
 
     class Meta:
         model = Ads
         fields = ["title"]
+
+    def filter_search(self, queryset, name, value):
+        query = SearchQuery(value, config=SEARCH_CONFIG, search_type="websearch")
+        # ts_rank возвращает real: приводим к double, чтобы позиция в курсоре сравнивалась точно
+        found = queryset.filter(search_vector=query).annotate(
+            **{SEARCH_RANK_ANNOTATION: Cast(SearchRank(F("search_vector"), query), FloatField())}
+        )
+        if not trigram_available(queryset.db) or found.exists():
+            return found
+
+        # Ничего не нашлось — вероятно, опечатка: ищем по похожести слов в названии
+        return queryset.filter(title__trigram_word_similar=value).annotate(
+            **{SEARCH_RANK_ANNOTATION: Cast(TrigramWordSimilarity(value, "title"), FloatField())}
+        )
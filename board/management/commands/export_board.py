@@ -0,0 +1,45 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from board.export import EXPORT_FIELDS, EXPORT_MODELS, RENDERERS, export_rows
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка объявлений или отзывов в NDJSON/CSV (инкрементально с --since)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(EXPORT_MODELS))
+        parser.add_argument("--format", dest="output_format", choices=sorted(RENDERERS), default="ndjson")
+        parser.add_argument("--since", help="Водяной знак created_at (ISO 8601): выгрузить строки новее него")
+        parser.add_argument("--output", help="Файл для записи (по умолчанию stdout)")
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since должен быть датой и временем в формате ISO 8601")
+
+        kind = options["kind"]
+        fields = EXPORT_FIELDS[kind]
+        created_at_index = fields.index("created_at")
+        state = {"rows": 0, "watermark": since}
+
+        def tracked(rows):
+            for row in rows:
+                state["rows"] += 1
+                state["watermark"] = row[created_at_index]
+                yield row
+
+        lines = RENDERERS[options["output_format"]](tracked(export_rows(kind, since, options["chunk_size"])), fields)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
+
+        watermark = state["watermark"].isoformat() if state["watermark"] else ""
+        # Итог пишем в stderr, чтобы он не смешивался с данными в stdout
+        self.stderr.write(f"Выгружено строк: {state['rows']}, водяной знак: {watermark}")
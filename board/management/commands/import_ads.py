@@ -0,0 +1,292 @@
+import csv
+import io
+import itertools
+import json
+import time
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from board.cache import bump_generation
+from board.models import Ads, Review
+from board.stats import refresh_daily_stats
+from users.models import User
+
+MAX_PRICE = 2147483647  # Верхняя граница PositiveIntegerField в PostgreSQL
+TITLE_MAX_LENGTH = Ads._meta.get_field("title").max_length
+
+RECOUNT_REVIEWS_SQL = """
+UPDATE {ads} AS ads
+SET review_count = counters.review_count, last_review_at = counters.last_review_at, updated_at = now()
+FROM (
+    SELECT ad_id, COUNT(*) AS review_count, MAX(created_at) AS last_review_at
+    FROM {reviews}
+    WHERE ad_id = ANY(%s)
+    GROUP BY ad_id
+) AS counters
+WHERE counters.ad_id = ads.id
+"""
+
+
+class MalformedRow(dict):
+    """Строка NDJSON, которую не удалось разобрать: пустой словарь с исходным текстом и ошибкой."""
+
+    def __init__(self, raw, error):
+        super().__init__()
+        self.raw = raw
+        self.error = error
+
+
+def read_rows(path):
+    """Строки файла как словари: NDJSON (.ndjson/.jsonl) или CSV с заголовком."""
+    with open(path, encoding="utf-8", newline="") as source:
+        if Path(path).suffix in (".ndjson", ".jsonl"):
+            for line in source:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError("ожидается объект")
+                except ValueError as error:
+                    # Битая строка уходит в отклонённые, а не прерывает загрузку
+                    yield MalformedRow(line.rstrip("\r\n"), f"Некорректный JSON: {error}")
+                else:
+                    yield row
+        else:
+            yield from csv.DictReader(source)
+
+
+def batched(iterable, size):
+    iterator = iter(enumerate(iterable, start=1))
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Массовая загрузка объявлений (и отзывов) из NDJSON/CSV через COPY FROM STDIN"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл объявлений: title, price, description, author_email, created_at")
+        parser.add_argument("--reviews", help="Файл отзывов: ad_id, text, author_email, created_at")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--rejects", help="Куда записать отклонённые строки (NDJSON)")
+        parser.add_argument(
+            "--defer-indexes",
+            action="store_true",
+            help=(
+                "Удалить вторичные индексы и триггер поиска на время загрузки и пересоздать их в конце; "
+                "объявления загружаются одной транзакцией, таблица до её конца заблокирована"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть положительным")
+        self.batch_size = options["batch_size"]
+        self.authors = {}
+        self.rejects = open(options["rejects"], "w", encoding="utf-8") if options["rejects"] else None
+        try:
+            if options["defer_indexes"]:
+                # Удаление и пересоздание индексов — в транзакции загрузки: другие запросы ждут её конца,
+                # а не работают без индексов и триггера, и при сбое всё откатывается вместе с загрузкой
+                with transaction.atomic(), DeferredIndexes(Ads._meta.db_table, self.stdout):
+                    days = self.load_ads(options["path"])
+            else:
+                days = self.load_ads(options["path"])
+            # Сводку /board/ads/stats/ ведут сигналы, которые COPY обходит, — пересчитываем загруженные дни
+            refresh_daily_stats(days)
+            if options["reviews"]:
+                self.load_reviews(options["reviews"])
+        finally:
+            if self.rejects:
+                self.rejects.close()
+        # COPY не отправляет сигналы, поэтому кэш списков сбрасываем сами
+        bump_generation("ads", "review")
+
+    # Загрузка
+
+    def load_ads(self, path):
+        """Загружает объявления и возвращает дни их создания."""
+        columns = ("title", "price", "description", "author_id", "created_at", "updated_at", "review_count")
+        days = set()
+
+        def clean(row, errors):
+            values = self.clean_ad(row, errors)
+            if not errors:
+                created_at = values[4]
+                # Время без пояса PostgreSQL читает в поясе соединения, то есть в TIME_ZONE
+                days.add(timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date())
+            return values
+
+        self.copy(path, Ads._meta.db_table, columns, clean, force_not_null=("title", "description"))
+        return days
+
+    def load_reviews(self, path):
+        columns = ("text", "author_id", "ad_id", "created_at", "updated_at")
+        ad_ids = set()
+
+        def clean(row, errors):
+            values = self.clean_review(row, errors)
+            if not errors:
+                ad_ids.add(values[2])
+            return values
+
+        self.copy(path, Review._meta.db_table, columns, clean, force_not_null=("text",), prepare=self.prepare_reviews)
+        # Счётчики отзывов ведутся сигналами, которые COPY обходит, — пересчитываем их одним запросом
+        with connection.cursor() as cursor:
+            sql = RECOUNT_REVIEWS_SQL.format(ads=Ads._meta.db_table, reviews=Review._meta.db_table)
+            cursor.execute(sql, [sorted(ad_ids)])
+
+    def copy(self, path, table, columns, clean, force_not_null=(), prepare=None):
+        sql = "COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({not_null}))".format(
+            table=table, columns=", ".join(columns), not_null=", ".join(force_not_null)
+        )
+        loaded = rejected = 0
+        started = time.monotonic()
+        for batch in batched(read_rows(path), self.batch_size):
+            self.resolve_authors(row.get("author_email") for _, row in batch)
+            if prepare:
+                prepare(batch)
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for line, row in batch:
+                if isinstance(row, MalformedRow):
+                    rejected += 1
+                    self.reject(path, line, row.raw, [row.error])
+                    continue
+                errors = []
+                values = clean(row, errors)
+                if errors:
+                    rejected += 1
+                    self.reject(path, line, row, errors)
+                else:
+                    writer.writerow(values)
+                    loaded += 1
+            buffer.seek(0)
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.copy_expert(sql, buffer)
+
+            rate = loaded / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"{table}: загружено {loaded}, отклонено {rejected} ({rate:.0f} строк/с)")
+        return loaded, rejected
+
+    # Проверка строк
+
+    def resolve_authors(self, emails):
+        """Добирает id авторов по email одним запросом на пачку; уже известные не запрашиваются."""
+        missing = {email for email in emails if email and email not in self.authors}
+        if missing:
+            found = dict(User.objects.filter(email__in=missing).values_list("email", "id"))
+            self.authors.update({email: found.get(email) for email in missing})
+
+    def clean_author(self, row, errors):
+        email = row.get("author_email")
+        if not email:
+            return None
+        if self.authors.get(email) is None:
+            errors.append(f"Неизвестный автор: {email}")
+        return self.authors.get(email)
+
+    def clean_created_at(self, row, errors):
+        value = row.get("created_at")
+        if not value:
+            return timezone.now()
+        created_at = parse_datetime(value)
+        if created_at is None:
+            errors.append(f"Некорректная дата created_at: {value}")
+        return created_at
+
+    def clean_ad(self, row, errors):
+        title = (row.get("title") or "").strip()
+        if not title or len(title) > TITLE_MAX_LENGTH:
+            errors.append(f"title должен быть непустым и не длиннее {TITLE_MAX_LENGTH} символов")
+        try:
+            price = int(row.get("price"))
+            if not 0 <= price <= MAX_PRICE:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"Некорректная цена: {row.get('price')}")
+            price = None
+        author_id = self.clean_author(row, errors)
+        created_at = self.clean_created_at(row, errors)
+        return (title, price, row.get("description") or "", author_id, created_at, created_at, 0)
+
+    def prepare_reviews(self, batch):
+        ids = set()
+        for _, row in batch:
+            try:
+                ids.add(int(row.get("ad_id")))
+            except (TypeError, ValueError):
+                pass
+        self.existing_ads = set(Ads.objects.filter(pk__in=ids).values_list("id", flat=True))
+
+    def clean_review(self, row, errors):
+        text = row.get("text") or ""
+        if not text.strip():
+            errors.append("Пустой текст отзыва")
+        try:
+            ad_id = int(row.get("ad_id"))
+        except (TypeError, ValueError):
+            ad_id = None
+        if ad_id not in self.existing_ads:
+            errors.append(f"Неизвестное объявление: {row.get('ad_id')}")
+        author_id = self.clean_author(row, errors)
+        created_at = self.clean_created_at(row, errors)
+        return (text, author_id, ad_id, created_at, created_at)
+
+    def reject(self, path, line, row, errors):
+        if self.rejects:
+            record = {"file": path, "line": line, "row": row, "errors": errors}
+            self.rejects.write(json.dumps(record, ensure_ascii=False))
+            self.rejects.write("\n")
+
+
+class DeferredIndexes:
+    """
+    Контекст загрузки без вторичных индексов и триггера полнотекстового поиска.
+
+    Индексы (кроме первичного ключа и уникальных) удаляются до загрузки и пересоздаются
+    по сохранённым определениям после неё, а search_vector новых строк считается одним UPDATE.
+    Используется только внутри транзакции, охватывающей загрузку.
+    """
+
+    trigger = "board_ads_search_vector_update"
+
+    def __init__(self, table, stdout):
+        self.table = table
+        self.stdout = stdout
+
+    def __enter__(self):
+        if not connection.in_atomic_block:
+            raise CommandError("DeferredIndexes нужна транзакция: без неё таблица останется без индексов")
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self.table}")
+            self.max_id = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexdef NOT LIKE %s",
+                [self.table, "CREATE UNIQUE INDEX%"],
+            )
+            self.indexes = cursor.fetchall()
+            for name, _ in self.indexes:
+                cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+            cursor.execute(f"ALTER TABLE {self.table} DISABLE TRIGGER {self.trigger}")
+        self.stdout.write(f"{self.table}: индексы на время загрузки удалены: {len(self.indexes)}")
+        return self
+
+    def __exit__(self, *exc_info):
+        with connection.cursor() as cursor:
+            # Отложенные проверки внешних ключей после COPY выполняются сейчас, в транзакции загрузки:
+            # с ожидающими событиями триггеров ALTER TABLE не выполняется
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(f"ALTER TABLE {self.table} ENABLE TRIGGER {self.trigger}")
+            # Пересчитываем вектор тем же выражением, что и триггер: UPDATE OF title запускает его для новых строк
+            cursor.execute(f"UPDATE {self.table} SET title = title WHERE id > %s", [self.max_id])
+            for _, definition in self.indexes:
+                cursor.execute(definition)
+        self.stdout.write(f"{self.table}: индексы пересозданы: {len(self.indexes)}")
@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+
+from board.models import AdsDailyStats
+from board.stats import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчёт сводки объявлений по дням для /board/ads/stats/ (после смены BOARD_PRICE_BUCKETS или TIME_ZONE)"
+
+    def handle(self, *args, **options):
+        refresh_daily_stats()
+        self.stdout.write(f"Сводка пересчитана: дней {AdsDailyStats.objects.count()}")
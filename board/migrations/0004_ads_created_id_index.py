@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("board", "0003_alter_review_options_alter_ads_author_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ads",
+            index=models.Index(fields=["-created_at", "-id"], name="board_ads_created_id_idx"),
+        ),
+    ]
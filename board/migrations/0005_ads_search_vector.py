@@ -0,0 +1,66 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+# Вектор собирается в БД, чтобы он оставался актуальным при любых способах записи
+# (save(), bulk_create/bulk_update, COPY). Заголовок весит больше описания.
+SEARCH_TRIGGER_SQL = """
+CREATE FUNCTION board_ads_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER board_ads_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description ON board_ads
+    FOR EACH ROW EXECUTE FUNCTION board_ads_search_vector_update();
+
+UPDATE board_ads SET title = title;
+"""
+
+DROP_SEARCH_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS board_ads_search_vector_update ON board_ads;
+DROP FUNCTION IF EXISTS board_ads_search_vector_update();
+"""
+
+# pg_trgm ставится из contrib и есть не везде: без него поиск просто работает без нечёткого fallback
+TRIGRAM_INDEX_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS board_ads_title_trgm_idx ON board_ads USING gin (title gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+DROP_TRIGRAM_INDEX_SQL = "DROP INDEX IF EXISTS board_ads_title_trgm_idx;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("board", "0004_ads_created_id_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ads",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="ads",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["search_vector"], name="board_ads_search_idx"),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGER_SQL, DROP_SEARCH_TRIGGER_SQL),
+        migrations.RunSQL(TRIGRAM_INDEX_SQL, DROP_TRIGRAM_INDEX_SQL),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("board", "0005_ads_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ads",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_COUNTERS_SQL = """
+UPDATE board_ads AS ads
+SET review_count = counters.review_count, last_review_at = counters.last_review_at
+FROM (
+    SELECT ad_id, COUNT(*) AS review_count, MAX(created_at) AS last_review_at
+    FROM board_review
+    GROUP BY ad_id
+) AS counters
+WHERE counters.ad_id = ads.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("board", "0006_ads_updated_at_review_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ads",
+            name="last_review_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="ads",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["ad", "-created_at", "-id"], name="board_review_ad_created_idx"),
+        ),
+        migrations.RunSQL(BACKFILL_COUNTERS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-18 19:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("board", "0007_ads_review_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ads",
+            index=models.Index(fields=["price", "id"], name="board_ads_price_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ads",
+            index=models.Index(fields=["author", "-created_at", "-id"], name="board_ads_author_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ads",
+            index=models.Index(fields=["author", "price", "id"], name="board_ads_author_price_idx"),
+        ),
+        # Одиночный индекс по author удаляем после создания составных, которые его заменяют
+        migrations.AlterField(
+            model_name="ads",
+            name="author",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
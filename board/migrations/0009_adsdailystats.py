@@ -0,0 +1,66 @@
+# Generated by Django 5.0.2 on 2026-10-18 21:05
+
+import django.contrib.postgres.fields
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_daily_stats(apps, schema_editor):
+    # Та же группировка, что в board.stats.rebuild; таблица только что создана, поэтому достаточно вставки
+    Ads = apps.get_model("board", "Ads")
+    AdsDailyStats = apps.get_model("board", "AdsDailyStats")
+    using = schema_editor.connection.alias
+    bounds = settings.BOARD_PRICE_BUCKETS
+    buckets = {}
+    for index, lower in enumerate(bounds):
+        condition = Q(price__gte=lower)
+        if index + 1 < len(bounds):
+            condition &= Q(price__lt=bounds[index + 1])
+        buckets[f"bucket_{index}"] = Count("id", filter=condition)
+    rows = (
+        Ads.objects.using(using)
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(count=Count("id"), price_sum=Sum("price"), price_min=Min("price"), price_max=Max("price"), **buckets)
+        .order_by()
+    )
+    AdsDailyStats.objects.using(using).bulk_create(
+        AdsDailyStats(
+            day=row["day"],
+            count=row["count"],
+            price_sum=row["price_sum"],
+            price_min=row["price_min"],
+            price_max=row["price_max"],
+            price_buckets=[row[name] for name in buckets],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("board", "0008_ads_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdsDailyStats",
+            fields=[
+                ("day", models.DateField(primary_key=True, serialize=False)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("price_sum", models.BigIntegerField(default=0)),
+                ("price_min", models.PositiveIntegerField(null=True)),
+                ("price_max", models.PositiveIntegerField(null=True)),
+                (
+                    "price_buckets",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.PositiveIntegerField(), default=list, size=None
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 
 from users.models import User
 
@@ -7,13 +10,30 @@ class Ads(models.Model):
     title = models.CharField(max_length=255)  # Название товара
     price = models.PositiveIntegerField()  # Цена товара (целое число)
     description = models.TextField()  # Описание товара
+    # Отдельный индекс по author не нужен: его заменяют составные индексы с author в начале (см. Meta.indexes)
     author = models.ForeignKey(
-        User, on_delete=models.CASCADE, null=True, blank=True
+        User, on_delete=models.CASCADE, null=True, blank=True, db_index=False
     )  # Пользователь, создавший объявление
     created_at = models.DateTimeField(auto_now_add=True)  # Время и дата создания объявления
+    updated_at = models.DateTimeField(auto_now=True)  # Время последнего изменения (для ETag/Last-Modified)
+    review_count = models.PositiveIntegerField(default=0)  # Количество отзывов (обновляется сигналами Review)
+    last_review_at = models.DateTimeField(null=True, blank=True)  # Время последнего отзыва
+    search_vector = SearchVectorField(
+        null=True, editable=False
+    )  # Полнотекстовый индекс по title и description, заполняется триггером board_ads_search_vector_update
 
     class Meta:
         ordering = ["-created_at"]  # Сортировка по дате создания (по убыванию)
+        indexes = [
+            # Ключ курсорной пагинации AdsPaginator: (created_at, id) по убыванию
+            models.Index(fields=["-created_at", "-id"], name="board_ads_created_id_idx"),
+            # ?ordering=price / -price (обратный проход) и фильтры price_min/price_max
+            models.Index(fields=["price", "id"], name="board_ads_price_id_idx"),
+            # ?author= с сортировкой по умолчанию и по цене
+            models.Index(fields=["author", "-created_at", "-id"], name="board_ads_author_created_idx"),
+            models.Index(fields=["author", "price", "id"], name="board_ads_author_price_idx"),
+            GinIndex(fields=["search_vector"], name="board_ads_search_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -26,6 +46,47 @@ class Review(models.Model):
         Ads, related_name="reviews", on_delete=models.CASCADE
     )  # Объявление, под которым оставлен отзыв
     created_at = models.DateTimeField(auto_now_add=True)  # Время и дата создания отзыва
+    updated_at = models.DateTimeField(auto_now=True)  # Время последнего изменения (для ETag/Last-Modified)
+
+    class Meta:
+        indexes = [
+            # Ключ пагинации отзывов объявления: /board/ads/{id}/reviews/
+            models.Index(fields=["ad", "-created_at", "-id"], name="board_review_ad_created_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Объявление на момент загрузки: по нему сигнал замечает перенос отзыва (board.signals)
+        if "ad_id" in field_names:
+            instance._loaded_ad_id = values[field_names.index("ad_id")]
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Счётчики объявления обновляются в post_save, в той же транзакции, что и сам отзыв
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+        self._loaded_ad_id = self.ad_id
 
     def __str__(self):
         return f"Review by {self.author.username} on {self.ad.title}"
+
+
+class AdsDailyStats(models.Model):
+    """
+    Сводка объявлений по дням создания для /board/ads/stats/ (board.stats).
+
+    Строка дня пересчитывается целиком после каждой записи в Ads за этот день,
+    поэтому min/max остаются точными и после удаления объявлений.
+    """
+
+    day = models.DateField(primary_key=True)  # Дата создания в часовом поясе TIME_ZONE
+    count = models.PositiveIntegerField(default=0)
+    price_sum = models.BigIntegerField(default=0)
+    price_min = models.PositiveIntegerField(null=True)
+    price_max = models.PositiveIntegerField(null=True)
+    # Число объявлений в ценовых корзинах settings.BOARD_PRICE_BUCKETS
+    price_buckets = ArrayField(models.PositiveIntegerField(), default=list)
+
+    def __str__(self):
+        return f"{self.day}: {self.count}"
@@ -1,5 +1,145 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
 
+from .filters import SEARCH_RANK_ANNOTATION
 
-class AdsPaginator(PageNumberPagination):
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по составному ключу (поле сортировки, id).
+
+    В отличие от базового CursorPagination, где позиция строится только по первому
+    полю сортировки, а совпадения разруливаются смещением (OFFSET), здесь в курсор
+    кладётся пара значений. Позиция всегда уникальна, поэтому запрос любой страницы
+    сводится к одному диапазонному сканированию индекса без COUNT и OFFSET.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    position_separator = "|"
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Последним полем всегда идёт id в том же направлении, что и первое поле
+        tiebreaker = "-id" if ordering[0].startswith("-") else "id"
+        return (ordering[0], tiebreaker)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """То же, что paginate_queryset, но страница читается асинхронным ORM."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([item async for item in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Запрос страницы (плюс одна строка для проверки следующей страницы) без обращения к БД."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.offset, self.reverse, self.current_position = (0, False, None)
+        else:
+            self.offset, self.reverse, self.current_position = self.cursor
+
+        ordering = self._reverse_ordering(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+
+        if self.current_position is not None:
+            queryset = queryset.filter(self._get_keyset_filter(self.current_position, ordering, queryset))
+
+        return queryset[self.offset : self.offset + self.page_size + 1]
+
+    def set_page(self, results):
+        """Запоминает страницу и позиции соседних страниц по результатам get_page_queryset."""
+        offset, reverse, current_position = self.offset, self.reverse, self.current_position
+        self.page = list(results[: self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _get_keyset_filter(self, position, ordering, queryset):
+        """Условие `(field, id) > (value, pk)` с учётом направления сортировки."""
+        field = ordering[0].lstrip("-")
+        # Сортировка может идти по аннотации (ранг поиска), а не по полю модели
+        annotation = queryset.query.annotations.get(field)
+        model_field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(field)
+        try:
+            value, pk = position.rsplit(self.position_separator, 1)
+            # Курсор от другой сортировки или подделанный должен давать 404, а не ошибку при выполнении запроса
+            value = model_field.to_python(value)
+            pk = int(pk)
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        direction = "lt" if ordering[0].startswith("-") else "gt"
+        # Первое условие (field <= value) даёт диапазон по индексу, второе отсекает уже показанные строки
+        return Q(**{f"{field}__{direction}e": value}) & (
+            Q(**{f"{field}__{direction}": value}) | Q(**{f"id__{direction}": pk})
+        )
+
+    @staticmethod
+    def _reverse_ordering(ordering):
+        return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        field_name = ordering[0].lstrip("-")
+        if isinstance(instance, dict):
+            value, pk = instance[field_name], instance["id"]
+        else:
+            value, pk = getattr(instance, field_name), instance.pk
+        return f"{value}{self.position_separator}{pk}"
+
+
+class AdsPaginator(KeysetCursorPagination):
     page_size = 4  # пагинация для объявлений
+    ordering = ("-created_at", "-id")  # Совпадает с Ads.Meta.ordering и индексом board_ads_created_id_idx
+
+    def get_ordering(self, request, queryset, view):
+        # Результаты полнотекстового поиска (AdFilter.search) идут по убыванию релевантности,
+        # если сортировка не задана явно параметром ordering (OrderingFilter)
+        if SEARCH_RANK_ANNOTATION in queryset.query.annotations and not request.query_params.get("ordering"):
+            return ("-" + SEARCH_RANK_ANNOTATION, "-id")
+        return super().get_ordering(request, queryset, view)
+
+
+class AdReviewsPaginator(KeysetCursorPagination):
+    page_size = 10  # пагинация отзывов объявления
+    ordering = ("-created_at", "-id")  # Вместе с фильтром по ad_id использует индекс board_review_ad_created_idx
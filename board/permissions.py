@@ -22,4 +22,4 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:  # GET и HEAD запросы
             return True
-        return obj.author == request.user  # Проверяем, является ли пользователь владельцем
+        return obj.author_id == request.user.id  # Проверяем владельца без загрузки объекта автора
@@ -0,0 +1,152 @@
+"""
+Профилирование отдельных запросов по требованию администратора.
+
+Запрос с заголовком X-Profile: 1 или параметром ?profile=1 от пользователя с is_staff выполняется
+под cProfile с записью всех SQL-запросов. Результат сохраняется в PROFILE_DIR двумя файлами:
+<id>.pstats (открывается pstats, snakeviz) и <id>.json (метаданные, SQL с параметрами и временем,
+топ функций); id возвращается в заголовке X-Profile-Id, скачать файлы можно из /board/profiles/.
+Без флага миксин только проверяет заголовок и параметр запроса.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "profile"
+PROFILE_KINDS = ("pstats", "json")
+
+# Сколько функций по суммарному времени попадает в <id>.json
+TOP_FUNCTIONS = 40
+
+
+class SQLRecorder:
+    """execute_wrapper, сохраняющий каждый SQL-запрос с параметрами, базой и временем."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "sql": sql,
+                    "params": params,
+                    "many": many,
+                    "database": context["connection"].alias,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                }
+            )
+
+
+def is_requested(request):
+    return PROFILE_HEADER in request.META or PROFILE_PARAM in request.GET
+
+
+def profile_path(profile_id, kind):
+    return os.path.join(settings.PROFILE_DIR, f"{profile_id}.{kind}")
+
+
+def _prune():
+    """Оставляет PROFILE_KEEP последних профилей."""
+    names = [name for name in os.listdir(settings.PROFILE_DIR) if name.endswith(".json")]
+    if len(names) <= settings.PROFILE_KEEP:
+        return
+    names.sort(key=lambda name: os.path.getmtime(os.path.join(settings.PROFILE_DIR, name)))
+    for name in names[: len(names) - settings.PROFILE_KEEP]:
+        for kind in PROFILE_KINDS:
+            try:
+                os.remove(profile_path(name[: -len(".json")], kind))
+            except FileNotFoundError:
+                pass
+
+
+class ProfileSession:
+    def __init__(self):
+        self.profile_id = str(uuid.uuid4())
+        self.profiler = cProfile.Profile()
+        self.recorder = SQLRecorder()
+        self.stack = ExitStack()
+        self.started = None
+
+    def start(self):
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self.recorder))
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        duration = time.perf_counter() - self.started
+        self.stack.close()
+        return duration
+
+    def save(self, request, response, duration):
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        self.profiler.dump_stats(profile_path(self.profile_id, "pstats"))
+
+        summary = io.StringIO()
+        pstats.Stats(self.profiler, stream=summary).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        data = {
+            "id": self.profile_id,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "user": request.user.pk,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "sql_count": len(self.recorder.queries),
+            "sql_duration_ms": round(sum(query["duration_ms"] for query in self.recorder.queries), 3),
+            "sql": self.recorder.queries,
+            "functions": summary.getvalue(),
+        }
+        # Сначала .pstats, потом .json: по .json профиль считается готовым (_prune, ProfileDownloadView)
+        with open(profile_path(self.profile_id, "json"), "w") as file:
+            json.dump(data, file, ensure_ascii=False, indent=2, default=str)
+        _prune()
+
+
+class ProfilingMixin:
+    """
+    Миксин ViewSet: профилирует запрос администратора с флагом X-Profile или ?profile (см. модуль).
+
+    Профиль начинается после аутентификации и проверки прав (кто запрашивает, известно только тогда)
+    и включает обработку действия и отрисовку ответа.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if is_requested(request) and request.user and request.user.is_staff:
+            session = ProfileSession()
+            try:
+                session.start()
+            except ValueError:
+                # В потоке уже работает другой профилировщик (Python 3.12+)
+                session.stack.close()
+            else:
+                self._profile_session = session
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        session = getattr(self, "_profile_session", None)
+        if session is None:
+            return response
+        self._profile_session = None
+        try:
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        finally:
+            duration = session.stop()
+        session.save(request, response, duration)
+        response["X-Profile-Id"] = session.profile_id
+        return response
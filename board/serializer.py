@@ -1,15 +1,59 @@
 from rest_framework import serializers
 
+from users.serializers import PublicUserSerializer
+
 from .models import Ads, Review
 
 
-class AdsSerializer(serializers.ModelSerializer):
+class FieldsetSerializerMixin:
+    """
+    Сериализатор с выбором полей (board.fieldsets.SparseFieldsMixin).
+
+    fields — какие поля отдавать (порядок остаётся порядком сериализатора),
+    expand — какие связи из expandable_fields встроить объектами вместо id.
+    """
+
+    expandable_fields = {"author": PublicUserSerializer}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class AdsSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ads
-        fields = "__all__"
+        exclude = ("search_vector",)  # Служебное поле полнотекстового поиска
+        read_only_fields = ("review_count", "last_review_at")  # Счётчики ведутся сигналами отзывов
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = "__all__"
+
+
+class AdReviewSerializer(ReviewSerializer):
+    """Отзыв в контексте объявления: объявление берётся из URL."""
+
+    class Meta(ReviewSerializer.Meta):
+        read_only_fields = ("ad",)
+
+
+class AdsBulkOperationSerializer(serializers.Serializer):
+    """Одна операция пакетного запроса /board/ads/bulk/."""
+
+    op = serializers.ChoiceField(choices=("create", "update", "delete"))
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] != "create" and "id" not in attrs:
+            raise serializers.ValidationError({"id": "Обязательное поле для update и delete."})
+        if attrs["op"] != "delete" and "data" not in attrs:
+            raise serializers.ValidationError({"data": "Обязательное поле для create и update."})
+        return attrs
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import User
+from users.serializers import PublicUserSerializer
+
+from .cache import bump_generation
+from .fieldsets import available_fields
+from .models import Ads, Review
+from .stats import schedule_refresh
+
+
+def bump_generation_on_commit(*namespaces, using=None):
+    # Поколение меняется только после коммита: иначе параллельный GET успеет прочитать старые строки
+    # и положить их в кэш уже под новым поколением
+    transaction.on_commit(lambda: bump_generation(*namespaces), using=using)
+
+
+@receiver([post_save, post_delete], sender=Ads)
+def invalidate_ads_cache(sender, using=None, **kwargs):
+    bump_generation_on_commit("ads", using=using)
+
+
+@receiver([post_save, post_delete], sender=Ads)
+def refresh_ads_stats(sender, instance, raw=False, using=None, **kwargs):
+    # Фикстуры (raw) сводку не трогают: её пересчитывает manage.py rebuild_ads_stats
+    if not raw and instance.created_at is not None:
+        schedule_refresh([timezone.localdate(instance.created_at)], using=using)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_cache(sender, using=None, **kwargs):
+    # Счётчики отзывов входят в представление объявления, поэтому сбрасываем и кэш объявлений
+    bump_generation_on_commit("review", "ads", using=using)
+
+
+@receiver(post_save, sender=Review)
+def count_created_review(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    Ads.objects.filter(pk=instance.ad_id).update(
+        review_count=F("review_count") + 1,
+        last_review_at=Greatest(F("last_review_at"), Value(instance.created_at)),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=Review)
+def count_moved_review(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, "_loaded_ad_id", None)
+    if created or raw or previous is None or previous == instance.ad_id:
+        return
+    # Отзыв перенесли на другое объявление: счётчики обоих пересчитываются по самим отзывам
+    reviews = Review.objects.filter(ad_id=OuterRef("pk")).order_by()
+    Ads.objects.filter(pk__in=[previous, instance.ad_id]).update(
+        review_count=Coalesce(Subquery(reviews.values("ad_id").annotate(count=Count("id")).values("count")), 0),
+        last_review_at=Subquery(reviews.order_by("-created_at").values("created_at")[:1]),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_delete, sender=Review)
+def count_deleted_review(sender, instance, origin=None, **kwargs):
+    # При каскадном удалении самого объявления пересчитывать его счётчики незачем
+    if isinstance(origin, Ads) or getattr(origin, "model", None) is Ads:
+        return
+    latest = Review.objects.filter(ad_id=OuterRef("pk")).order_by("-created_at").values("created_at")[:1]
+    Ads.objects.filter(pk=instance.ad_id).update(
+        review_count=Greatest(F("review_count") - 1, Value(0)),
+        last_review_at=Subquery(latest),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_expanded_authors(sender, instance, created, update_fields=None, using=None, **kwargs):
+    # Автор встраивается в объявления и отзывы (?expand=author); вход меняет только last_login и кэш не трогает
+    public = set(available_fields(PublicUserSerializer).values())
+    if not created and (update_fields is None or public & set(update_fields)):
+        bump_generation_on_commit("ads", "review", using=using)
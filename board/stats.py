@@ -0,0 +1,179 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Ads, AdsDailyStats
+
+# Ключ pg_advisory_xact_lock: пересчёты сводки идут по очереди, чтобы более ранний снимок не перезаписал поздний
+REFRESH_LOCK_KEY = 0x626F617264  # "board"
+
+# Дни, которые копит batched_refresh; None — пересчёт планируется на каждую запись
+_collected_days = ContextVar("board_stats_collected_days", default=None)
+
+
+def day_start(day):
+    """Начало дня в часовом поясе TIME_ZONE — те же границы, что у TruncDate("created_at")."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _created_on(day):
+    return Q(created_at__gte=day_start(day), created_at__lt=day_start(day + timedelta(days=1)))
+
+
+def _bucket_filters():
+    """Условия по цене для корзин BOARD_PRICE_BUCKETS."""
+    bounds = settings.BOARD_PRICE_BUCKETS
+    filters = []
+    for index, lower in enumerate(bounds):
+        condition = Q(price__gte=lower)
+        if index + 1 < len(bounds):
+            condition &= Q(price__lt=bounds[index + 1])
+        filters.append(condition)
+    return filters
+
+
+def _histogram(counts):
+    bounds = settings.BOARD_PRICE_BUCKETS
+    return [
+        {"min": lower, "max": bounds[index + 1] if index + 1 < len(bounds) else None, "count": count or 0}
+        for index, (lower, count) in enumerate(zip(bounds, counts))
+    ]
+
+
+def rebuild(days=None, using=DEFAULT_DB_ALIAS):
+    """Пересчитывает строки сводки за дни days (None — целиком) одним агрегирующим запросом по объявлениям."""
+    queryset = Ads.objects.using(using)
+    if days is not None:
+        days = set(days)
+        if not days:
+            return
+        # Диапазоны по created_at, а не created_at__date: так запрос идёт по индексу board_ads_created_id_idx
+        queryset = queryset.filter(reduce(or_, map(_created_on, days)))
+    buckets = {f"bucket_{index}": Count("id", filter=condition) for index, condition in enumerate(_bucket_filters())}
+    rows = (
+        queryset.annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(count=Count("id"), price_sum=Sum("price"), price_min=Min("price"), price_max=Max("price"), **buckets)
+        .order_by()
+    )
+    stats = [
+        AdsDailyStats(
+            day=row["day"],
+            count=row["count"],
+            price_sum=row["price_sum"],
+            price_min=row["price_min"],
+            price_max=row["price_max"],
+            price_buckets=[row[name] for name in buckets],
+        )
+        for row in rows
+    ]
+    if stats:
+        AdsDailyStats.objects.using(using).bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=["day"],
+            update_fields=["count", "price_sum", "price_min", "price_max", "price_buckets"],
+        )
+    # Дни, в которых не осталось объявлений, удаляются
+    if days is None or len(stats) < len(days):
+        empty = AdsDailyStats.objects.using(using).exclude(day__in=[item.day for item in stats])
+        if days is not None:
+            empty = empty.filter(day__in=days)
+        empty.delete()
+
+
+def refresh_daily_stats(days=None, using=DEFAULT_DB_ALIAS):
+    """Пересчитывает сводку AdsDailyStats за дни days (None — целиком)."""
+    # Вызывается после коммита, поэтому своя транзакция; внутри чужой — без лишней точки сохранения
+    with transaction.atomic(using=using, savepoint=False):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [REFRESH_LOCK_KEY])
+        rebuild(days, using)
+
+
+def schedule_refresh(days, using=DEFAULT_DB_ALIAS):
+    """Пересчитывает сводку за дни days после коммита текущей транзакции (вне транзакции — сразу)."""
+    collected = _collected_days.get()
+    if collected is not None:
+        collected.update(days)
+        return
+    days = set(days)
+    # Ошибка пересчёта не должна ломать уже закоммиченную запись: robust только логирует её
+    transaction.on_commit(lambda: refresh_daily_stats(days, using), using=using, robust=True)
+
+
+@contextmanager
+def batched_refresh(using=DEFAULT_DB_ALIAS):
+    """
+    Копит дни всех записей внутри блока (в том числе из сигналов) и планирует по ним один пересчёт.
+
+    Отдаёт множество дней, в которое можно добавить дни записей, не отправляющих сигналы (bulk_create).
+    """
+    days = set()
+    token = _collected_days.set(days)
+    try:
+        yield days
+    finally:
+        _collected_days.reset(token)
+    if days:
+        schedule_refresh(days, using)
+
+
+def recent_days(days):
+    """Последние days дней по TIME_ZONE, начиная с самого раннего."""
+    today = timezone.localdate()
+    return [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+
+def summary_stats(days):
+    """Статистика по всем объявлениям из сводной таблицы одним запросом."""
+    day_list = recent_days(days)
+    buckets = {f"bucket_{index}": Sum(f"price_buckets__{index}") for index in range(len(settings.BOARD_PRICE_BUCKETS))}
+    per_day = {f"day_{index}": Sum("count", filter=Q(day=day)) for index, day in enumerate(day_list)}
+    row = AdsDailyStats.objects.aggregate(
+        total=Sum("count"),
+        total_price=Sum("price_sum"),
+        min_price=Min("price_min"),
+        max_price=Max("price_max"),
+        **buckets,
+        **per_day,
+    )
+    count = row["total"] or 0
+    return {
+        "count": count,
+        "price": {
+            "min": row["min_price"],
+            "max": row["max_price"],
+            "avg": round(row["total_price"] / count, 2) if count else None,
+        },
+        "histogram": _histogram(row[name] for name in buckets),
+        "days": [{"date": day, "count": row[f"day_{index}"] or 0} for index, day in enumerate(day_list)],
+    }
+
+
+def queryset_stats(queryset, days):
+    """Та же статистика по отфильтрованным объявлениям одним агрегирующим запросом."""
+    day_list = recent_days(days)
+    buckets = {f"bucket_{index}": Count("id", filter=condition) for index, condition in enumerate(_bucket_filters())}
+    per_day = {f"day_{index}": Count("id", filter=_created_on(day)) for index, day in enumerate(day_list)}
+    row = queryset.aggregate(
+        total=Count("id"), min_price=Min("price"), max_price=Max("price"), avg_price=Avg("price"), **buckets, **per_day
+    )
+    return {
+        "count": row["total"],
+        "price": {
+            "min": row["min_price"],
+            "max": row["max_price"],
+            "avg": round(row["avg_price"], 2) if row["avg_price"] is not None else None,
+        },
+        "histogram": _histogram(row[name] for name in buckets),
+        "days": [{"date": day, "count": row[f"day_{index}"]} for index, day in enumerate(day_list)],
+    }
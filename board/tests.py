@@ -1,12 +1,51 @@
+import base64
+import csv
+import gzip
+import importlib
+import io
+import json
+import pstats
+import threading
+import time
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import ANY
+
+import brotli
+import psycopg2
 import pytest
+from django.apps import apps as django_apps
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy as _
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from board.models import Ads, Review
+from board.models import Ads, AdsDailyStats, Review
 from board.filters import AdFilter
+from board.management.commands import import_ads
+from board import cache as board_cache
+from board.stats import refresh_daily_stats
+from board.views import AdsViewSet
+from config import compression
+from config.middleware import get_query_budget
+from config.renderers import ORJSONRenderer
 
 User = get_user_model()
 
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
 @pytest.fixture
 def user():
     return User.objects.create_user(
@@ -348,3 +387,1011 @@ class TestReviewPermissions:
         response = admin_client.delete(f'/board/reviews/{review.id}/')
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not Review.objects.filter(id=review.id).exists()
+
+
+@pytest.mark.django_db
+class TestAdsPagination:
+    def test_cursor_pages_do_not_overlap(self, api_client, user):
+        for i in range(6):
+            Ads.objects.create(title=f'Ad {i}', price=100 * i, description='Description', author=user)
+
+        first = api_client.get('/board/ads/')
+        assert first.status_code == status.HTTP_200_OK
+        assert len(first.data['results']) == 4
+        assert first.data['previous'] is None
+        assert 'count' not in first.data
+
+        second = api_client.get(first.data['next'])
+        assert len(second.data['results']) == 2
+        assert second.data['next'] is None
+
+        titles = [ad['title'] for ad in first.data['results'] + second.data['results']]
+        assert titles == [f'Ad {i}' for i in reversed(range(6))]
+
+        back = api_client.get(second.data['previous'])
+        assert [ad['title'] for ad in back.data['results']] == titles[:4]
+
+    def test_cursor_with_equal_created_at(self, api_client, user):
+        """Объявления с одинаковым временем создания не теряются и не дублируются"""
+        ads = [
+            Ads.objects.create(title=f'Ad {i}', price=100, description='Description', author=user) for i in range(5)
+        ]
+        Ads.objects.update(created_at=ads[0].created_at)
+
+        first = api_client.get('/board/ads/', {'page_size': 2})
+        second = api_client.get(first.data['next'])
+        third = api_client.get(second.data['next'])
+        ids = [ad['id'] for page in (first, second, third) for ad in page.data['results']]
+        assert ids == sorted((ad.id for ad in ads), reverse=True)
+
+    def test_page_size_is_capped(self, api_client, user):
+        Ads.objects.bulk_create(
+            Ads(title=f'Ad {i}', price=100, description='Description', author=user) for i in range(105)
+        )
+        response = api_client.get('/board/ads/', {'page_size': 1000, 'title': 'Ad'})
+        assert len(response.data['results']) == 100
+
+    def test_invalid_cursor(self, api_client):
+        response = api_client.get('/board/ads/', {'cursor': 'garbage'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_malformed_and_mismatched_cursor(self, api_client, user):
+        for i in range(3):
+            Ads.objects.create(title=f'Телефон {i}', price=100 * i, description='Description', author=user)
+        # Курсор DRF — base64 от строки запроса с позицией p
+        cursor = base64.b64encode(b'p=abc%7C1').decode()
+        assert api_client.get('/board/ads/', {'cursor': cursor}).status_code == status.HTTP_404_NOT_FOUND
+        response = api_client.get('/board/ads/', {'cursor': cursor, 'search': 'телефон'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        # Курсор сортировки по умолчанию (created_at) с сортировкой по цене
+        first = api_client.get('/board/ads/', {'page_size': 1})
+        response = api_client.get(first.data['next'] + '&ordering=price')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestAdsSearch:
+    def test_search_title_and_description(self, ads):
+        assert AdFilter({'search': 'iphone'}).qs.get().title == 'iPhone 12'
+        assert AdFilter({'search': 'android'}).qs.get().title == 'Samsung Galaxy'
+
+    def test_search_ranks_title_above_description(self, api_client, user):
+        Ads.objects.create(title='Чехол', price=500, description='Подходит для телефона', author=user)
+        Ads.objects.create(title='Телефон', price=9000, description='Почти новый', author=user)
+        Ads.objects.create(title='Велосипед', price=7000, description='Горный', author=user)
+
+        response = api_client.get('/board/ads/', {'search': 'телефоны'})
+        assert [ad['title'] for ad in response.data['results']] == ['Телефон', 'Чехол']
+        assert 'search_vector' not in response.data['results'][0]
+
+    def test_search_vector_follows_updates(self, ad):
+        ad.title = 'Холодильник'
+        ad.save()
+        assert AdFilter({'search': 'холодильник'}).qs.get() == ad
+
+    def test_search_pagination(self, api_client, user):
+        for i in range(5):
+            Ads.objects.create(title=f'Телефон {i}', price=100, description='Телефон ' * i, author=user)
+
+        first = api_client.get('/board/ads/', {'search': 'телефон', 'page_size': 3})
+        second = api_client.get(first.data['next'])
+        ids = [ad['id'] for ad in first.data['results'] + second.data['results']]
+        assert len(ids) == len(set(ids)) == 5
+
+
+@pytest.mark.django_db
+class TestListResponseCache:
+    def test_anonymous_list_is_cached(self, api_client, ad):
+        first = api_client.get('/board/ads/', HTTP_ACCEPT='application/json')
+        second = api_client.get('/board/ads/', HTTP_ACCEPT='application/json')
+        assert first['X-Cache'] == 'MISS'
+        assert second['X-Cache'] == 'HIT'
+        assert second.content == first.content
+        assert board_cache.get_stats()['ads'] == {'hit': 1, 'miss': 1}
+
+    def test_write_invalidates_cached_pages(self, api_client, user, ad, django_capture_on_commit_callbacks):
+        api_client.get('/board/ads/')
+        with django_capture_on_commit_callbacks(execute=True):
+            Ads.objects.create(title='Fresh Ad', price=10, description='Fresh', author=user)
+        response = api_client.get('/board/ads/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['results'][0]['title'] == 'Fresh Ad'
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ad.delete()
+        response = api_client.get('/board/ads/')
+        assert response['X-Cache'] == 'MISS'
+        assert [item['title'] for item in response.json()['results']] == ['Fresh Ad']
+
+    def test_review_write_invalidates_review_list(self, api_client, review, django_capture_on_commit_callbacks):
+        api_client.get('/board/reviews/')
+        review.text = 'Changed'
+        with django_capture_on_commit_callbacks(execute=True):
+            review.save()
+        response = api_client.get('/board/reviews/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()[0]['text'] == 'Changed'
+
+    def test_generation_bumped_after_commit(self, api_client, user, ad, django_capture_on_commit_callbacks):
+        api_client.get('/board/ads/')
+        generation = board_cache.get_generation('ads')
+        with django_capture_on_commit_callbacks(execute=True):
+            Ads.objects.create(title='Fresh Ad', price=10, description='Fresh', author=user)
+            # До коммита страница остаётся в кэше под прежним поколением и новое поколение не заводится
+            assert board_cache.get_generation('ads') == generation
+        assert board_cache.get_generation('ads') != generation
+
+    def test_query_string_is_part_of_key(self, api_client, ads):
+        api_client.get('/board/ads/', {'title': 'iPhone'})
+        response = api_client.get('/board/ads/', {'title': 'Samsung'})
+        assert response['X-Cache'] == 'MISS'
+        assert [item['title'] for item in response.json()['results']] == ['Samsung Galaxy']
+
+    def test_authenticated_requests_bypass_cache(self, authorized_client, ad):
+        authorized_client.get('/board/ads/')
+        response = authorized_client.get('/board/ads/')
+        assert 'X-Cache' not in response
+
+    def test_compressed_variant_is_cached(self, settings, monkeypatch, api_client, ads):
+        settings.COMPRESSION_MIN_SIZE = 0
+        calls = []
+        original = compression.compress
+
+        def compress(*args, **kwargs):
+            calls.append(args)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(compression, 'compress', compress)
+
+        plain = api_client.get('/board/ads/')
+        for cache_status in ('HIT', 'HIT', 'HIT'):
+            response = api_client.get('/board/ads/', HTTP_ACCEPT_ENCODING='gzip')
+            assert response['X-Cache'] == cache_status
+            assert response['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(response.content) == plain.content
+        assert len(calls) == 1
+
+        response = api_client.get('/board/ads/', HTTP_ACCEPT_ENCODING='br, gzip')
+        assert response['Content-Encoding'] == 'br'
+        assert brotli.decompress(response.content) == plain.content
+        assert len(calls) == 2
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+    def test_ad_detail_not_modified(self, api_client, ad):
+        response = api_client.get(f'/board/ads/{ad.id}/')
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        response = api_client.get(f'/board/ads/{ad.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert response.content == b''
+
+    def test_ad_detail_changes_etag_on_update(self, api_client, ad):
+        etag = api_client.get(f'/board/ads/{ad.id}/')['ETag']
+        ad.price = 1500
+        ad.save()
+        response = api_client.get(f'/board/ads/{ad.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_ad_detail_if_modified_since(self, api_client, ad):
+        last_modified = api_client.get(f'/board/ads/{ad.id}/')['Last-Modified']
+        response = api_client.get(f'/board/ads/{ad.id}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_list_not_modified_until_write(self, api_client, user, ad, django_capture_on_commit_callbacks):
+        etag = api_client.get('/board/ads/')['ETag']
+        assert api_client.get('/board/ads/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Ads.objects.create(title='Fresh Ad', price=10, description='Fresh', author=user)
+        assert api_client.get('/board/ads/', HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test_list_has_no_last_modified(self, api_client, user, ad, django_capture_on_commit_callbacks):
+        response = api_client.get('/board/ads/')
+        assert not response.has_header('Last-Modified')
+        # Запись в ту же секунду не должна превращаться в 304 по If-Modified-Since
+        since = http_date(time.time() + 1)
+        with django_capture_on_commit_callbacks(execute=True):
+            Ads.objects.create(title='Fresh Ad', price=10, description='Fresh', author=user)
+        response = api_client.get('/board/ads/', HTTP_IF_MODIFIED_SINCE=since)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_review_list_and_detail_have_etag(self, api_client, review):
+        assert api_client.get('/board/reviews/').has_header('ETag')
+        etag = api_client.get(f'/board/reviews/{review.id}/')['ETag']
+        response = api_client.get(f'/board/reviews/{review.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_update_with_stale_if_match(self, authorized_client, ad):
+        etag = authorized_client.get(f'/board/ads/{ad.id}/')['ETag']
+        Ads.objects.filter(id=ad.id).update(price=1, updated_at=ad.updated_at.replace(year=2030))
+
+        response = authorized_client.patch(f'/board/ads/{ad.id}/', {'price': 5}, HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert Ads.objects.get(id=ad.id).price == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_updates_with_same_if_match(self, monkeypatch, user_token, ad):
+        clients = [APIClient(), APIClient()]
+        for client in clients:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {user_token}')
+        etag = clients[0].get(f'/board/ads/{ad.id}/')['ETag']
+
+        # Первая запись задерживается после проверки If-Match, вторая приходит с тем же ETag
+        checked = threading.Event()
+        perform_update = AdsViewSet.perform_update
+
+        def slow_update(view, serializer):
+            if threading.current_thread().name == 'first':
+                checked.set()
+                time.sleep(0.3)
+            perform_update(view, serializer)
+
+        monkeypatch.setattr(AdsViewSet, 'perform_update', slow_update)
+        responses = {}
+
+        def first():
+            responses['first'] = clients[0].patch(f'/board/ads/{ad.id}/', {'price': 5}, HTTP_IF_MATCH=etag)
+            connection.close()
+
+        thread = threading.Thread(target=first, name='first')
+        thread.start()
+        assert checked.wait(5)
+        second = clients[1].patch(f'/board/ads/{ad.id}/', {'price': 7}, HTTP_IF_MATCH=etag)
+        thread.join()
+        assert responses['first'].status_code == status.HTTP_200_OK
+        assert second.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert Ads.objects.get(id=ad.id).price == 5
+
+    def test_update_with_current_if_match(self, authorized_client, ad):
+        etag = authorized_client.get(f'/board/ads/{ad.id}/')['ETag']
+        response = authorized_client.patch(f'/board/ads/{ad.id}/', {'price': 5}, HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_update_with_compressed_etag(self, settings, authorized_client, ad):
+        settings.COMPRESSION_MIN_SIZE = 0
+        etag = authorized_client.get(f'/board/ads/{ad.id}/', HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        assert etag.startswith('W/"')
+        response = authorized_client.patch(f'/board/ads/{ad.id}/', {'price': 5}, HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_missing_ad_is_404(self, api_client):
+        assert api_client.get('/board/ads/999999/').status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestAdReviews:
+    def test_list_is_paginated_per_ad(self, api_client, user, ad):
+        other_ad = Ads.objects.create(title='Other Ad', price=1, description='Other', author=user)
+        Review.objects.create(text='Other Review', author=user, ad=other_ad)
+        for i in range(12):
+            Review.objects.create(text=f'Review {i}', author=user, ad=ad)
+
+        first = api_client.get(f'/board/ads/{ad.id}/reviews/')
+        assert first.status_code == status.HTTP_200_OK
+        assert len(first.data['results']) == 10
+        second = api_client.get(first.data['next'])
+        texts = [review['text'] for review in first.data['results'] + second.data['results']]
+        assert texts == [f'Review {i}' for i in reversed(range(12))]
+
+    def test_list_for_missing_ad(self, api_client):
+        assert api_client.get('/board/ads/999999/reviews/').status_code == status.HTTP_404_NOT_FOUND
+
+    def test_create_review_for_ad(self, authorized_client, user, ad):
+        response = authorized_client.post(f'/board/ads/{ad.id}/reviews/', {'text': 'Nested Review'})
+        assert response.status_code == status.HTTP_201_CREATED
+        review = Review.objects.get(id=response.data['id'])
+        assert review.ad == ad
+        assert review.author == user
+
+    def test_create_review_anonymous(self, api_client, ad):
+        response = api_client.post(f'/board/ads/{ad.id}/reviews/', {'text': 'Nested Review'})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_counters_follow_reviews(self, user, ad):
+        first = Review.objects.create(text='First', author=user, ad=ad)
+        second = Review.objects.create(text='Second', author=user, ad=ad)
+        ad.refresh_from_db()
+        assert ad.review_count == 2
+        assert ad.last_review_at == second.created_at
+
+        second.delete()
+        ad.refresh_from_db()
+        assert ad.review_count == 1
+        assert ad.last_review_at == first.created_at
+
+        first.delete()
+        ad.refresh_from_db()
+        assert ad.review_count == 0
+        assert ad.last_review_at is None
+
+    def test_counters_follow_moved_review(self, authorized_client, user, ad):
+        other = Ads.objects.create(title='Other', price=100, description='Description', author=user)
+        first = Review.objects.create(text='First', author=user, ad=ad)
+        second = Review.objects.create(text='Second', author=user, ad=ad)
+
+        response = authorized_client.patch(f'/board/reviews/{second.id}/', {'ad': other.id})
+        assert response.status_code == status.HTTP_200_OK
+        ad.refresh_from_db()
+        other.refresh_from_db()
+        assert (ad.review_count, ad.last_review_at) == (1, first.created_at)
+        assert (other.review_count, other.last_review_at) == (1, second.created_at)
+
+        first.ad = other
+        first.save()
+        ad.refresh_from_db()
+        other.refresh_from_db()
+        assert (ad.review_count, ad.last_review_at) == (0, None)
+        assert (other.review_count, other.last_review_at) == (2, second.created_at)
+
+    def test_counters_are_read_only(self, authorized_client, ad):
+        response = authorized_client.patch(f'/board/ads/{ad.id}/', {'review_count': 100})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['review_count'] == 0
+
+    def test_counters_in_ad_list(self, api_client, review, django_capture_on_commit_callbacks):
+        api_client.get('/board/ads/')
+        with django_capture_on_commit_callbacks(execute=True):
+            Review.objects.create(text='Second', author=review.author, ad=review.ad)
+        response = api_client.get('/board/ads/')
+        assert response.data['results'][0]['review_count'] == 2
+
+
+@pytest.fixture
+def assert_query_budget(django_capture_on_commit_callbacks):
+    """
+    Выполняет запрос и проверяет, что число SQL-запросов не превышает query_budget представления.
+
+    Обработчики on_commit (пересчёт сводки board.stats) выполняются и учитываются в бюджете.
+    """
+
+    def request(client, method, path, data=None, **extra):
+        budget = get_query_budget(resolve(path.split('?')[0]).func, method)
+        assert budget is not None, f'No query budget declared for {method} {path}'
+        with CaptureQueriesContext(connection) as queries, django_capture_on_commit_callbacks(execute=True):
+            response = getattr(client, method.lower())(path, data, **extra)
+        assert len(queries) <= budget, '\n'.join(query['sql'] for query in queries.captured_queries)
+        return response
+
+    return request
+
+
+@pytest.fixture
+def many_reviews(user, ad):
+    other_user = User.objects.create_user(email='other@example.com', username='other', password='otherpass123')
+    for i in range(5):
+        extra_ad = Ads.objects.create(title=f'Ad {i}', price=i, description='Description', author=other_user)
+        Review.objects.create(text=f'Review {i}', author=other_user, ad=extra_ad)
+        Review.objects.create(text=f'Own Review {i}', author=user, ad=ad)
+    return Review.objects.filter(author=user).first()
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    def test_ads_read(self, api_client, authorized_client, assert_query_budget, many_reviews):
+        ad = many_reviews.ad
+        assert assert_query_budget(api_client, 'GET', '/board/ads/').status_code == status.HTTP_200_OK
+        assert assert_query_budget(authorized_client, 'GET', '/board/ads/?search=ad').status_code == status.HTTP_200_OK
+        assert assert_query_budget(authorized_client, 'GET', f'/board/ads/{ad.id}/').status_code == status.HTTP_200_OK
+        response = assert_query_budget(authorized_client, 'GET', f'/board/ads/{ad.id}/reviews/')
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_ads_write(self, authorized_client, assert_query_budget, many_reviews):
+        ad = many_reviews.ad
+        data = {'title': 'Budget Ad', 'price': 10, 'description': 'Budget'}
+        assert assert_query_budget(authorized_client, 'POST', '/board/ads/', data).status_code == 201
+        assert assert_query_budget(authorized_client, 'PUT', f'/board/ads/{ad.id}/', data).status_code == 200
+        assert assert_query_budget(authorized_client, 'PATCH', f'/board/ads/{ad.id}/', {'price': 1}).status_code == 200
+        response = assert_query_budget(authorized_client, 'POST', f'/board/ads/{ad.id}/reviews/', {'text': 'New'})
+        assert response.status_code == status.HTTP_201_CREATED
+        assert assert_query_budget(authorized_client, 'DELETE', f'/board/ads/{ad.id}/').status_code == 204
+
+    def test_reviews(self, authorized_client, assert_query_budget, many_reviews):
+        review = many_reviews
+        data = {'text': 'Budget Review', 'ad': review.ad.id}
+        assert assert_query_budget(authorized_client, 'GET', '/board/reviews/').status_code == 200
+        assert assert_query_budget(authorized_client, 'GET', f'/board/reviews/{review.id}/').status_code == 200
+        assert assert_query_budget(authorized_client, 'POST', '/board/reviews/', data).status_code == 201
+        assert assert_query_budget(authorized_client, 'PUT', f'/board/reviews/{review.id}/', data).status_code == 200
+        assert assert_query_budget(authorized_client, 'DELETE', f'/board/reviews/{review.id}/').status_code == 204
+
+    def test_debug_middleware_reports_queries(self, settings, ad):
+        settings.DEBUG = True
+        response = APIClient().get(f'/board/ads/{ad.id}/')
+        assert int(response['X-DB-Query-Count']) >= 1
+        assert response['X-DB-Query-Budget'] == '3'
+        assert 'X-DB-Query-Time-Ms' in response
+
+
+@pytest.mark.django_db
+class TestAdsBulk:
+    def test_mixed_operations(self, authorized_client, user, assert_query_budget):
+        to_update = Ads.objects.create(title='Old', price=1, description='Old', author=user)
+        to_delete = Ads.objects.create(title='Gone', price=1, description='Gone', author=user)
+        operations = [
+            {'op': 'create', 'data': {'title': f'Bulk {i}', 'price': i, 'description': 'Bulk'}} for i in range(3)
+        ] + [
+            {'op': 'update', 'id': to_update.id, 'data': {'price': 500}},
+            {'op': 'delete', 'id': to_delete.id},
+        ]
+
+        response = assert_query_budget(authorized_client, 'POST', '/board/ads/bulk/', operations, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data['results']
+        assert [item['status'] for item in results] == ['created'] * 3 + ['updated', 'deleted']
+        assert Ads.objects.filter(title__startswith='Bulk', author=user).count() == 3
+        assert Ads.objects.get(id=results[0]['id']).title == 'Bulk 0'
+
+        to_update.refresh_from_db()
+        assert (to_update.title, to_update.price) == ('Old', 500)
+        assert to_update.updated_at > to_update.created_at
+        assert not Ads.objects.filter(id=to_delete.id).exists()
+
+    def test_invalid_batch_is_not_written(self, authorized_client, user):
+        foreign = Ads.objects.create(
+            title='Foreign', price=1, description='Foreign',
+            author=User.objects.create_user(email='other@example.com', username='other', password='otherpass123')
+        )
+        operations = [
+            {'op': 'create', 'data': {'title': 'Bulk', 'price': 1, 'description': 'Bulk'}},
+            {'op': 'create', 'data': {'title': 'No price', 'description': 'Bulk'}},
+            {'op': 'delete', 'id': foreign.id},
+            {'op': 'update', 'id': 999999, 'data': {'price': 1}},
+        ]
+        response = authorized_client.post('/board/ads/bulk/', operations, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [item['status'] for item in response.data['results']] == ['valid', 'error', 'error', 'error']
+        assert 'price' in response.data['results'][1]['errors']
+        assert not Ads.objects.filter(title='Bulk').exists()
+        assert Ads.objects.filter(id=foreign.id).exists()
+
+    def test_bulk_invalidates_list_cache(self, authorized_client, ad):
+        anonymous_client = APIClient()
+        anonymous_client.get('/board/ads/')
+        authorized_client.post('/board/ads/bulk/', [
+            {'op': 'create', 'data': {'title': 'Bulk', 'price': 1, 'description': 'Bulk'}}
+        ], format='json')
+        response = anonymous_client.get('/board/ads/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['results'][0]['title'] == 'Bulk'
+
+    def test_anonymous_rejected(self, api_client):
+        response = api_client.post('/board/ads/bulk/', [], format='json')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestExport:
+    @pytest.fixture(autouse=True)
+    def no_lag(self, settings):
+        settings.BOARD_EXPORT_LAG = 0
+
+    def test_ndjson_export(self, admin_client, assert_query_budget, review):
+        response = assert_query_budget(admin_client, 'GET', '/board/export/?kind=ads')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert len(lines) == 1
+        row = json.loads(lines[0])
+        assert row['title'] == 'Test Ad'
+        assert row['review_count'] == 1
+
+    def test_csv_export_since_watermark(self, admin_client, user):
+        old = Ads.objects.create(title='Old', price=1, description='Old', author=user)
+        Ads.objects.create(title='New', price=2, description='New', author=user)
+        response = admin_client.get('/board/export/', {
+            'kind': 'ads', 'output': 'csv', 'since': old.created_at.isoformat()
+        })
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        assert rows[0][:3] == ['id', 'title', 'price']
+        assert [row[1] for row in rows[1:]] == ['New']
+
+    def test_watermark_stays_behind_recent_rows(self, settings, user, tmp_path):
+        settings.BOARD_EXPORT_LAG = 60
+        old = Ads.objects.create(title='Old', price=1, description='Old', author=user)
+        Ads.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(minutes=5))
+        old.refresh_from_db()
+        # Свежая строка могла бы принадлежать транзакции, которая ещё не закоммичена
+        Ads.objects.create(title='Recent', price=2, description='Recent', author=user)
+
+        output = tmp_path / 'ads.ndjson'
+        stderr = io.StringIO()
+        call_command('export_board', 'ads', '--output', str(output), stderr=stderr)
+        assert [json.loads(line)['title'] for line in output.read_text().splitlines()] == ['Old']
+        assert old.created_at.isoformat() in stderr.getvalue()
+
+    def test_export_requires_staff(self, authorized_client):
+        assert authorized_client.get('/board/export/').status_code == status.HTTP_403_FORBIDDEN
+
+    def test_export_validates_params(self, admin_client):
+        assert admin_client.get('/board/export/', {'kind': 'users'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert admin_client.get('/board/export/', {'since': 'yesterday'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_export_command(self, review, tmp_path):
+        output = tmp_path / 'reviews.ndjson'
+        stderr = io.StringIO()
+        call_command('export_board', 'reviews', '--output', str(output), stderr=stderr)
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [row['text'] for row in rows] == ['Test Review']
+        assert review.created_at.isoformat() in stderr.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportAds:
+    @pytest.mark.parametrize('defer_indexes', [False, True])
+    def test_import_ads_and_reviews(self, user, tmp_path, defer_indexes):
+        ads_file = tmp_path / 'ads.csv'
+        ads_file.write_text(
+            'title,price,description,author_email,created_at\n'
+            'Телефон,1000,"Почти новый, с чехлом",test@example.com,2024-01-02T10:00:00+00:00\n'
+            'Без автора,500,,,\n'
+            'Плохая цена,-1,Описание,test@example.com,\n'
+            'Чужой,100,Описание,nobody@example.com,\n',
+            encoding='utf-8'
+        )
+        rejects = tmp_path / 'rejects.ndjson'
+        args = [str(ads_file), '--batch-size', '2', '--rejects', str(rejects)]
+        if defer_indexes:
+            args.append('--defer-indexes')
+        call_command('import_ads', *args, stdout=io.StringIO())
+
+        phone = Ads.objects.get(title='Телефон')
+        assert phone.author == user
+        assert phone.description == 'Почти новый, с чехлом'
+        assert phone.created_at.year == 2024
+        assert Ads.objects.get(title='Без автора').description == ''
+        assert AdFilter({'search': 'телефон'}).qs.get() == phone
+        assert [json.loads(line)['line'] for line in rejects.read_text().splitlines()] == [3, 4]
+
+        reviews_file = tmp_path / 'reviews.ndjson'
+        reviews_file.write_text('\n'.join(json.dumps(row) for row in [
+            {'ad_id': phone.id, 'text': 'Отличный', 'author_email': 'test@example.com'},
+            {'ad_id': phone.id, 'text': 'Хороший'},
+            {'ad_id': 999999, 'text': 'Потерянный'},
+        ]), encoding='utf-8')
+        empty_file = tmp_path / 'empty.csv'
+        empty_file.write_text('title,price,description\n', encoding='utf-8')
+        call_command('import_ads', str(empty_file), '--reviews', str(reviews_file), stdout=io.StringIO())
+        phone.refresh_from_db()
+        assert phone.review_count == 2
+        assert phone.last_review_at is not None
+
+    def test_malformed_ndjson_line_is_rejected(self, tmp_path):
+        ads_file = tmp_path / 'ads.ndjson'
+        ads_file.write_text(
+            '{"title": "Первое", "price": 100}\n'
+            '{"title": "Оборванное", "price\n'
+            '[1, 2]\n'
+            '{"title": "Последнее", "price": 200}\n',
+            encoding='utf-8'
+        )
+        rejects = tmp_path / 'rejects.ndjson'
+        call_command('import_ads', str(ads_file), '--rejects', str(rejects), stdout=io.StringIO())
+
+        assert set(Ads.objects.values_list('title', flat=True)) == {'Первое', 'Последнее'}
+        records = [json.loads(line) for line in rejects.read_text().splitlines()]
+        assert [(record['line'], record['row']) for record in records] == [
+            (2, '{"title": "Оборванное", "price'),
+            (3, '[1, 2]'),
+        ]
+        assert all(record['errors'][0].startswith('Некорректный JSON') for record in records)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_deferred_indexes_invisible_to_other_sessions(self, monkeypatch, tmp_path):
+        other = psycopg2.connect(**connection.get_connection_params())
+
+        def indexes():
+            with other.cursor() as cursor:
+                cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'board_ads'")
+                names = {row[0] for row in cursor.fetchall()}
+                cursor.execute("SELECT tgenabled FROM pg_trigger WHERE tgname = 'board_ads_search_vector_update'")
+                return names, cursor.fetchone()[0]
+
+        before = indexes()
+        seen = []
+        copy = import_ads.Command.copy
+
+        def checked_copy(*args, **kwargs):
+            # Индексы удалены в ещё не закоммиченной транзакции загрузки: другие сессии их видят
+            seen.append(indexes())
+            return copy(*args, **kwargs)
+
+        monkeypatch.setattr(import_ads.Command, 'copy', checked_copy)
+        ads_file = tmp_path / 'ads.csv'
+        ads_file.write_text('title,price,description\nТелефон,1000,Описание\n', encoding='utf-8')
+        try:
+            call_command('import_ads', str(ads_file), '--defer-indexes', stdout=io.StringIO())
+            assert seen == [before]
+            assert indexes() == before
+        finally:
+            other.close()
+        assert Ads.objects.filter(title='Телефон').exists()
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    def test_ads_list_matches_sync_path(self, api_client, user):
+        for i in range(6):
+            Ads.objects.create(title=f'Ad {i}', price=100 * i, description='Description', author=user)
+
+        sync_page = api_client.get('/board/ads/', {'page_size': 4})
+        async_page = api_client.get('/board/async/ads/', {'page_size': 4})
+        assert async_page.status_code == status.HTTP_200_OK
+        assert async_page.json()['results'] == sync_page.json()['results']
+
+        second = api_client.get(async_page.json()['next'])
+        assert [ad['title'] for ad in second.json()['results']] == ['Ad 1', 'Ad 0']
+
+    def test_ads_list_filters(self, api_client, ads):
+        response = api_client.get('/board/async/ads/', {'search': 'iphone'})
+        assert [ad['title'] for ad in response.json()['results']] == ['iPhone 12']
+        assert api_client.get('/board/async/ads/', {'cursor': 'garbage'}).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_detail(self, api_client, review):
+        response = api_client.get(f'/board/async/ads/{review.ad_id}/')
+        assert response.json()['review_count'] == 1
+        assert api_client.get(f'/board/async/reviews/{review.id}/').json()['text'] == review.text
+        assert api_client.get('/board/async/reviews/').json()[0]['id'] == review.id
+        assert api_client.get('/board/async/ads/999999/').status_code == status.HTTP_404_NOT_FOUND
+
+    def test_read_only(self, authorized_client):
+        response = authorized_client.post('/board/async/ads/', {'title': 'Ad'})
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+
+@pytest.mark.django_db
+class TestAdsFiltersAndOrdering:
+    @pytest.fixture
+    def priced_ads(self, user):
+        other = User.objects.create_user(email='other@example.com', password='testpass123', username='other')
+        ads = [
+            Ads.objects.create(title=f'Ad {price}', price=price, description='Description', author=author)
+            for price, author in [(300, user), (100, other), (500, user), (200, user), (400, other)]
+        ]
+        return ads, other
+
+    def test_filters(self, api_client, user, priced_ads):
+        ads, other = priced_ads
+        response = api_client.get('/board/ads/', {'price_min': 200, 'price_max': 400, 'page_size': 10})
+        assert sorted(ad['price'] for ad in response.data['results']) == [200, 300, 400]
+
+        response = api_client.get('/board/ads/', {'author': other.id, 'page_size': 10})
+        assert sorted(ad['price'] for ad in response.data['results']) == [100, 400]
+
+        Ads.objects.filter(price__gte=400).update(created_at='2024-01-01T00:00:00Z')
+        response = api_client.get('/board/ads/', {'created_before': '2024-06-01T00:00:00Z', 'page_size': 10})
+        assert sorted(ad['price'] for ad in response.data['results']) == [400, 500]
+        response = api_client.get('/board/ads/', {'created_after': '2024-06-01T00:00:00Z', 'page_size': 10})
+        assert len(response.data['results']) == 3
+
+        assert api_client.get('/board/ads/', {'price_min': 'cheap'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize('ordering, expected', [
+        ('price', [100, 200, 300, 400, 500]),
+        ('-price', [500, 400, 300, 200, 100]),
+        ('created_at', [300, 100, 500, 200, 400]),
+        ('title', [400, 200, 500, 100, 300]),  # Не из списка разрешённых — сортировка по умолчанию
+    ])
+    def test_ordering_with_cursor_pagination(self, api_client, priced_ads, ordering, expected):
+        response = api_client.get('/board/ads/', {'ordering': ordering, 'page_size': 2})
+        prices = [ad['price'] for ad in response.data['results']]
+        while response.data['next']:
+            response = api_client.get(response.data['next'])
+            prices += [ad['price'] for ad in response.data['results']]
+        assert prices == expected
+
+        async_response = api_client.get('/board/async/ads/', {'ordering': ordering, 'page_size': 5})
+        assert [ad['price'] for ad in async_response.json()['results']] == expected
+
+    def test_ordering_overrides_search_rank(self, api_client, user):
+        Ads.objects.create(title='Телефон', price=900, description='Телефон, телефон', author=user)
+        Ads.objects.create(title='Чехол', price=100, description='Для телефона', author=user)
+        response = api_client.get('/board/ads/', {'search': 'телефон', 'ordering': 'price'})
+        assert [ad['price'] for ad in response.data['results']] == [100, 900]
+
+    @pytest.mark.parametrize('params, ordering, index', [
+        ({}, ('-created_at', '-id'), 'board_ads_created_id_idx'),
+        ({'created_after': '2024-01-01T00:00:00Z'}, ('-created_at', '-id'), 'board_ads_created_id_idx'),
+        ({'price_min': 100, 'price_max': 500}, ('price', 'id'), 'board_ads_price_id_idx'),
+        ({'price_min': 100}, ('-price', '-id'), 'board_ads_price_id_idx'),
+        ({'author': 1}, ('-created_at', '-id'), 'board_ads_author_created_idx'),
+        ({'author': 1, 'price_max': 500}, ('price', 'id'), 'board_ads_author_price_idx'),
+    ])
+    def test_filter_and_ordering_use_index(self, params, ordering, index):
+        Ads.objects.bulk_create(
+            Ads(title=f'Ad {i}', price=i, description='Description') for i in range(0, 1000, 2)
+        )
+        queryset = AdFilter(params, queryset=Ads.objects.all()).qs.order_by(*ordering)[:5]
+        with connection.cursor() as cursor:
+            # Статистика по тем же строкам в каждом прогоне: без неё оценки индексов совпадают и выбор случаен
+            cursor.execute('ANALYZE board_ads')
+            # На маленькой таблице планировщик выбрал бы полное сканирование;
+            # запрет действует до конца транзакции теста
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        assert f'Index Scan using {index}' in plan or f'Index Scan Backward using {index}' in plan, plan
+        # Порядок даёт сам индекс — отдельной сортировки нет
+        assert 'Sort' not in plan, plan
+
+
+@pytest.mark.django_db
+class TestAdsStats:
+    def stats(self, client, **params):
+        response = client.get('/board/ads/stats/', params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()
+
+    def test_summary_follows_writes(self, api_client, authorized_client, user, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            cheap = Ads.objects.create(title='Cheap', price=500, description='Description', author=user)
+            Ads.objects.create(title='Middle', price=3000, description='Description', author=user)
+            Ads.objects.create(title='Expensive', price=200000, description='Description', author=user)
+        today = timezone.localdate()
+        summary = AdsDailyStats.objects.get(day=today)
+        assert (summary.count, summary.price_min, summary.price_max) == (3, 500, 200000)
+        assert summary.price_buckets == [1, 1, 0, 0, 0, 1]
+
+        data = self.stats(api_client)
+        assert data['count'] == 3
+        assert data['price'] == {'min': 500, 'max': 200000, 'avg': 67833.33}
+        assert data['histogram'][0] == {'min': 0, 'max': 1000, 'count': 1}
+        assert data['histogram'][-1] == {'min': 100000, 'max': None, 'count': 1}
+        assert len(data['days']) == settings.BOARD_STATS_DAYS
+        assert data['days'][-1] == {'date': today.isoformat(), 'count': 3}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authorized_client.patch(f'/board/ads/{cheap.id}/', {'price': 7000})
+            authorized_client.post('/board/ads/bulk/', [
+                {'op': 'create', 'data': {'title': 'Bulk', 'price': 60000, 'description': 'Bulk'}},
+                {'op': 'delete', 'id': cheap.id},
+            ], format='json')
+        data = self.stats(api_client)
+        assert data['count'] == 3
+        assert data['price']['min'] == 3000
+        assert [bucket['count'] for bucket in data['histogram']] == [0, 1, 0, 0, 1, 1]
+
+    def test_empty_days_removed(self, user):
+        ad = Ads.objects.create(title='Old', price=100, description='Description', author=user)
+        Ads.objects.filter(id=ad.id).update(created_at=timezone.now() - timedelta(days=3))
+        refresh_daily_stats()
+        assert list(AdsDailyStats.objects.values_list('day', flat=True)) == [timezone.localdate() - timedelta(days=3)]
+
+        ad.refresh_from_db()
+        ad.delete()
+        refresh_daily_stats([timezone.localdate(ad.created_at)])
+        assert not AdsDailyStats.objects.exists()
+
+    def test_migration_fills_summary(self, user):
+        for price, days_ago in [(300, 0), (1500, 1), (8000, 1), (200000, 10)]:
+            ad = Ads.objects.create(title=f'Ad {price}', price=price, description='Description', author=user)
+            Ads.objects.filter(id=ad.id).update(created_at=timezone.now() - timedelta(days=days_ago))
+        refresh_daily_stats()
+        expected = list(AdsDailyStats.objects.order_by('day').values())
+        AdsDailyStats.objects.all().delete()
+
+        migration = importlib.import_module('board.migrations.0009_adsdailystats')
+        migration.fill_daily_stats(django_apps, SimpleNamespace(connection=connection))
+        assert list(AdsDailyStats.objects.order_by('day').values()) == expected
+
+    def test_filtered_stats_match_list(self, api_client, user):
+        other = User.objects.create_user(email='other@example.com', password='testpass123', username='other')
+        for price, author, days_ago in [(300, user, 0), (1500, other, 1), (8000, user, 1), (70000, user, 10)]:
+            ad = Ads.objects.create(title=f'Ad {price}', price=price, description='Description', author=author)
+            Ads.objects.filter(id=ad.id).update(created_at=timezone.now() - timedelta(days=days_ago))
+        refresh_daily_stats()
+
+        # Без фильтров сводная таблица и агрегат по объявлениям дают один и тот же ответ
+        assert self.stats(api_client) == self.stats(api_client, price_min=0)
+
+        params = {'author': user.id, 'price_max': 10000}
+        data = self.stats(api_client, **params, days=2)
+        listed = api_client.get('/board/ads/', params).data['results']
+        assert data['count'] == len(listed) == 2
+        assert data['price'] == {'min': 300, 'max': 8000, 'avg': 4150.0}
+        assert [day['count'] for day in data['days']] == [1, 1]
+        assert sum(bucket['count'] for bucket in data['histogram']) == 2
+
+        assert self.stats(api_client, search='нет такого')['count'] == 0
+        assert api_client.get('/board/ads/stats/', {'price_min': 'cheap'}).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/board/ads/stats/', {'days': 0}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_single_query(self, api_client, assert_query_budget, django_assert_num_queries, ad):
+        with django_assert_num_queries(1):
+            self.stats(api_client)
+        with django_assert_num_queries(1):
+            self.stats(api_client, price_min=100, created_after='2024-01-01T00:00:00Z', ordering='price')
+        assert assert_query_budget(api_client, 'GET', '/board/ads/stats/?search=ad').status_code == 200
+
+
+@pytest.mark.django_db
+class TestFastRead:
+    @pytest.fixture
+    def catalog(self, user):
+        ads = [
+            Ads.objects.create(
+                title=f'Телефон {i}', price=i * 100, description='Новый телефон "в коробке"\t', author=user
+            )
+            for i in range(6)
+        ]
+        Ads.objects.create(title='Без автора', price=1, description='Description')
+        for ad in ads[:2]:
+            Review.objects.create(text='Отличный продавец', author=user, ad=ad)
+        return ads
+
+    @pytest.mark.parametrize('path, params', [
+        ('/board/ads/', {}),
+        ('/board/ads/', {'page_size': 3, 'ordering': 'price'}),
+        ('/board/ads/', {'search': 'телефон', 'page_size': 2}),
+        ('/board/ads/', {'price_min': 200, 'author': 0}),
+        ('/board/reviews/', {}),
+    ])
+    def test_list_matches_serializer(self, settings, api_client, catalog, path, params):
+        settings.BOARD_FAST_READ = False
+        expected = api_client.get(path, params)
+        cache.clear()
+        settings.BOARD_FAST_READ = True
+        response = api_client.get(path, params)
+        assert response.status_code == expected.status_code == status.HTTP_200_OK
+        assert response.content == expected.content
+
+        # Следующая страница по курсору быстрого пути совпадает с обычной
+        next_url = response.json().get('next') if isinstance(response.json(), dict) else None
+        if next_url:
+            settings.BOARD_FAST_READ = False
+            expected = api_client.get(next_url)
+            settings.BOARD_FAST_READ = True
+            assert api_client.get(next_url).content == expected.content
+
+    def test_retrieve_matches_serializer(self, settings, api_client, authorized_client, catalog):
+        ad = catalog[0]
+        Ads.objects.filter(id=ad.id).update(last_review_at=timezone.now())
+        for path in (f'/board/ads/{ad.id}/', f'/board/reviews/{ad.reviews.first().id}/'):
+            settings.BOARD_FAST_READ = False
+            expected = api_client.get(path)
+            settings.BOARD_FAST_READ = True
+            assert api_client.get(path).content == expected.content
+        assert authorized_client.get('/board/ads/999999/').status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get('/board/ads/abc/').status_code == status.HTTP_404_NOT_FOUND
+
+    def test_query_count(self, settings, api_client, django_assert_num_queries, catalog):
+        settings.BOARD_FAST_READ = True
+        with django_assert_num_queries(1):
+            api_client.get('/board/ads/', {'page_size': 5})
+        with django_assert_num_queries(2):  # ETag по updated_at и сама строка
+            api_client.get(f'/board/ads/{catalog[0].id}/')
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'Юникод \u2028\u2029 "кавычки" \\ \x00\x1f\n\t',
+            'when': timezone.now(),
+            'date': timezone.localdate(),
+            'lazy': _('Not found.'),
+            'numbers': [0, -1, 2**40, 1.5, None, True],
+            1: 'integer key',
+        }
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert ORJSONRenderer().render({'big': 2**70}) == JSONRenderer().render({'big': 2**70})
+        indented = ORJSONRenderer().render(data, 'application/json; indent=2')
+        assert indented == JSONRenderer().render(data, 'application/json; indent=2')
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+    @pytest.fixture
+    def listing(self, user):
+        for price in (300, 100, 200):
+            Ads.objects.create(title=f'Ad {price}', price=price, description='Long description ' * 20, author=user)
+        Ads.objects.create(title='Anonymous', price=50, description='Description')
+
+    def test_fields_narrow_response_and_select(self, api_client, listing):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get('/board/ads/', {'fields': 'price,id,title', 'ordering': 'price', 'page_size': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == [
+            {'id': ANY, 'title': 'Anonymous', 'price': 50},
+            {'id': ANY, 'title': 'Ad 100', 'price': 100},
+        ]
+        assert len(queries) == 1 and 'description' not in queries[0]['sql']
+        # Курсор строится по столбцу сортировки, даже если его нет среди полей
+        response = api_client.get(response.data['next'])
+        assert [ad['price'] for ad in response.data['results']] == [200, 300]
+
+    def test_expand_author(self, api_client, django_assert_num_queries, user, listing):
+        with django_assert_num_queries(1):
+            response = api_client.get('/board/ads/', {'expand': 'author', 'page_size': 10})
+        authors = {ad['title']: ad['author'] for ad in response.data['results']}
+        assert authors['Ad 100'] == {
+            'id': user.id, 'username': 'test', 'first_name': 'Test', 'last_name': 'User', 'avatar_thumbnails': None,
+        }
+        assert authors['Anonymous'] is None
+
+        response = api_client.get('/board/ads/', {'fields': 'id,author', 'expand': 'author'})
+        assert set(response.data['results'][0]) == {'id', 'author'}
+        response = api_client.get('/board/reviews/', {'expand': 'author'})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_invalid_parameters(self, api_client, listing):
+        response = api_client.get('/board/ads/', {'fields': 'id,password'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'fields' in response.data
+        response = api_client.get('/board/ads/', {'expand': 'ad'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_retrieve_validators_depend_on_fieldset(self, api_client, user, ad, django_capture_on_commit_callbacks):
+        full = api_client.get(f'/board/ads/{ad.id}/')
+        narrow = api_client.get(f'/board/ads/{ad.id}/', {'fields': 'id,title'})
+        assert narrow.data == {'id': ad.id, 'title': ad.title}
+        assert narrow['ETag'] != full['ETag']
+
+        expanded = api_client.get(f'/board/ads/{ad.id}/', {'expand': 'author'})
+        user.first_name = 'Renamed'
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+        response = api_client.get(f'/board/ads/{ad.id}/', {'expand': 'author'}, HTTP_IF_NONE_MATCH=expanded['ETag'])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['author']['first_name'] == 'Renamed'
+
+    @pytest.mark.parametrize('params', [
+        {'fields': 'id,title,price'},
+        {'fields': 'title,created_at,author', 'ordering': '-price', 'page_size': 2},
+        {'fields': 'id,title', 'search': 'ad'},
+    ])
+    def test_fast_read_matches_serializer(self, settings, api_client, listing, params):
+        settings.BOARD_FAST_READ = False
+        expected = api_client.get('/board/ads/', params)
+        cache.clear()
+        settings.BOARD_FAST_READ = True
+        response = api_client.get('/board/ads/', params)
+        assert response.content == expected.content
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    @pytest.fixture(autouse=True)
+    def profile_dir(self, settings, tmp_path):
+        settings.PROFILE_DIR = str(tmp_path)
+        return tmp_path
+
+    def test_staff_request_is_profiled(self, admin_client, ad, profile_dir):
+        response = admin_client.get('/board/ads/', {'title': 'Test', 'profile': '1'})
+        assert response.status_code == status.HTTP_200_OK
+        profile_id = response['X-Profile-Id']
+        data = json.loads((profile_dir / f'{profile_id}.json').read_text())
+        assert data['path'] == '/board/ads/?title=Test&profile=1'
+        assert data['sql_count'] == len(data['sql']) >= 1
+        assert any('board_ads' in query['sql'] for query in data['sql'])
+        assert 'list' in data['functions']
+
+        response = admin_client.get(f'/board/profiles/{profile_id}.pstats')
+        assert response['Content-Disposition'] == f'attachment; filename="{profile_id}.pstats"'
+        stats_file = profile_dir / 'downloaded.pstats'
+        stats_file.write_bytes(b''.join(response.streaming_content))
+        assert pstats.Stats(str(stats_file)).total_calls > 0
+
+    def test_flag_ignored_for_other_users(self, api_client, authorized_client, ad, profile_dir):
+        assert 'X-Profile-Id' not in api_client.get('/board/ads/', HTTP_X_PROFILE='1')
+        response = authorized_client.get(f'/board/ads/{ad.id}/', HTTP_X_PROFILE='1')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'X-Profile-Id' not in response
+        assert list(profile_dir.iterdir()) == []
+
+    def test_download_requires_staff(self, api_client, user_token, admin_token, ad):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {admin_token}')
+        profile_id = api_client.get(f'/board/ads/{ad.id}/', HTTP_X_PROFILE='1')['X-Profile-Id']
+        assert api_client.get(f'/board/profiles/{profile_id}.sql').status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get(f'/board/profiles/{uuid.uuid4()}.json').status_code == status.HTTP_404_NOT_FOUND
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {user_token}')
+        assert api_client.get(f'/board/profiles/{profile_id}.json').status_code == status.HTTP_403_FORBIDDEN
+
+    def test_old_profiles_pruned(self, settings, admin_client, ad, profile_dir):
+        settings.PROFILE_KEEP = 2
+        for _ in range(3):
+            admin_client.get('/board/ads/', HTTP_X_PROFILE='1')
+        assert len(list(profile_dir.glob('*.json'))) == 2
+        assert len(list(profile_dir.glob('*.pstats'))) == 2
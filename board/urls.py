@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .apps import BoardConfig
-from .views import AdsViewSet, ReviewViewSet
+from .views import AdsViewSet, ExportView, ProfileDownloadView, ReviewViewSet
 
 app_name = BoardConfig.name
 
@@ -11,5 +12,12 @@ router.register(r"ads", AdsViewSet, basename="ads")
 router.register(r"reviews", ReviewViewSet, basename="review")
 
 urlpatterns = [
+    path("export/", ExportView.as_view(), name="export"),
+    path("profiles/<uuid:profile_id>.<str:kind>", ProfileDownloadView.as_view(), name="profile-download"),
+    # Асинхронный путь чтения для ASGI-сервера
+    path("async/ads/", async_views.ads_list, name="async-ads-list"),
+    path("async/ads/<int:pk>/", async_views.ads_detail, name="async-ads-detail"),
+    path("async/reviews/", async_views.reviews_list, name="async-review-list"),
+    path("async/reviews/<int:pk>/", async_views.review_detail, name="async-review-detail"),
     path("", include(router.urls)),
 ]
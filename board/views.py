@@ -1,24 +1,118 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, viewsets
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework import filters, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.routers import ReplicaReadMixin
 
+from .bulk import apply_ads_bulk
+from .cache import CachedListMixin
+from .conditional import ConditionalGetMixin
+from .export import CONTENT_TYPES, EXPORT_MODELS, iter_export
+from .fastread import FastReadMixin
+from .fieldsets import SparseFieldsMixin
 from .filters import AdFilter
 from .models import Ads, Review
-from .paginators import AdsPaginator
+from .paginators import AdReviewsPaginator, AdsPaginator
 from .permissions import IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly
-from .serializer import AdsSerializer, ReviewSerializer
+from .profiling import PROFILE_KINDS, ProfilingMixin, profile_path
+from .serializer import AdReviewSerializer, AdsBulkOperationSerializer, AdsSerializer, ReviewSerializer
+from .stats import queryset_stats, summary_stats
 
 
-class AdsViewSet(viewsets.ModelViewSet):
+class AdsViewSet(
+    ProfilingMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    CachedListMixin,
+    FastReadMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Ads.objects.all()
     serializer_class = AdsSerializer
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = AdFilter  # Подключаем фильтры
+    # Сортировка ?ordering=price / -price / created_at / -created_at; по каждому полю есть индекс с id на конце,
+    # id добавляет AdsPaginator как второй ключ курсора
+    ordering_fields = ("price", "created_at")
+    ordering = ("-created_at",)
     pagination_class = AdsPaginator
+    cache_namespace = "ads"
+    # Максимум запросов к БД на действие, включая аутентификацию (config.middleware.QueryCountMiddleware, тесты).
+    # Записи объявлений включают 3 запроса пересчёта сводки за день после коммита (board.stats)
+    query_budget = {
+        "list": 3,  # пользователь, страница, проверка для нечёткого поиска
+        "retrieve": 3,
+        "create": 5,
+        "update": 7,
+        "partial_update": 7,
+        "destroy": 8,
+        "reviews": 6,
+        "bulk": 12,  # не растёт с числом строк в пределах BOARD_BULK_BATCH_SIZE
+        "stats": 3,  # пользователь, агрегат, проверка для нечёткого поиска
+    }
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=True, methods=["get", "post"], serializer_class=AdReviewSerializer)
+    def reviews(self, request, pk=None):
+        """Отзывы объявления с курсорной пагинацией; POST добавляет отзыв к объявлению."""
+        ad = get_object_or_404(Ads.objects.only("id"), pk=pk)
+
+        if request.method == "POST":
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(ad=ad, author=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        paginator = AdReviewsPaginator()
+        page = paginator.paginate_queryset(Review.objects.filter(ad_id=ad.id), request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        """
+        Гистограмма цен, минимальная, максимальная и средняя цена и число объявлений по дням.
+
+        Принимает те же фильтры, что и список, и ?days= — за сколько последних дней считать объявления.
+        Без фильтров ответ собирается из сводной таблицы AdsDailyStats, с фильтрами — одним агрегирующим запросом.
+        """
+        days = request.query_params.get("days", settings.BOARD_STATS_DAYS)
+        try:
+            days = int(days)
+            if not 1 <= days <= settings.BOARD_STATS_MAX_DAYS:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValidationError({"days": [f"Целое число от 1 до {settings.BOARD_STATS_MAX_DAYS}."]})
+
+        if any(request.query_params.get(name) for name in AdFilter.base_filters):
+            return Response(queryset_stats(self.filter_queryset(self.get_queryset()), days))
+        return Response(summary_stats(days))
+
+    @action(detail=False, methods=["post"], serializer_class=AdsBulkOperationSerializer)
+    def bulk(self, request):
+        """
+        Пакетное создание, изменение и удаление объявлений в одной транзакции.
+
+        Принимает список операций вида {"op": "create", "data": {...}}, {"op": "update", "id": 1, "data": {...}}
+        и {"op": "delete", "id": 1}; возвращает результат по каждой операции.
+        """
+        serializer = self.get_serializer(data=request.data, many=True, max_length=settings.BOARD_BULK_MAX_OPERATIONS)
+        serializer.is_valid(raise_exception=True)
+        ok, results = apply_ads_bulk(serializer.validated_data, request.user)
+        return Response({"results": results}, status=status.HTTP_200_OK if ok else status.HTTP_400_BAD_REQUEST)
+
     # def get_queryset(self):
     #     user = self.request.user
     #     if user.is_admin:
@@ -26,8 +120,11 @@ class AdsViewSet(viewsets.ModelViewSet):
     #     return Ads.objects.filter(author=user)
 
     def get_permissions(self):
+        if self.action in ("reviews", "bulk"):
+            # Отзывы оставляет любой авторизованный, права на объявления в пакете проверяются в apply_ads_bulk
+            self.permission_classes = [IsAuthenticatedOrReadOnly]
         # Для методов, изменяющих данные
-        if self.request.method in ["POST", "PUT", "PATCH", "DELETE"]:
+        elif self.request.method in ["POST", "PUT", "PATCH", "DELETE"]:
             if self.request.user and self.request.user.is_staff:  # Проверяем, является ли пользователь администратором
                 self.permission_classes = [permissions.IsAuthenticated]  # Администраторы могут всё
             else:
@@ -38,9 +135,26 @@ class AdsViewSet(viewsets.ModelViewSet):
         return super(AdsViewSet, self).get_permissions()
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ProfilingMixin,
+    ReplicaReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    CachedListMixin,
+    FastReadMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    cache_namespace = "review"
+    query_budget = {
+        "list": 2,
+        "retrieve": 3,
+        "create": 6,
+        "update": 7,
+        "partial_update": 7,
+        "destroy": 4,
+    }
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -56,3 +170,52 @@ class ReviewViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticatedOrReadOnly]  # Анонимные пользователи могут только читать
 
         return super(ReviewViewSet, self).get_permissions()
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка объявлений или отзывов для аналитики (только для администраторов).
+
+    Параметры: kind=ads|reviews, output=ndjson|csv, since=<ISO 8601> — выгрузить строки новее водяного знака.
+    """
+
+    permission_classes = (IsAdminUser,)
+    query_budget = {"get": 1}  # Сами строки читаются серверным курсором уже при отдаче ответа
+
+    def perform_content_negotiation(self, request, force=False):
+        # Формат ответа задаётся параметром output, а не заголовком Accept
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        kind = request.query_params.get("kind", "ads")
+        output_format = request.query_params.get("output", "ndjson")
+        if kind not in EXPORT_MODELS or output_format not in CONTENT_TYPES:
+            return Response(
+                {"error": "kind должен быть ads или reviews, output — ndjson или csv."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        since = request.query_params.get("since")
+        if since is not None:
+            since = parse_datetime(since)
+            if since is None:
+                return Response({"error": "since должен быть в формате ISO 8601."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            iter_export(kind, output_format, since), content_type=CONTENT_TYPES[output_format]
+        )
+        response["Content-Disposition"] = f'attachment; filename="{kind}.{output_format}"'
+        return response
+
+
+class ProfileDownloadView(APIView):
+    """Файлы профиля запроса (board.profiling): <id>.pstats или <id>.json, только для администраторов."""
+
+    permission_classes = (IsAdminUser,)
+    query_budget = {"get": 1}  # пользователь, если его нет в кэше аутентификации
+
+    def get(self, request, profile_id, kind):
+        path = profile_path(profile_id, kind)
+        if kind not in PROFILE_KINDS or not os.path.exists(profile_path(profile_id, "json")):
+            raise Http404
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=os.path.basename(path))
@@ -0,0 +1,158 @@
+"""
+Сжатие ответов gzip и brotli (CompressionMiddleware).
+
+Кодировка выбирается по Accept-Encoding с учётом q; сжимаются только текстовые типы
+(JSON, HTML, CSV, JavaScript, XML) не короче COMPRESSION_MIN_SIZE. Потоковые ответы
+сжимаются по мере чтения, без буферизации всего тела.
+"""
+
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli указан в requirements.txt, без него остаётся gzip
+    brotli = None
+
+_COMPRESSIBLE_RE = re.compile(r"^(text/|application/(json|javascript|xml|[\w.-]+\+(json|xml))\b)", re.IGNORECASE)
+
+# Случайные байты в заголовке gzip для HTML, как у GZipMiddleware: защита от BREACH (в HTML есть CSRF-токен)
+HTML_MAX_RANDOM_BYTES = 100
+
+
+def _accepted_codings(header):
+    """Accept-Encoding → {кодировка: q}."""
+    codings = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def negotiate_encoding(header, html=False):
+    """
+    Кодировка ответа по заголовку Accept-Encoding или None.
+
+    При равных q предпочтение у brotli; HTML сжимается только gzip, чтобы работала защита от BREACH.
+    """
+    codings = _accepted_codings(header or "")
+    candidates = ("gzip",) if html or brotli is None else ("br", "gzip")
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = codings.get(coding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type):
+    return bool(_COMPRESSIBLE_RE.match(content_type or ""))
+
+
+def _is_html(content_type):
+    return (content_type or "").lower().startswith("text/html")
+
+
+def compress(content, encoding, html=False):
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=HTML_MAX_RANDOM_BYTES if html else None)
+
+
+def _stream_compressor(encoding):
+    """Пара (сжать кусок, завершить поток) для инкрементального сжатия."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # Контейнер gzip
+    return compressor.compress, compressor.flush
+
+
+def compress_sequence(chunks, encoding):
+    process, finish = _stream_compressor(encoding)
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_sequence(chunks, encoding):
+    process, finish = _stream_compressor(encoding)
+    async for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы gzip или brotli, если клиент их принимает.
+
+    Представление может передать готовые варианты тела в response.precompressed ({кодировка: байты})
+    и получить сжатое тело через response.store_compressed(кодировка, байты) — так кэш ответов
+    (board.cache) сжимает каждую закэшированную страницу один раз.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get("Content-Type")
+        if (
+            response.has_header("Content-Encoding")
+            or response.has_header("Content-Range")
+            or "no-transform" in response.get("Cache-Control", "")
+            or not is_compressible(content_type)
+            or (not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        html = _is_html(content_type)
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING"), html)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, encoding)
+            # Длина сжатого потока заранее неизвестна
+            del response.headers["Content-Length"]
+        else:
+            content = (getattr(response, "precompressed", None) or {}).get(encoding)
+            if content is None:
+                content = compress(response.content, encoding, html)
+                if len(content) >= len(response.content):
+                    return response
+                store = getattr(response, "store_compressed", None)
+                if store is not None:
+                    store(encoding, content)
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        # Строгий ETag относится к несжатому телу (RFC 9110, 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
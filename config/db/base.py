@@ -0,0 +1,46 @@
+"""
+Бэкенд PostgreSQL с пулом соединений процесса (ENGINE = "config.db").
+
+Django по-прежнему «открывает» и «закрывает» соединение на каждый запрос (CONN_MAX_AGE = 0),
+но физическое соединение берётся из пула и возвращается в него, поэтому TCP- и
+auth-рукопожатие с сервером выполняется только при создании соединения в пуле.
+Параметры пула задаются ключом POOL в настройках базы (см. config.settings).
+"""
+
+from django.db.backends.postgresql import base, creation
+
+from config.db.pool import close_pools, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Свободные соединения пула к тестовой базе не дадут её удалить
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        key = (self.alias, *sorted((name, str(value)) for name, value in conn_params.items()))
+        name = "{alias} ({host}:{port}/{database})".format(
+            alias=self.alias,
+            host=conn_params.get("host") or "localhost",
+            port=conn_params.get("port") or 5432,
+            database=conn_params.get("database") or conn_params.get("dbname"),
+        )
+        self.connection_pool = get_pool(
+            key, lambda: super(DatabaseWrapper, self).get_new_connection(conn_params), name=name, **self.pool_options
+        )
+        return self.connection_pool.getconn()
+
+    @property
+    def pool_options(self):
+        return self.settings_dict.get("POOL") or {}
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Соединение, закрываемое посреди atomic-блока, в пул не возвращаем: его состояние не определено
+                self.connection_pool.putconn(self.connection, discard=self.in_atomic_block)
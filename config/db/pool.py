@@ -0,0 +1,243 @@
+import threading
+import time
+from collections import Counter, deque
+
+import psycopg2
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Свободное соединение не появилось за время ожидания (Django превратит в django.db.OperationalError)."""
+
+
+class _PooledConnection:
+    __slots__ = ("connection", "created_at", "returned_at")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.returned_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Пул соединений psycopg2 одного процесса для одной базы.
+
+    Соединение выдаётся из свободных (последнее возвращённое — первым, чтобы редко
+    используемые успевали закрыться по max_idle), старше max_lifetime или простоявшее
+    дольше check_interval перед выдачей проверяется запросом SELECT 1. Если заняты все
+    max_size соединений, запрос ждёт не дольше timeout и получает PoolTimeout.
+    """
+
+    def __init__(
+        self,
+        connect,
+        name="default",
+        min_size=0,
+        max_size=10,
+        timeout=5.0,
+        max_lifetime=1800.0,
+        max_idle=600.0,
+        check_interval=30.0,
+    ):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Некорректный размер пула: нужно 0 <= min_size <= max_size, max_size >= 1")
+        self.connect = connect
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+
+        self._idle = deque()
+        self._in_use = {}  # id(connection) -> _PooledConnection
+        self._opening = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self.counters = Counter()
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._condition:
+            while True:
+                item = self._take_idle()
+                if item is not None:
+                    # Выданное на проверку соединение уже считается занятым, чтобы не превысить max_size
+                    self._in_use[id(item.connection)] = item
+                    break
+                if self.size < self.max_size:
+                    self._opening += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"Нет свободного соединения с БД за {self.timeout:g} с (занято {len(self._in_use)})"
+                    )
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if item is None or not self._check(item):
+            item = self._open()
+            with self._condition:
+                self._in_use[id(item.connection)] = item
+        with self._condition:
+            self.counters["checkouts"] += 1
+            waited = time.monotonic() - started
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+        return item.connection
+
+    def putconn(self, connection, discard=False):
+        with self._condition:
+            item = self._in_use.pop(id(connection), None)
+        if item is None:
+            # Соединение открыто не пулом — просто закрываем
+            connection.close()
+            return
+
+        if not discard and not connection.closed:
+            try:
+                # Незавершённую транзакцию откатываем, чтобы следующий владелец получил чистое соединение
+                if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                discard = True
+        expired = time.monotonic() - item.created_at > self.max_lifetime
+        with self._condition:
+            if discard or connection.closed:
+                self.counters["discarded_broken"] += 1
+                self._close(item)
+            elif expired:
+                self.counters["discarded_lifetime"] += 1
+                self._close(item)
+            else:
+                item.returned_at = time.monotonic()
+                self._idle.append(item)
+            self._condition.notify()
+
+    def fill(self):
+        """Открывает соединения до min_size (вызывается при создании пула)."""
+        while True:
+            with self._condition:
+                if self.size >= self.min_size:
+                    return
+                self._opening += 1
+            item = self._open()
+            with self._condition:
+                self._idle.append(item)
+                self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            while self._idle:
+                self._close(self._idle.popleft())
+
+    def stats(self):
+        with self._condition:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "utilization": round(len(self._in_use) / self.max_size, 3),
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 2),
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 2),
+                **self.counters,
+            }
+
+    def _take_idle(self):
+        """Свежее свободное соединение; простоявшие дольше max_idle закрываются, пока пул больше min_size."""
+        now = time.monotonic()
+        while self._idle:
+            item = self._idle.pop()
+            if now - item.returned_at > self.max_idle and self.size >= self.min_size:
+                self.counters["discarded_idle"] += 1
+                self._close(item)
+                continue
+            return item
+        return None
+
+    def _check(self, item):
+        """Проверка соединения перед выдачей; сломанное или устаревшее закрывается."""
+        now = time.monotonic()
+        if item.connection.closed:
+            reason = "discarded_broken"
+        elif now - item.created_at > self.max_lifetime:
+            reason = "discarded_lifetime"
+        elif now - item.returned_at > self.check_interval:
+            try:
+                with item.connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                if item.connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    item.connection.rollback()
+                return True
+            except psycopg2.Error:
+                reason = "discarded_broken"
+        else:
+            return True
+        self.counters[reason] += 1
+        with self._condition:
+            del self._in_use[id(item.connection)]
+            self._close(item)
+            # Место закрытого соединения займёт новое, которое откроет вызывающий
+            self._opening += 1
+        return False
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self.counters["connections_opened"] += 1
+        return _PooledConnection(connection)
+
+    def _close(self, item):
+        try:
+            item.connection.close()
+        except psycopg2.Error:
+            pass
+
+
+def get_pool(key, connect, **options):
+    """Пул процесса для ключа (параметры подключения); создаётся при первом обращении."""
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(connect, **options)
+                pool.fill()
+    return pool
+
+
+def get_pool_stats():
+    """Состояние всех пулов процесса: {имя пула: метрики}."""
+    return {pool.name: pool.stats() for pool in list(_pools.values())}
+
+
+def close_pools():
+    """Закрывает свободные соединения всех пулов процесса."""
+    for pool in list(_pools.values()):
+        pool.close_all()
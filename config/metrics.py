@@ -0,0 +1,289 @@
+"""
+Метрики в формате Prometheus (MetricsMiddleware и /metrics).
+
+Каждый процесс копит счётчики и гистограммы в памяти: на запрос приходится несколько
+обновлений словарей под одной блокировкой. При нескольких воркерах gunicorn задайте METRICS_DIR
+(общий для воркеров каталог, лучше на tmpfs, очищаемый при старте): процесс раз в
+METRICS_FLUSH_INTERVAL секунд записывает туда снимок своих метрик, а /metrics складывает снимки
+всех процессов. Снимки завершившихся процессов сливаются в архив, поэтому счётчики
+не убывают при перезапуске воркеров.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from config.db.pool import get_pool_stats
+
+# Имя → (тип, описание, границы корзин гистограммы)
+METRICS = {
+    "http_requests_total": ("counter", "Обработанные запросы", None),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Время обработки запроса",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ),
+    "http_response_size_bytes": (
+        "histogram",
+        "Размер тела ответа после сжатия (потоковые ответы не учитываются)",
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+    "db_queries_per_request": ("histogram", "SQL-запросов на HTTP-запрос", (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)),
+    "db_queries_total": ("counter", "SQL-запросы", None),
+    "db_query_duration_seconds_total": ("counter", "Суммарное время SQL-запросов", None),
+    "jwt_auth_failures_total": ("counter", "Отклонённые JWT (users.authentication)", None),
+    "db_pool_connections": ("gauge", "Соединения пулов БД процесса (config.db)", None),
+    "db_pool_waiters": ("gauge", "Потоки, ждущие соединение из пула", None),
+}
+
+# Прочие методы попадают в метку method="other": клиент не должен плодить серии
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = ".lock"
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Метрики процесса: {(имя, метки): значение} для счётчиков, {(имя, метки): [корзины..., сумма]} для гистограмм."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = time.monotonic()
+        self._pid = None
+        self._path = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, _labels(labels))
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(buckets) + 2)
+            series[bisect_left(buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        """Снимок для записи в файл и сложения с другими процессами; пулы БД — текущее состояние."""
+        with self.lock:
+            snapshot = Snapshot(dict(self.counters), {key: list(series) for key, series in self.histograms.items()})
+        for pool, stats in get_pool_stats().items():
+            for state in ("idle", "in_use"):
+                snapshot.gauges[("db_pool_connections", (("pool", pool), ("state", state)))] = stats[state]
+            snapshot.gauges[("db_pool_waiters", (("pool", pool),))] = stats["waiting"]
+        return snapshot
+
+    def snapshot_path(self):
+        # Своё имя на каждый процесс: pid может достаться новому воркеру, а его снимок не должен затереть старый
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = os.path.join(settings.METRICS_DIR, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        return self._path
+
+    def flush(self):
+        """Записывает снимок процесса в METRICS_DIR."""
+        self.flushed_at = time.monotonic()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        self.snapshot().write(self.snapshot_path())
+
+    def maybe_flush(self):
+        if settings.METRICS_DIR and time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+
+class Snapshot:
+    """Метрики одного или нескольких процессов; счётчики и гистограммы складываются, gauges — нет."""
+
+    def __init__(self, counters=None, histograms=None, gauges=None):
+        self.counters = counters or {}
+        self.histograms = histograms or {}
+        self.gauges = gauges or {}
+
+    def add(self, other, gauge_labels=()):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, series in other.histograms.items():
+            current = self.histograms.get(key)
+            self.histograms[key] = list(series) if current is None else [a + b for a, b in zip(current, series)]
+        for (name, labels), value in other.gauges.items():
+            self.gauges[(name, labels + gauge_labels)] = value
+
+    def write(self, path):
+        # Через временный файл: читатель не увидит недописанный снимок
+        data = {
+            kind: [[name, labels, value] for (name, labels), value in getattr(self, kind).items()]
+            for kind in ("counters", "histograms", "gauges")
+        }
+        with open(path + ".tmp", "w") as file:
+            json.dump(data, file)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def read(cls, path):
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return cls(
+            *(
+                {(name, tuple(map(tuple, labels))): value for name, labels, value in data.get(kind, [])}
+                for kind in ("counters", "histograms", "gauges")
+            )
+        )
+
+
+registry = Registry()
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Метрики всех процессов (с METRICS_DIR) или только текущего."""
+    if not settings.METRICS_DIR:
+        return registry.snapshot()
+
+    registry.flush()
+    directory = settings.METRICS_DIR
+    total = Snapshot()
+    with open(os.path.join(directory, LOCK_FILE), "a") as lock:
+        # Снимки завершившихся процессов переносятся в архив под блокировкой, чтобы не учесть их дважды
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive = Snapshot.read(archive_path) or Snapshot()
+        dead = []
+        for filename in os.listdir(directory):
+            pid, _, rest = filename.partition("-")
+            if not pid.isdigit() or not rest.endswith(".json"):
+                continue
+            snapshot = Snapshot.read(os.path.join(directory, filename))
+            if snapshot is None:
+                continue
+            if _is_alive(int(pid)):
+                total.add(snapshot, gauge_labels=(("pid", pid),))
+            else:
+                snapshot.gauges.clear()
+                archive.add(snapshot)
+                dead.append(filename)
+        if dead:
+            archive.write(archive_path)
+            for filename in dead:
+                os.remove(os.path.join(directory, filename))
+    total.add(archive)
+    return total
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(name, labels, value):
+    if labels:
+        name += "{" + ",".join(f'{key}="{_escape(label)}"' for key, label in labels) + "}"
+    return f"{name} {value!r}"
+
+
+def render(snapshot):
+    """Текстовый формат Prometheus 0.0.4."""
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        if kind == "histogram":
+            series = sorted(
+                (labels, values) for (metric, labels), values in snapshot.histograms.items() if metric == name
+            )
+        else:
+            source = snapshot.gauges if kind == "gauge" else snapshot.counters
+            series = sorted((labels, value) for (metric, labels), value in source.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(_format(name, labels, value))
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value[:-1]):
+                cumulative += count
+                lines.append(_format(f"{name}_bucket", (*labels, ("le", str(bound))), cumulative))
+            lines.append(_format(f"{name}_sum", labels, float(value[-1])))
+            lines.append(_format(f"{name}_count", labels, cumulative))
+    return "\n".join(lines) + "\n"
+
+
+class QueryTimer:
+    """execute_wrapper: только число и время SQL-запросов (дешевле QueryRecorder из config.middleware)."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """
+    Число запросов, время и размер ответа по имени маршрута (board:ads-list, users:login),
+    а также SQL-запросы на запрос. Стоит первым в MIDDLEWARE, чтобы мерить всю обработку и размер
+    уже сжатого ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match is not None else "unmatched"
+        method = request.method if request.method in METHODS else "other"
+        registry.inc("http_requests_total", route=route, method=method, status=str(response.status_code))
+        registry.observe("http_request_duration_seconds", duration, route=route, method=method)
+        if not response.streaming:
+            registry.observe("http_response_size_bytes", len(response.content), route=route)
+        registry.observe("db_queries_per_request", timer.count, route=route)
+        if timer.count:
+            registry.inc("db_queries_total", timer.count, route=route)
+            registry.inc("db_query_duration_seconds_total", timer.duration, route=route)
+        registry.maybe_flush()
+        return response
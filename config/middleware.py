@@ -0,0 +1,94 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def query_shape(sql):
+    """Форма запроса без параметров: списки IN разной длины считаются одной формой."""
+    return _IN_LIST_RE.sub("IN (...)", sql)
+
+
+def get_query_budget(view_func, method):
+    """
+    Бюджет запросов к БД, объявленный у представления атрибутом query_budget.
+
+    Для ViewSet ключом служит действие (list, retrieve, ...), для APIView — HTTP-метод в нижнем регистре.
+    Обычные представления Django (/metrics, /media/) к БД не обращаются и бюджета не объявляют.
+    """
+    view_class = getattr(view_func, "cls", None)
+    budget = getattr(view_class, "query_budget", None)
+    if not budget:
+        return None
+    actions = getattr(view_func, "actions", None) or {}
+    return budget.get(actions.get(method.lower(), method.lower()))
+
+
+class QueryRecorder:
+    """execute_wrapper, собирающий количество, время и формы SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def repeated_shapes(self, threshold):
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+class QueryCountMiddleware:
+    """
+    Отладочный отчёт о запросах к БД (работает только при DEBUG).
+
+    Добавляет к ответу заголовки X-DB-Query-Count и X-DB-Query-Time-Ms, пишет в лог
+    превышение бюджета представления (query_budget) и повторяющиеся формы запросов — признак N+1.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        response["X-DB-Query-Count"] = str(recorder.count)
+        response["X-DB-Query-Time-Ms"] = f"{recorder.duration * 1000:.2f}"
+
+        budget = getattr(request, "query_budget", None)
+        if budget is not None:
+            response["X-DB-Query-Budget"] = str(budget)
+            if recorder.count > budget:
+                logger.warning(
+                    "%s %s: %d queries exceed budget of %d", request.method, request.path, recorder.count, budget
+                )
+        for shape, count in recorder.repeated_shapes(settings.QUERY_REPEAT_THRESHOLD).items():
+            logger.warning(
+                "%s %s: query repeated %d times (possible N+1): %s", request.method, request.path, count, shape
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
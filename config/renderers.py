@@ -0,0 +1,44 @@
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson указан в requirements.txt, без него работает обычный JSONRenderer
+    orjson = None
+
+# Типы, которые orjson записал бы иначе, чем JSONRenderer, отдаются в encoders.JSONEncoder.default
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+LINE_SEPARATORS = (("\u2028".encode(), b"\\u2028"), ("\u2029".encode(), b"\\u2029"))
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer на orjson с тем же результатом байт в байт: компактные разделители, UTF-8 без экранирования,
+    даты и ленивые строки через encoders.JSONEncoder, экранированные U+2028/U+2029.
+
+    Отличаются только числа с плавающей точкой в экспоненциальной записи (1e16 вместо 1e+16) —
+    в ответах API таких нет.
+
+    Запросы с отступом (Accept: application/json; indent=4), значения, которые orjson не умеет
+    (целые больше 64 бит), настройки UNICODE_JSON/COMPACT_JSON, отличные от умолчаний,
+    и окружение без orjson обрабатывает обычный JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer: эти символы допустимы в JSON, но не в JavaScript
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
@@ -0,0 +1,93 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = "db:primary-pin:{user_id}"
+
+# Реплика, с которой читает текущий запрос; None — читать с основной базы
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def set_read_replica():
+    """Включает чтение с реплики в текущем контексте; возвращает токен для reset_read_replica."""
+    replicas = settings.DATABASE_REPLICAS
+    # Реплика выбирается один раз на запрос, чтобы все его запросы видели один и тот же снимок данных
+    return _read_alias.set(random.choice(replicas) if replicas else None)
+
+
+def reset_read_replica(token):
+    _read_alias.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+    """Внутри блока чтение идёт с основной базы, даже если запрос читает с реплики."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_to_primary(user):
+    """После записи пользователь читает с основной базы DATABASE_REPLICA_PIN_SECONDS секунд."""
+    if settings.DATABASE_REPLICAS and user.is_authenticated:
+        cache.set(PIN_KEY.format(user_id=user.pk), True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and cache.get(PIN_KEY.format(user_id=user.pk), False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтение с реплик только там, где его явно включили (ReplicaReadMixin), остальное — на основной базе.
+
+    Внутри транзакции чтение остаётся на основной базе, чтобы видеть собственные незакоммиченные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Миксин ViewSet: запросы безопасными методами читают с реплики.
+
+    Пользователь, только что изменивший данные, на время DATABASE_REPLICA_PIN_SECONDS читает
+    с основной базы и сразу видит свои изменения, несмотря на отставание реплик.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and settings.DATABASE_REPLICAS and not is_pinned_to_primary(request.user):
+            self._read_replica_token = set_read_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_replica_token", None)
+        if token is not None:
+            reset_read_replica(token)
+            self._read_replica_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "users",
     "board",
@@ -31,7 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "config.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -39,8 +42,24 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.middleware.QueryCountMiddleware",
 ]
 
+# Сжатие ответов (config.compression): минимальный размер тела в байтах и уровень brotli (0–11;
+# выше 5 заметно дороже по CPU почти без выигрыша в размере JSON)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Метрики (config.metrics, /metrics): каталог снимков для нескольких воркеров (пусто — только текущий процесс),
+# как часто процесс обновляет свой снимок (секунды) и токен доступа к /metrics (Authorization: Bearer ...;
+# пусто — без проверки, тогда закройте /metrics снаружи)
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Сколько одинаковых по форме SQL-запросов за запрос считать признаком N+1 (QueryCountMiddleware, только DEBUG)
+QUERY_REPEAT_THRESHOLD = 3
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -61,17 +80,86 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# DATABASE_POOL=1 включает пул соединений процесса (config.db): соединения переиспользуются между запросами,
+# а при исчерпании пула запрос ждёт не дольше DATABASE_POOL_TIMEOUT секунд и получает ошибку
+DATABASE_POOL = os.getenv("DATABASE_POOL", "0").lower() in ("1", "true", "yes")
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "config.db" if DATABASE_POOL else "django.db.backends.postgresql_psycopg2",
         "NAME": os.getenv("DATABASE_NAME"),
         "USER": os.getenv("DATABASE_USER"),
         "PASSWORD": os.getenv("DATABASE_PASSWORD"),
         "HOST": os.getenv("DATABASE_HOST"),
         "PORT": os.getenv("DATABASE_PORT"),
+        # С пулом соединение возвращается в него после каждого запроса, поэтому CONN_MAX_AGE не нужен
+        "CONN_MAX_AGE": 0 if DATABASE_POOL else int(os.getenv("DATABASE_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": {
+            "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", 20)),
+            "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", 3)),
+            "max_lifetime": float(os.getenv("DATABASE_POOL_MAX_LIFETIME", 1800)),
+            "max_idle": float(os.getenv("DATABASE_POOL_MAX_IDLE", 600)),
+            "check_interval": float(os.getenv("DATABASE_POOL_CHECK_INTERVAL", 30)),
+        },
+    }
+}
+
+# Реплики для чтения: DATABASE_REPLICA_HOSTS=host1[:port],host2[:port] добавляет алиасы replica1, replica2, ...
+# с теми же базой и учётными данными. GET-запросы AdsViewSet/ReviewViewSet читают с них (config.routers),
+# а пользователь после записи DATABASE_REPLICA_PIN_SECONDS секунд читает с основной базы.
+# В тестах реплики — зеркала default (TEST MIRROR).
+for index, address in enumerate(filter(None, os.getenv("DATABASE_REPLICA_HOSTS", "").split(",")), start=1):
+    host, _, port = address.strip().partition(":")
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", 10))
+DATABASE_ROUTERS = ["config.routers.PrimaryReplicaRouter"]
+
+# Поколения кэша ответов (board.cache) должны быть общими для всех процессов:
+# при нескольких воркерах укажите общий бэкенд, например django.core.cache.backends.redis.RedisCache
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
+# Время жизни закэшированных анонимных ответов списков объявлений и отзывов (секунды)
+BOARD_CACHE_TIMEOUT = int(os.getenv("BOARD_CACHE_TIMEOUT", 300))
+
+# Пакетный эндпоинт /board/ads/bulk/: максимум операций в запросе и размер пачки INSERT/UPDATE
+BOARD_BULK_MAX_OPERATIONS = 1000
+BOARD_BULK_BATCH_SIZE = 500
+
+# Сколько строк за раз читает серверный курсор при выгрузке (/board/export/, manage.py export_board)
+BOARD_EXPORT_CHUNK_SIZE = 2000
+
+# Инкрементальная выгрузка не берёт строки моложе этого числа секунд: транзакция, начатая раньше, успеет
+# закоммититься до того, как водяной знак её обгонит (дольше работающие транзакции нужно учитывать отдельно)
+BOARD_EXPORT_LAG = 60
+
+# Быстрый путь list/retrieve объявлений и отзывов: .values() и orjson вместо сериализатора (board.fastread)
+BOARD_FAST_READ = os.getenv("BOARD_FAST_READ", "0").lower() in ("1", "true", "yes")
+
+# Профили запросов администраторов (X-Profile: 1 или ?profile=1, board.profiling): каталог и сколько последних хранить.
+# Каталог не должен раздаваться веб-сервером: в профилях SQL с параметрами
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_KEEP = 100
+
+# /board/ads/stats/: нижние границы ценовых корзин гистограммы (последняя корзина открыта сверху),
+# число дней в счётчиках по умолчанию и максимум для ?days=.
+# После изменения границ сводку нужно пересчитать: python manage.py rebuild_ads_stats
+BOARD_PRICE_BUCKETS = (0, 1000, 5000, 10000, 50000, 100000)
+BOARD_STATS_DAYS = 7
+BOARD_STATS_MAX_DAYS = 31
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -100,6 +188,32 @@ STATIC_URL = "static/"
 MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Медиафайлы хранятся по хэшу содержимого со счётчиком ссылок (users.storage)
+STORAGES = {
+    "default": {"BACKEND": "users.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Файлы без ссылок старше стольких секунд удаляет python manage.py collect_media
+MEDIA_GC_GRACE = 24 * 60 * 60
+
+# Раздача /media/ (config.views.MediaView): префикс internal-location nginx для X-Accel-Redirect
+# (пусто — файлы отдаёт Django) и max-age файлов, сохранённых по имени загрузки до перехода на хранилище по хэшу
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+MEDIA_MAX_AGE = 60 * 60
+
+# Загрузки больше этого размера пишутся во временный файл по частям, а не держатся в памяти процесса
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# Аватары (users.avatars): предел загрузки в байтах и пикселях, размеры и форматы миниатюр,
+# качество сжатия и число потоков фоновой обработки (0 — обработка сразу после коммита в том же потоке)
+AVATAR_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 40_000_000
+AVATAR_THUMBNAIL_SIZES = (40, 80, 160)
+AVATAR_THUMBNAIL_FORMATS = ("webp", "jpeg")
+AVATAR_THUMBNAIL_QUALITY = 80
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", 2))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
@@ -118,10 +232,24 @@ CORS_ALLOW_ALL_ORIGINS = False
 # Настройки JWT-токенов
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",  # IsAuthenticated
     ],
+    # Лимиты открытых эндпоинтов аутентификации (users.throttling.AuthRateThrottle):
+    # "<throttle_scope>.ip" — на IP, ".email" — на email из запроса, ".endpoint" — общий на эндпоинт
+    "DEFAULT_THROTTLE_RATES": {
+        "login.ip": "20/min",
+        "login.email": "5/min",
+        "login.endpoint": "600/min",
+        "register.ip": "10/hour",
+        "register.endpoint": "120/min",
+        "reset_password.ip": "5/min",
+        "reset_password.email": "3/hour",
+        "reset_password.endpoint": "120/min",
+    },
+    # Число доверенных прокси перед приложением: IP клиента для лимитов берётся из X-Forwarded-For
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)) or None,
 }
 
 # Настройки срока действия токенов
@@ -130,6 +258,12 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# Кэш пользователей для JWT-аутентификации (users.authentication.CachedJWTAuthentication):
+# время жизни в общем кэше и в памяти процесса (секунды) и размер кэша процесса
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 300))
+AUTH_USER_CACHE_LOCAL_TTL = int(os.getenv("AUTH_USER_CACHE_LOCAL_TTL", 10))
+AUTH_USER_CACHE_LOCAL_SIZE = 1024
+
 # настройки отправки уведомлений с почты
 EMAIL_HOST = "smtp.yandex.ru"
 EMAIL_PORT = 465
@@ -141,4 +275,14 @@ EMAIL_USE_SSL = True
 SERVER_EMAIL = EMAIL_HOST_USER
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Очередь исходящих писем (users.outbox, команда deliver_outbox): размер пачки, число попыток,
+# начальная задержка повторной отправки в секундах (удваивается с каждой попыткой) и аренда пачки воркером
+# в секундах — после неё письма упавшего воркера отправляются снова, поэтому она больше времени отправки пачки
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_LEASE = 600
+# Таймаут SMTP-соединения (секунды): зависший почтовый сервер не держит воркер дольше аренды
+EMAIL_TIMEOUT = 30
+
 PASSWORD_RESET_URL = "/reset_password_confirm/{uid}/{token}"
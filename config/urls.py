@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from config.views import DatabasePoolStatsView, MediaView, MetricsView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="API Documentation",
@@ -19,6 +22,9 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("db/pool/", DatabasePoolStatsView.as_view(), name="db-pool-stats"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", MediaView.as_view(), name="media"),
     # path("board/", include("board.urls", namespace="board")),
     path("users/", include("users.urls", namespace="users")),
     path("board/", include("board.urls")),
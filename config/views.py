@@ -0,0 +1,154 @@
+import hmac
+import mimetypes
+import os
+from stat import S_ISREG
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config import metrics
+from config.db.pool import get_pool_stats
+from users.storage import TEMP_DIR, blob_digest
+
+
+class DatabasePoolStatsView(APIView):
+    """Загрузка пулов соединений с БД текущего процесса (config.db, включается DATABASE_POOL)."""
+
+    permission_classes = (IsAdminUser,)
+    query_budget = {"get": 1}  # пользователь, если его нет в кэше аутентификации
+
+    def get(self, request):
+        return Response(get_pool_stats())
+
+
+class MetricsView(View):
+    """Метрики всех воркеров в текстовом формате Prometheus (config.metrics)."""
+
+    http_method_names = ["get"]
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse(status=401)
+        return HttpResponse(metrics.render(metrics.collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _parse_range(header, size):
+    """(начало, длина) для одного диапазона "bytes=a-b", "bytes=a-", "bytes=-n"; None — отдать файл целиком."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # Несколько диапазонов не поддерживаются: RFC 9110 разрешает ответить целым файлом
+    start, _, end = spec.strip().partition("-")
+    suffix = not start
+    try:
+        if suffix:
+            length = min(int(end), size)
+        else:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None  # Неразборчивый заголовок игнорируется
+    if suffix:
+        if not length:
+            raise ValueError("Пустой диапазон")
+        return size - length, length
+    if start >= size or end < start:
+        raise ValueError("Диапазон вне файла")
+    return start, end - start + 1
+
+
+class _FileRange:
+    """Часть файла для FileResponse: read() не выходит за границу диапазона."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class MediaView(View):
+    """
+    Раздача файлов MEDIA_ROOT с поддержкой Range, If-None-Match и If-Range; временный каталог
+    хранилища (tmp/) не раздаётся.
+
+    Файлы контентно-адресуемого хранилища (users.storage) не меняются, поэтому кэшируются навсегда
+    (immutable), а ETag — хэш содержимого. Целый файл отдаётся через wsgi.file_wrapper (sendfile
+    у gunicorn/uwsgi); при заданном MEDIA_ACCEL_REDIRECT отдачу, в том числе диапазонов,
+    берёт на себя nginx (X-Accel-Redirect на internal-location с тем же MEDIA_ROOT).
+    """
+
+    http_method_names = ["get", "head"]
+
+    def get(self, request, name):
+        try:
+            path = default_storage.path(name)
+            stat = os.stat(path)
+        except (SuspiciousFileOperation, OSError):
+            raise Http404
+        digest = blob_digest(name)
+        # В tmp/ лежат недописанные загрузки хранилища, их не отдаём
+        relative = os.path.relpath(path, default_storage.location)
+        if not S_ISREG(stat.st_mode) or (digest is None and relative.split(os.sep)[0] == TEMP_DIR):
+            raise Http404
+
+        etag = f'"{digest}"' if digest else f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = int(stat.st_mtime)
+        cache_control = (
+            "public, max-age=31536000, immutable" if digest else f"public, max-age={settings.MEDIA_MAX_AGE}"
+        )
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self._file_response(request, name, path, stat.st_size, etag, content_type)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = cache_control
+        return response
+
+    def _file_response(self, request, name, path, size, etag, content_type):
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = quote(settings.MEDIA_ACCEL_REDIRECT + name)
+            return response
+
+        byte_range = None
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if "HTTP_RANGE" in request.META and (if_range is None or if_range == etag):
+            try:
+                byte_range = _parse_range(request.META["HTTP_RANGE"], size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        file = open(path, "rb")
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, length = byte_range
+            # Обёртка без fileno: sendfile отдал бы файл до конца, поэтому диапазон читается сам
+            response = FileResponse(_FileRange(file, start, length), content_type=content_type, status=206)
+            response["Content-Length"] = str(length)
+            response["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+        response["Accept-Ranges"] = "bytes"
+        return response
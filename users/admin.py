@@ -1,8 +1,14 @@
 from django.contrib import admin
 
-from users.models import User
+from users.models import OutboxEmail, User
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_filter = ("id", "email")
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from config.metrics import registry as metrics
+
+USER_VERSION_KEY = "users:auth-version:{user_id}"
+USER_KEY = "users:auth-user:{user_id}:{version}"
+
+_local_users = OrderedDict()  # (user_id, version) -> (expires_at, значения полей)
+_local_lock = threading.Lock()
+
+
+def get_user_version(user_id):
+    """Версия пользователя в общем кэше: меняется при каждом изменении пользователя."""
+    key = USER_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Начинаем от текущего времени, чтобы после вытеснения ключа не вернуться к старой версии
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user(user_id):
+    """Делает недействительными закэшированные копии пользователя во всех процессах."""
+    key = USER_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    with _local_lock:
+        for local_key in [local_key for local_key in _local_users if local_key[0] == user_id]:
+            del _local_users[local_key]
+
+
+def _get_local(key):
+    with _local_lock:
+        entry = _local_users.get(key)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            del _local_users[key]
+            return None
+        _local_users.move_to_end(key)
+        return values
+
+
+def _set_local(key, values):
+    with _local_lock:
+        _local_users[key] = (time.monotonic() + settings.AUTH_USER_CACHE_LOCAL_TTL, values)
+        _local_users.move_to_end(key)
+        while len(_local_users) > settings.AUTH_USER_CACHE_LOCAL_SIZE:
+            _local_users.popitem(last=False)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без SELECT пользователя на каждый запрос.
+
+    Пользователь ищется сначала в памяти процесса, затем в общем кэше и только потом в БД.
+    Ключ содержит версию пользователя из общего кэша, которую увеличивает после коммита сигнал
+    post_save модели User (users.signals), поэтому смена пароля или деактивация видны сразу во всех процессах.
+    """
+
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except (InvalidToken, AuthenticationFailed) as exc:
+            codes = exc.get_codes()
+            metrics.inc("jwt_auth_failures_total", reason=codes if isinstance(codes, str) else exc.default_code)
+            raise
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # В кэше только значения полей без хэша пароля; при CHECK_REVOKE_TOKEN — его md5, как в самом токене
+        fields = [field.attname for field in self.user_model._meta.concrete_fields if field.attname != "password"]
+        version = get_user_version(user_id)
+        local_key = (user_id, version)
+        values = _get_local(local_key)
+        if values is None:
+            shared_key = USER_KEY.format(user_id=user_id, version=version)
+            values = cache.get(shared_key)
+            if values is None:
+                row = (
+                    self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                    .values_list(*fields, "password")
+                    .first()
+                )
+                if row is None:
+                    raise AuthenticationFailed(_("User not found"), code="user_not_found")
+                revoke_hash = get_md5_hash_password(row[-1]) if api_settings.CHECK_REVOKE_TOKEN else None
+                values = (*row[:-1], revoke_hash)
+                cache.set(shared_key, values, settings.AUTH_USER_CACHE_TTL)
+            _set_local(local_key, values)
+
+        # Каждый запрос получает свой объект; password отложен и при обращении читается из БД
+        *field_values, revoke_hash = values
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, fields, field_values)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revoke_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,184 @@
+"""
+Аватары: проверка загрузки по заголовку изображения и миниатюры в фоне.
+
+Запрос только сохраняет оригинал; миниатюры AVATAR_THUMBNAIL_SIZES в форматах AVATAR_THUMBNAIL_FORMATS
+делает пул потоков после коммита (AVATAR_WORKERS, 0 — сразу в том же потоке). Результат хранится
+в User.avatar_thumbnails: {"source": имя оригинала, "sizes": {"40": {"webp": путь, "jpeg": путь}, ...}}.
+Пропущенные миниатюры (рестарт процесса, смена аватара в админке) доделывает команда process_avatars.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F, TextField, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+from PIL import Image, ImageOps
+
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+# Форматы оригинала, которые принимаются при загрузке (имена форматов Pillow)
+UPLOAD_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+
+THUMBNAILS_DIR = "users/avatars/thumbs"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def validate_avatar(file):
+    """Проверяет загрузку по заголовку изображения: формат и размеры, без декодирования пикселей."""
+    if file.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+        raise ValidationError(f"Размер файла больше {settings.AVATAR_MAX_UPLOAD_SIZE // (1024 * 1024)} МБ.")
+    try:
+        # Image.open читает только заголовок; данные изображения декодирует уже фоновая обработка
+        with Image.open(file, formats=UPLOAD_FORMATS) as image:
+            width, height = image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValidationError("Загрузите изображение JPEG, PNG, WebP или GIF.")
+    finally:
+        file.seek(0)
+    if width * height > settings.AVATAR_MAX_PIXELS:
+        raise ValidationError(f"Изображение слишком большое: {width}×{height}.")
+
+
+def thumbnails_source(user):
+    return (user.avatar_thumbnails or {}).get("source", "")
+
+
+def is_stale(user):
+    """Миниатюры сделаны не из текущего аватара (или остались от удалённого)."""
+    return (user.avatar.name or "") != thumbnails_source(user)
+
+
+def pending_users():
+    """Пользователи, чьи миниатюры нужно сделать заново."""
+    return User.objects.alias(
+        source=Coalesce(KT("avatar_thumbnails__source"), Value(""), output_field=TextField()),
+        avatar_name=Coalesce("avatar", Value(""), output_field=TextField()),
+    ).exclude(source=F("avatar_name"))
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _encode(image, file_format):
+    if file_format == "jpeg" and image.mode != "RGB":
+        # В JPEG нет прозрачности: фон белый
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, format=file_format.upper(), quality=settings.AVATAR_THUMBNAIL_QUALITY)
+    return buffer.getvalue()
+
+
+def make_thumbnails(name):
+    """Квадратные миниатюры оригинала name во всех размерах и форматах; возвращает {размер: {формат: путь}}."""
+    sizes = sorted(settings.AVATAR_THUMBNAIL_SIZES, reverse=True)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    result = {}
+    with default_storage.open(name) as file, Image.open(file) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе (DCT), без полного разрешения камеры
+        image.draft("RGB", (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+        for size in sizes:
+            # Каждый следующий размер уменьшается из предыдущего, а не из оригинала
+            image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            result[str(size)] = {
+                file_format: default_storage.save(
+                    f"{THUMBNAILS_DIR}/{stem}_{size}.{file_format}", ContentFile(_encode(image, file_format))
+                )
+                for file_format in settings.AVATAR_THUMBNAIL_FORMATS
+            }
+    return result
+
+
+def thumbnail_paths(thumbnails):
+    return [path for formats in (thumbnails or {}).get("sizes", {}).values() for path in formats.values()]
+
+
+def delete_thumbnails(thumbnails):
+    for path in thumbnail_paths(thumbnails):
+        default_storage.delete(path)
+
+
+def release(names):
+    """Освобождает файлы после коммита: хранилище уменьшает счётчик ссылок (users.storage)."""
+    names = [name for name in names if name]
+
+    def delete():
+        for name in names:
+            default_storage.delete(name)
+
+    if names:
+        transaction.on_commit(delete, robust=True)
+
+
+def process_avatar(user_id):
+    """Делает миниатюры текущего аватара пользователя и удаляет миниатюры прежнего."""
+    user = User.objects.filter(pk=user_id).only("avatar", "avatar_thumbnails").first()
+    if user is None or not is_stale(user):
+        return
+    name = user.avatar.name or ""
+    thumbnails = None
+    if name:
+        try:
+            thumbnails = {"source": name, "sizes": make_thumbnails(name)}
+        except Exception:
+            # Битый файл не обрабатывается повторно: клиенты получат оригинал
+            logger.exception("Не удалось сделать миниатюры аватара %s", name)
+            thumbnails = {"source": name, "sizes": {}}
+
+    with transaction.atomic():
+        user = User.objects.select_for_update().filter(pk=user_id).first()
+        # Аватар мог смениться или уже быть обработан другой задачей, пока шла обработка
+        applied = user is not None and (user.avatar.name or "") == name and is_stale(user)
+        if applied:
+            previous, user.avatar_thumbnails = user.avatar_thumbnails, thumbnails
+            # post_save сбрасывает кэш встроенных авторов (board.signals)
+            user.save(update_fields=["avatar_thumbnails"])
+    # Лишние файлы: миниатюры прежнего аватара или только что сделанные, если они уже не нужны
+    delete_thumbnails(previous if applied else thumbnails)
+
+
+def _run(user_id):
+    try:
+        process_avatar(user_id)
+    except Exception:
+        logger.exception("Обработка аватара пользователя %s не удалась", user_id)
+    finally:
+        # Соединения потока пула не должны висеть до следующей задачи
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.AVATAR_WORKERS, thread_name_prefix="avatars")
+    return _executor
+
+
+def schedule(user_id):
+    """Ставит обработку аватара в пул после коммита текущей транзакции."""
+
+    def submit():
+        if settings.AVATAR_WORKERS:
+            get_executor().submit(_run, user_id)
+        else:
+            process_avatar(user_id)
+
+    transaction.on_commit(submit, robust=True)
@@ -0,0 +1,24 @@
+from django.core.files.storage import storages
+from django.core.management import BaseCommand, CommandError
+
+from users.storage import ContentAddressedStorage, collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Удаление медиафайлов без ссылок и брошенных файлов хранилища (users.storage)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace", type=int, help="Не трогать файлы моложе стольких секунд (по умолчанию MEDIA_GC_GRACE)"
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать, ничего не удалять")
+
+    def handle(self, *args, **options):
+        storage = storages["default"]
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError("Хранилище по умолчанию не users.storage.ContentAddressedStorage")
+        if options["grace"] is not None and options["grace"] < 0:
+            raise CommandError("--grace не может быть отрицательным")
+        removed = collect_garbage(storage, options["grace"], options["dry_run"])
+        verb = "К удалению" if options["dry_run"] else "Удалено"
+        self.stdout.write(f"{verb} файлов: {removed}")
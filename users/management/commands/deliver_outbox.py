@@ -0,0 +1,38 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from users.outbox import OutboxDelivery
+
+
+class Command(BaseCommand):
+    help = "Отправка писем из очереди (users.OutboxEmail) пачками через одно SMTP-соединение"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Писем за одну выборку (по умолчанию OUTBOX_BATCH_SIZE)")
+        parser.add_argument(
+            "--max-attempts", type=int, help="Попыток до пометки dead (по умолчанию OUTBOX_MAX_ATTEMPTS)"
+        )
+        parser.add_argument("--interval", type=float, default=5, help="Пауза между опросами пустой очереди, секунды")
+        parser.add_argument("--once", action="store_true", help="Разобрать очередь и завершиться")
+
+    def handle(self, *args, **options):
+        for option in ("batch_size", "max_attempts"):
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} должен быть положительным")
+        delivery = OutboxDelivery(options["batch_size"], options["max_attempts"])
+        try:
+            while True:
+                sent, failed, dead = delivery.deliver_batch()
+                if sent or failed or dead:
+                    self.stdout.write(f"Отправлено {sent}, отложено {failed}, не доставлено {dead}")
+                    continue
+                if options["once"]:
+                    break
+                # Очередь пуста: соединение не держим, пока ждём новых писем
+                delivery.close()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            delivery.close()
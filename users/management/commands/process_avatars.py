@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from users.avatars import pending_users, process_avatar
+
+
+class Command(BaseCommand):
+    help = "Миниатюры аватаров, которые не сделала фоновая обработка (рестарт процесса, правка в админке)"
+
+    def handle(self, *args, **options):
+        processed = 0
+        for user_id in pending_users().values_list("pk", flat=True).iterator():
+            process_avatar(user_id)
+            processed += 1
+        self.stdout.write(f"Обработано аватаров: {processed}")
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.2 on 2026-10-18 18:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEmail",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("subject", models.CharField(max_length=255, verbose_name="Тема")),
+                ("body", models.TextField(verbose_name="Текст")),
+                ("from_email", models.CharField(blank=True, max_length=254, null=True, verbose_name="Отправитель")),
+                ("recipients", models.JSONField(verbose_name="Получатели")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "Ожидает отправки"), ("sent", "Отправлено"), ("dead", "Не доставлено")],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="Попыток отправки")),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now, verbose_name="Следующая попытка"),
+                ),
+                ("last_error", models.TextField(blank=True, verbose_name="Последняя ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")),
+                ("sent_at", models.DateTimeField(blank=True, null=True, verbose_name="Дата отправки")),
+            ],
+            options={
+                "verbose_name": "Исходящее письмо",
+                "verbose_name_plural": "Исходящие письма",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "pending")),
+                        fields=["next_attempt_at", "id"],
+                        name="users_outbox_pending_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_thumbnails",
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name="Миниатюры аватара"),
+        ),
+    ]
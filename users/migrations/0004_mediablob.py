@@ -0,0 +1,35 @@
+# Generated by Django 5.0.2 on 2026-10-18 19:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_avatar_thumbnails"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                ("name", models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name="Путь")),
+                ("size", models.PositiveBigIntegerField(verbose_name="Размер")),
+                ("refcount", models.PositiveIntegerField(default=0, verbose_name="Число ссылок")),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=django.utils.timezone.now, verbose_name="Последнее изменение ссылок"),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл хранилища",
+                "verbose_name_plural": "Файлы хранилища",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("refcount", 0)), fields=["updated_at"], name="users_mediablob_unused_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_mediablob"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="outboxemail",
+            name="users_outbox_pending_idx",
+        ),
+        migrations.AlterField(
+            model_name="outboxemail",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Ожидает отправки"),
+                    ("sending", "Отправляется"),
+                    ("sent", "Отправлено"),
+                    ("dead", "Не доставлено"),
+                ],
+                default="pending",
+                max_length=10,
+                verbose_name="Статус",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outboxemail",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "sending"])),
+                fields=["next_attempt_at", "id"],
+                name="users_outbox_queue_idx",
+            ),
+        ),
+    ]
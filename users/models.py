@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -35,6 +36,8 @@ class User(AbstractUser):
         verbose_name="Аватар",
         help_text="Загрузите аватар",
     )
+    # Заполняет фоновая обработка (users.avatars): {"source": оригинал, "sizes": {размер: {формат: путь}}}
+    avatar_thumbnails = models.JSONField(blank=True, null=True, editable=False, verbose_name="Миниатюры аватара")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -42,3 +45,85 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Аватар на момент загрузки: при замене ссылка на прежний файл освобождается (users.signals)
+        instance._loaded_avatar = instance.__dict__.get("avatar")
+        return instance
+
+
+class OutboxEmail(models.Model):
+    """
+    Исходящее письмо, ожидающее отправки.
+
+    Письма записываются в транзакции запроса (users.outbox.enqueue_email) и отправляются
+    отдельным процессом: python manage.py deliver_outbox.
+    """
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    body = models.TextField(verbose_name="Текст")
+    from_email = models.CharField(max_length=254, blank=True, null=True, verbose_name="Отправитель")
+    recipients = models.JSONField(verbose_name="Получатели")
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            (PENDING, "Ожидает отправки"),
+            (SENDING, "Отправляется"),
+            (SENT, "Отправлено"),
+            (DEAD, "Не доставлено"),
+        ],
+        default=PENDING,
+        verbose_name="Статус",
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток отправки")
+    # Для отправляемого письма — срок аренды воркером: после него письмо снова попадает в выборку
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    sent_at = models.DateTimeField(blank=True, null=True, verbose_name="Дата отправки")
+
+    class Meta:
+        verbose_name = "Исходящее письмо"
+        verbose_name_plural = "Исходящие письма"
+        indexes = [
+            # Выборка очереди: ожидающие и отправляемые (с истёкшей арендой) письма по времени следующей попытки
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                condition=models.Q(status__in=["pending", "sending"]),
+                name="users_outbox_queue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
+
+
+class MediaBlob(models.Model):
+    """
+    Файл контентно-адресуемого хранилища (users.storage.ContentAddressedStorage) и число ссылок на него.
+
+    Одинаковые загрузки хранятся одним файлом; файл без ссылок удаляет команда collect_media.
+    """
+
+    name = models.CharField(max_length=255, primary_key=True, verbose_name="Путь")
+    size = models.PositiveBigIntegerField(verbose_name="Размер")
+    refcount = models.PositiveIntegerField(default=0, verbose_name="Число ссылок")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="Последнее изменение ссылок")
+
+    class Meta:
+        verbose_name = "Файл хранилища"
+        verbose_name_plural = "Файлы хранилища"
+        indexes = [
+            # Кандидаты на удаление: файлы без ссылок, по давности
+            models.Index(fields=["updated_at"], condition=models.Q(refcount=0), name="users_mediablob_unused_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,107 @@
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import OutboxEmail
+
+# Ошибки, после которых SMTP-соединение считается сломанным и открывается заново
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+def enqueue_email(subject, body, recipients, from_email=None):
+    """
+    Ставит письмо в очередь отправки.
+
+    Запись идёт в текущей транзакции: если запрос откатится, письмо не уйдёт.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject, body=body, recipients=list(recipients), from_email=from_email or settings.DEFAULT_FROM_EMAIL
+    )
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой: OUTBOX_RETRY_DELAY, x2, x4, ..."""
+    return timedelta(seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+class OutboxDelivery:
+    """
+    Отправка очереди писем пачками через одно SMTP-соединение.
+
+    Пачка забирается короткой транзакцией (SELECT ... FOR UPDATE SKIP LOCKED): письма помечаются
+    как отправляемые с арендой на OUTBOX_LEASE секунд, и транзакция сразу коммитится. Отправка идёт
+    вне транзакции, результат каждого письма записывается отдельным UPDATE. Письма упавшего воркера
+    после окончания аренды забирает следующий. Неудачные письма откладываются с растущей задержкой,
+    а после OUTBOX_MAX_ATTEMPTS попыток помечаются как недоставленные (dead).
+    """
+
+    def __init__(self, batch_size=None, max_attempts=None):
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self.connection = None
+
+    def open(self):
+        if self.connection is None:
+            self.connection = get_connection()
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def claim(self):
+        """Забирает пачку писем в аренду; попытка засчитывается сразу."""
+        now = timezone.now()
+        lease = now + timedelta(seconds=settings.OUTBOX_LEASE)
+        with transaction.atomic():
+            batch = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(status__in=(OutboxEmail.PENDING, OutboxEmail.SENDING), next_attempt_at__lte=now)
+                .order_by("next_attempt_at", "id")[: self.batch_size]
+            )
+            for email in batch:
+                email.status = OutboxEmail.SENDING
+                email.next_attempt_at = lease
+                email.attempts += 1
+            OutboxEmail.objects.bulk_update(batch, ["status", "next_attempt_at", "attempts"])
+        return batch
+
+    def record(self, email, **fields):
+        # Аренда служит меткой владельца: если она истекла и письмо забрал другой воркер, результат не пишется
+        OutboxEmail.objects.filter(
+            pk=email.pk, status=OutboxEmail.SENDING, next_attempt_at=email.next_attempt_at
+        ).update(**fields)
+
+    def deliver_batch(self):
+        """Отправляет одну пачку; возвращает (отправлено, отложено, недоставлено)."""
+        sent = failed = dead = 0
+        for email in self.claim():
+            try:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.recipients, connection=self.open()
+                )
+                message.send()
+            except Exception as exc:
+                if isinstance(exc, CONNECTION_ERRORS):
+                    self.close()
+                error = f"{type(exc).__name__}: {exc}"
+                if email.attempts >= self.max_attempts:
+                    self.record(email, status=OutboxEmail.DEAD, last_error=error)
+                    dead += 1
+                else:
+                    next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                    self.record(email, status=OutboxEmail.PENDING, next_attempt_at=next_attempt_at, last_error=error)
+                    failed += 1
+            else:
+                self.record(email, status=OutboxEmail.SENT, sent_at=timezone.now(), last_error="")
+                sent += 1
+        return sent, failed, dead
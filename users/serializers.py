@@ -1,9 +1,45 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
+from users.avatars import validate_avatar
 from users.models import User
 
 
+class AvatarThumbnailsField(serializers.ReadOnlyField):
+    """Ссылки на миниатюры аватара: {"40": {"webp": url, "jpeg": url}, ...}; None, пока их нет."""
+
+    def to_representation(self, value):
+        sizes = (value or {}).get("sizes")
+        if not sizes:
+            return None
+        return {
+            size: {file_format: self.get_url(path) for file_format, path in formats.items()}
+            for size, formats in sizes.items()
+        }
+
+    def get_url(self, path):
+        # Как у FileField: абсолютная ссылка, если сериализатору передан запрос
+        url = default_storage.url(path)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
 class UserSerializer(ModelSerializer):
+    # Проверяется только заголовок изображения, миниатюры делаются в фоне (users.avatars)
+    avatar = serializers.FileField(required=False, allow_null=True, validators=[validate_avatar])
+    avatar_thumbnails = AvatarThumbnailsField()
+
     class Meta:
         model = User
         fields = "__all__"
+
+
+class PublicUserSerializer(ModelSerializer):
+    """Открытые данные пользователя для встраивания в объявления и отзывы (?expand=author)."""
+
+    avatar_thumbnails = AvatarThumbnailsField()
+
+    class Meta:
+        model = User
+        fields = ("id", "username", "first_name", "last_name", "avatar_thumbnails")
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users import avatars
+from users.authentication import invalidate_user
+from users.models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, using=None, **kwargs):
+    # Смена пароля (в том числе в ResetPasswordConfirmView), деактивация и любые другие изменения.
+    # Версия меняется после коммита: иначе параллельный запрос закэширует прежнюю строку под новой версией
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id), using=using)
+
+
+@receiver(post_save, sender=User)
+def schedule_avatar_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Миниатюры делаются после коммита в фоне; сохранение без аватара в update_fields (вход) их не касается
+    if raw or (update_fields is not None and "avatar" not in update_fields):
+        return
+    current = instance.avatar.name or None
+    previous = getattr(instance, "_loaded_avatar", None)
+    if previous and previous != current:
+        avatars.release([previous])
+    instance._loaded_avatar = current
+    if avatars.is_stale(instance):
+        avatars.schedule(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def release_avatar(sender, instance, **kwargs):
+    avatars.release([instance.avatar.name, *avatars.thumbnail_paths(instance.avatar_thumbnails)])
@@ -0,0 +1,136 @@
+"""
+Контентно-адресуемое хранилище медиафайлов.
+
+Файл сохраняется по SHA-256 содержимого (blobs/ab/cd/<хэш>.<расширение>), поэтому одинаковые
+загрузки лежат на диске один раз. Сохранение увеличивает счётчик ссылок users.MediaBlob, delete()
+уменьшает; файлы без ссылок через MEDIA_GC_GRACE секунд удаляет python manage.py collect_media.
+
+Файлы, сохранённые до перехода на это хранилище (по имени загрузки), читаются и удаляются как раньше.
+"""
+
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import MediaBlob
+
+BLOBS_DIR = "blobs"
+TEMP_DIR = "tmp"
+
+
+def blob_digest(name):
+    """Хэш содержимого из имени файла хранилища или None, если файл сохранён по имени загрузки."""
+    parts = name.split("/")
+    if len(parts) != 4 or parts[0] != BLOBS_DIR:
+        return None
+    digest = os.path.splitext(parts[3])[0]
+    return digest if len(digest) == 64 and digest.startswith(parts[1] + parts[2]) else None
+
+
+def _increment(name, size):
+    """Счётчик ссылок +1 одним upsert; строка блокируется до конца транзакции."""
+    table = MediaBlob._meta.db_table
+    using = router.db_for_write(MediaBlob) or DEFAULT_DB_ALIAS
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (name, size, refcount, updated_at) VALUES (%s, %s, 1, %s) "
+            f"ON CONFLICT (name) DO UPDATE SET refcount = {table}.refcount + 1, updated_at = EXCLUDED.updated_at",
+            [name, size, timezone.now()],
+        )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя определяет содержимое, поэтому подбирать свободное не нужно
+        return name
+
+    def _save(self, name, content):
+        # Содержимое пишется во временный файл по частям и хэшируется на лету
+        temp_dir = self.path(TEMP_DIR)
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+                temp.write(chunk)
+        digest = digest.hexdigest()
+        ext = os.path.splitext(name)[1].lower()
+        blob = f"{BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+        path = self.path(blob)
+
+        try:
+            # Строка заблокирована, пока файл не окажется на месте: collect_media не удалит его между делом.
+            # Файл заменяется, даже если уже есть, — свежее время изменения защищает его от удаления как брошенного
+            with transaction.atomic(using=router.db_for_write(MediaBlob)):
+                _increment(blob, size)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp.name, self.file_permissions_mode)
+                os.replace(temp.name, path)
+        finally:
+            if os.path.exists(temp.name):
+                os.remove(temp.name)
+        return blob
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        if blob_digest(name) is None:
+            return super().delete(name)
+        # Файл удаляется не сразу: на то же содержимое могут ссылаться другие записи
+        MediaBlob.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F("refcount") - 1, updated_at=timezone.now()
+        )
+
+    def purge(self, name):
+        """Удаляет файл с диска независимо от ссылок (для collect_garbage)."""
+        super().delete(name)
+
+
+def collect_garbage(storage, grace=None, dry_run=False):
+    """
+    Удаляет файлы без ссылок, не менявшиеся дольше grace секунд (по умолчанию MEDIA_GC_GRACE),
+    и брошенные файлы без строки MediaBlob (откаченные транзакции, сбои). Возвращает число удалённых.
+    """
+    grace = settings.MEDIA_GC_GRACE if grace is None else grace
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    removed = 0
+
+    unused = MediaBlob.objects.filter(refcount=0, updated_at__lt=cutoff)
+    if dry_run:
+        removed += unused.count()
+    # SKIP LOCKED: строки, которые прямо сейчас получают ссылку, пропускаются до следующего запуска
+    while not dry_run:
+        with transaction.atomic():
+            names = list(unused.select_for_update(skip_locked=True).values_list("name", flat=True)[:500])
+            if not names:
+                break
+            for name in names:
+                storage.purge(name)
+            MediaBlob.objects.filter(name__in=names).delete()
+            removed += len(names)
+
+    cutoff_ts = cutoff.timestamp()
+    for directory in (BLOBS_DIR, TEMP_DIR):
+        root = storage.path(directory)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if os.path.getmtime(path) >= cutoff_ts:
+                    continue
+                name = os.path.relpath(path, storage.location).replace(os.sep, "/")
+                if directory == BLOBS_DIR and MediaBlob.objects.filter(name=name).exists():
+                    continue
+                if not dry_run:
+                    os.remove(path)
+                removed += 1
+    return removed
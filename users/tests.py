@@ -1,16 +1,52 @@
 import pytest
 from django.contrib.auth import get_user_model
+import hashlib
+import io
+import os
+import smtplib
+import threading
+import time
+from datetime import timedelta
+
 from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import resolve
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+import psycopg2
+
+from config.middleware import get_query_budget
+from users import avatars
+from users.authentication import USER_KEY, get_user_version
+from users.models import MediaBlob, OutboxEmail
+from users.outbox import OutboxDelivery, enqueue_email
+from users.serializers import UserSerializer
+from users.storage import collect_garbage
+from users.throttling import AuthRateThrottle, get_shed_stats
+from users.views import ResetPasswordView
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -36,6 +72,11 @@ class TestResetPasswordView:
         })
         assert response.status_code == status.HTTP_200_OK
         assert response.data['message'] == "Ссылка для сброса пароля была отправлена на вашу почту."
+        # Запрос только ставит письмо в очередь, отправляет его воркер
+        assert len(mail.outbox) == 0
+        assert OutboxEmail.objects.get().recipients == ['test@example.com']
+
+        call_command('deliver_outbox', '--once', stdout=io.StringIO())
         assert len(mail.outbox) == 1
         assert mail.outbox[0].to == ['test@example.com']
         assert mail.outbox[0].subject == "Сброс пароля"
@@ -47,7 +88,7 @@ class TestResetPasswordView:
         })
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert response.data['error'] == "User not found"
-        assert len(mail.outbox) == 0
+        assert not OutboxEmail.objects.exists()
 
 
 @pytest.mark.django_db
@@ -100,3 +141,423 @@ class TestResetPasswordConfirmView:
         # Проверяем, что пароль не изменился
         user.refresh_from_db()
         assert user.check_password('testpass123')
+
+
+@pytest.fixture
+def assert_query_budget():
+    """Выполняет запрос и проверяет, что число SQL-запросов не превышает query_budget представления."""
+
+    def request(client, method, path, data=None):
+        budget = get_query_budget(resolve(path).func, method)
+        assert budget is not None, f'No query budget declared for {method} {path}'
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method.lower())(path, data)
+        assert len(queries) <= budget, '\n'.join(query['sql'] for query in queries.captured_queries)
+        return response
+
+    return request
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    def test_register(self, api_client, assert_query_budget):
+        response = assert_query_budget(api_client, 'POST', '/users/register/', {
+            'email': 'new@example.com',
+            'username': 'new',
+            'password': 'newpass123'
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+        assert User.objects.get(email='new@example.com').check_password('newpass123')
+
+    def test_login_and_refresh(self, api_client, user, assert_query_budget):
+        response = assert_query_budget(api_client, 'POST', '/users/login/', {
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        })
+        assert response.status_code == status.HTTP_200_OK
+        response = assert_query_budget(api_client, 'POST', '/users/token/refresh/', {
+            'refresh': response.data['refresh']
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert 'access' in response.data
+
+    def test_reset_password(self, api_client, user, assert_query_budget):
+        response = assert_query_budget(api_client, 'POST', '/users/reset_password/', {'email': 'test@example.com'})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_reset_password_confirm(self, api_client, user, assert_query_budget):
+        response = assert_query_budget(api_client, 'POST', '/users/reset_password_confirm/', {
+            'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+            'new_password': 'newpass123'
+        })
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.fixture
+def user_token(api_client, user):
+    response = api_client.post('/users/login/', {
+        'email': 'test@example.com',
+        'password': 'testpass123'
+    })
+    return response.data['access']
+
+
+@pytest.fixture
+def authorized_client(user_token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {user_token}')
+    return client
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    def test_user_is_not_queried_on_repeat_requests(self, authorized_client):
+        authorized_client.get('/board/reviews/')
+        with CaptureQueriesContext(connection) as queries:
+            response = authorized_client.get('/board/reviews/')
+        assert response.status_code == status.HTTP_200_OK
+        assert not [query for query in queries.captured_queries if 'users_user' in query['sql']]
+
+    def test_deactivation_is_seen_after_commit(self, authorized_client, user, django_capture_on_commit_callbacks):
+        authorized_client.get('/board/reviews/')
+        user.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+            # До коммита версия прежняя: параллельный запрос не закэширует старую строку под новой
+            assert authorized_client.get('/board/reviews/').status_code == status.HTTP_200_OK
+        assert authorized_client.get('/board/reviews/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_password_reset_invalidates_cached_user(
+        self, api_client, authorized_client, user, django_capture_on_commit_callbacks
+    ):
+        authorized_client.get('/board/reviews/')
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post('/users/reset_password_confirm/', {
+                'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+                'token': default_token_generator.make_token(user),
+                'new_password': 'newpass123'
+            })
+        with CaptureQueriesContext(connection) as queries:
+            authorized_client.get('/board/reviews/')
+        assert [query for query in queries.captured_queries if 'users_user' in query['sql']]
+
+    def test_password_hash_is_not_cached(self, authorized_client, user):
+        authorized_client.get('/board/reviews/')
+        version = get_user_version(user.pk)
+        values = cache.get(USER_KEY.format(user_id=user.pk, version=version))
+        assert values is not None
+        assert user.password not in values
+        # Пароль отложен и при необходимости читается из БД
+        request_user = authorized_client.get('/board/reviews/').wsgi_request.user
+        assert 'password' in request_user.get_deferred_fields()
+        assert request_user.check_password('testpass123')
+
+    def test_cached_user_is_a_copy(self, authorized_client):
+        first = authorized_client.get('/board/reviews/').wsgi_request.user
+        first.first_name = 'Changed'
+        second = authorized_client.get('/board/reviews/').wsgi_request.user
+        assert second.first_name == 'Test'
+
+
+@pytest.mark.django_db
+class TestOutbox:
+    def test_batch_is_sent_over_one_connection(self, monkeypatch):
+        for i in range(3):
+            enqueue_email(f'Письмо {i}', 'Текст', [f'user{i}@example.com'])
+        connections = []
+
+        def get_connection():
+            connections.append(mail.get_connection())
+            return connections[-1]
+
+        monkeypatch.setattr('users.outbox.get_connection', get_connection)
+
+        delivery = OutboxDelivery(batch_size=2)
+        assert delivery.deliver_batch() == (2, 0, 0)
+        assert delivery.deliver_batch() == (1, 0, 0)
+        assert delivery.deliver_batch() == (0, 0, 0)
+        assert len(connections) == 1
+        assert [message.subject for message in mail.outbox] == ['Письмо 0', 'Письмо 1', 'Письмо 2']
+        assert not OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists()
+
+    def test_retry_with_backoff_and_dead_letter(self, monkeypatch, settings):
+        settings.OUTBOX_RETRY_DELAY = 10
+        email = enqueue_email('Сброс пароля', 'Текст', ['test@example.com'])
+
+        def fail(self):
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+        monkeypatch.setattr('users.outbox.EmailMessage.send', fail)
+        delivery = OutboxDelivery(max_attempts=2)
+        assert delivery.deliver_batch() == (0, 1, 0)
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.PENDING
+        assert email.next_attempt_at > timezone.now()
+        assert 'SMTPServerDisconnected' in email.last_error
+
+        # Отложенное письмо не выбирается до наступления следующей попытки
+        assert delivery.deliver_batch() == (0, 0, 0)
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        assert delivery.deliver_batch() == (0, 0, 1)
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.DEAD
+        assert email.attempts == 2
+
+    def test_expired_lease_is_reclaimed(self):
+        email = enqueue_email('Сброс пароля', 'Текст', ['test@example.com'])
+        # Воркер забрал письмо и упал до отправки
+        assert [claimed.pk for claimed in OutboxDelivery().claim()] == [email.pk]
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.SENDING
+        assert OutboxDelivery().deliver_batch() == (0, 0, 0)
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        assert OutboxDelivery().deliver_batch() == (1, 0, 0)
+        email.refresh_from_db()
+        assert email.status == OutboxEmail.SENT
+        assert email.attempts == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_send_runs_outside_transaction(self, monkeypatch):
+        enqueue_email('Сброс пароля', 'Текст', ['test@example.com'])
+        seen = []
+
+        def send(message):
+            seen.append(connection.in_atomic_block)
+            # Другой воркер видит письмо в аренде, и строка не заблокирована
+            with psycopg2.connect(**connection.get_connection_params()) as other, other.cursor() as cursor:
+                cursor.execute('SELECT status FROM users_outboxemail FOR UPDATE NOWAIT')
+                seen.append(cursor.fetchone()[0])
+            other.close()
+            return 1
+
+        monkeypatch.setattr('users.outbox.EmailMessage.send', send)
+        assert OutboxDelivery().deliver_batch() == (1, 0, 0)
+        assert seen == [False, OutboxEmail.SENDING]
+
+
+@pytest.mark.django_db
+class TestThrottling:
+    @pytest.fixture
+    def rates(self, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                'login.ip': '3/min', 'login.email': '2/min', 'reset_password.endpoint': '1/min'
+            },
+        }
+
+    def test_login_limited_per_email_before_hashing(self, api_client, user, rates, django_assert_num_queries):
+        for _ in range(2):
+            response = api_client.post('/users/login/', {'email': 'Test@example.com', 'password': 'wrong'})
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        with django_assert_num_queries(0):
+            response = api_client.post('/users/login/', {'email': 'test@example.com', 'password': 'testpass123'})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 'Retry-After' in response
+
+        # Другой email с того же IP проходит, пока не исчерпан лимит на IP
+        assert api_client.post('/users/login/', {'email': 'other@example.com', 'password': 'x'}).status_code == 401
+        assert api_client.post('/users/login/', {'email': 'new@example.com', 'password': 'x'}).status_code == 429
+        assert get_shed_stats()['login'] == {'ip': 1, 'email': 1, 'endpoint': 0}
+
+    def test_endpoint_limit(self, api_client, user, rates):
+        assert api_client.post('/users/reset_password/', {'email': 'test@example.com'}).status_code == 200
+        response = api_client.post('/users/reset_password/', {'email': 'test@example.com'})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert OutboxEmail.objects.count() == 1
+
+    def test_concurrent_burst_does_not_exceed_limit(self, rates, monkeypatch):
+        factory = APIRequestFactory()
+        view = ResetPasswordView()
+        barrier = threading.Barrier(10, timeout=5)
+        allowed = []
+        get_many = LocMemCache.get_many
+
+        def get_many_then_wait(self, *args, **kwargs):
+            # Все запросы прочитали счётчики, прежде чем любой из них их увеличит
+            values = get_many(self, *args, **kwargs)
+            barrier.wait()
+            return values
+
+        def request():
+            throttle = AuthRateThrottle()
+            allowed.append(throttle.allow_request(Request(factory.post('/users/reset_password/')), view))
+
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        with monkeypatch.context() as patch:
+            patch.setattr(LocMemCache, 'get_many', get_many_then_wait)
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert allowed.count(True) == 1
+        assert get_shed_stats()['reset_password']['endpoint'] == 9
+
+    def test_stats_admin_only(self, api_client, authorized_client):
+        assert api_client.get('/users/throttle_stats/').status_code == status.HTTP_401_UNAUTHORIZED
+        assert authorized_client.get('/users/throttle_stats/').status_code == status.HTTP_403_FORBIDDEN
+
+
+def image_file(name='avatar.jpg', size=(1200, 800), mode='RGB', file_format='JPEG', color='red'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format=file_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{file_format.lower()}')
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.AVATAR_WORKERS = 0
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestAvatars:
+    def register(self, api_client, avatar):
+        return api_client.post('/users/register/', {
+            'email': 'new@example.com',
+            'username': 'new',
+            'password': 'newpass123',
+            'avatar': avatar,
+        })
+
+    def test_thumbnails_are_made_after_commit(self, api_client, media, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            response = self.register(api_client, image_file())
+            assert response.status_code == status.HTTP_201_CREATED
+            # Ответ не ждёт обработки изображения
+            assert response.data['avatar_thumbnails'] is None
+        assert [callback for callback in callbacks if callback.__qualname__ == 'schedule.<locals>.submit']
+
+        user = User.objects.get(email='new@example.com')
+        sizes = user.avatar_thumbnails['sizes']
+        assert user.avatar_thumbnails['source'] == user.avatar.name
+        assert set(sizes) == {'40', '80', '160'}
+        for size, formats in sizes.items():
+            assert set(formats) == {'webp', 'jpeg'}
+            with Image.open(media / formats['webp']) as thumbnail:
+                assert thumbnail.format == 'WEBP' and thumbnail.size == (int(size), int(size))
+
+        data = UserSerializer(user).data['avatar_thumbnails']
+        assert data['40']['webp'] == f"{settings.MEDIA_URL}{sizes['40']['webp']}"
+
+    def test_transparent_png(self, api_client, media, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.register(api_client, image_file('avatar.png', (100, 300), 'RGBA', 'PNG'))
+        assert response.status_code == status.HTTP_201_CREATED
+        path = User.objects.get(email='new@example.com').avatar_thumbnails['sizes']['80']['jpeg']
+        with Image.open(media / path) as thumbnail:
+            assert thumbnail.mode == 'RGB' and thumbnail.size == (80, 80)
+
+    @pytest.mark.parametrize('avatar_settings, avatar', [
+        ({}, SimpleUploadedFile('avatar.jpg', b'not an image', content_type='image/jpeg')),
+        ({}, image_file('avatar.bmp', file_format='BMP')),
+        ({'AVATAR_MAX_UPLOAD_SIZE': 100}, image_file()),
+        ({'AVATAR_MAX_PIXELS': 100 * 100}, image_file()),
+    ])
+    def test_invalid_upload(self, settings, api_client, media, avatar_settings, avatar):
+        for name, value in avatar_settings.items():
+            setattr(settings, name, value)
+        response = self.register(api_client, avatar)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'avatar' in response.data
+
+    def test_replaced_avatar_files_are_released(self, user, media, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            user.avatar = image_file('first.jpg')
+            user.save()
+        user.refresh_from_db()
+        old = [user.avatar.name, *avatars.thumbnail_paths(user.avatar_thumbnails)]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.avatar = image_file('second.jpg', color='blue')
+            user.save()
+        user.refresh_from_db()
+        assert user.avatar_thumbnails['source'] == user.avatar.name
+        assert (media / user.avatar_thumbnails['sizes']['40']['webp']).exists()
+        # Файлы прежнего аватара остаются до collect_media, но ссылок на них больше нет
+        assert dict(MediaBlob.objects.filter(name__in=old).values_list('name', 'refcount')) == dict.fromkeys(old, 0)
+
+        # Логин (update_fields=['last_login']) обработку не запускает
+        with django_capture_on_commit_callbacks() as callbacks:
+            user.save(update_fields=['last_login'])
+        assert not [callback for callback in callbacks if callback.__qualname__ == 'schedule.<locals>.submit']
+
+    def test_process_avatars_command(self, user, media):
+        user.avatar.save('avatar.jpg', image_file(), save=False)
+        User.objects.filter(pk=user.pk).update(avatar=user.avatar.name)  # Без сигналов, как при сбое воркера
+        other = User.objects.create_user(email='other@example.com', password='x', username='other')
+        User.objects.filter(pk=other.pk).update(avatar_thumbnails={'source': 'users/avatars/gone.jpg', 'sizes': {}})
+
+        out = io.StringIO()
+        call_command('process_avatars', stdout=out)
+        assert 'Обработано аватаров: 2' in out.getvalue()
+        assert set(User.objects.get(pk=user.pk).avatar_thumbnails['sizes']) == {'40', '80', '160'}
+        assert User.objects.get(pk=other.pk).avatar_thumbnails is None
+        assert not avatars.pending_users().exists()
+
+
+@pytest.mark.django_db
+class TestContentAddressedStorage:
+    def refcounts(self):
+        return dict(MediaBlob.objects.values_list('name', 'refcount'))
+
+    def test_duplicates_are_stored_once(self, media):
+        first = default_storage.save('users/avatars/a.JPG', ContentFile(b'same bytes'))
+        second = default_storage.save('other/b.jpg', ContentFile(b'same bytes'))
+        other = default_storage.save('users/avatars/a.jpg', ContentFile(b'other bytes'))
+
+        digest = hashlib.sha256(b'same bytes').hexdigest()
+        assert first == second == f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        assert other != first
+        assert (media / first).read_bytes() == b'same bytes'
+        assert self.refcounts() == {first: 2, other: 1}
+        assert list((media / 'tmp').iterdir()) == []
+
+    def test_garbage_collection(self, media):
+        kept = default_storage.save('a.txt', ContentFile(b'kept'))
+        released = default_storage.save('b.txt', ContentFile(b'released'))
+        default_storage.delete(released)
+        default_storage.delete(released)  # Лишнее удаление не уводит счётчик в минус
+        assert self.refcounts() == {kept: 1, released: 0}
+
+        # Брошенный файл без строки (откаченная транзакция) удаляется, только когда он старше grace
+        orphan = media / 'blobs' / 'ff' / 'ff' / ('ff' * 32 + '.txt')
+        orphan.parent.mkdir(parents=True)
+        orphan.write_bytes(b'orphan')
+        assert collect_garbage(default_storage, grace=60) == 0
+
+        old = time.time() - 120
+        for path in (media / kept, media / released, orphan):
+            os.utime(path, (old, old))
+        MediaBlob.objects.update(updated_at=timezone.now() - timedelta(seconds=120))
+
+        out = io.StringIO()
+        call_command('collect_media', '--grace=60', '--dry-run', stdout=out)
+        assert 'К удалению файлов: 2' in out.getvalue()
+        call_command('collect_media', '--grace=60', stdout=out)
+        assert self.refcounts() == {kept: 1}
+        assert (media / kept).exists()
+        assert not (media / released).exists() and not orphan.exists()
+
+        # Загрузка того же содержимого после удаления снова создаёт файл
+        assert default_storage.save('c.txt', ContentFile(b'released')) == released
+        assert (media / released).read_bytes() == b'released'
+
+    def test_legacy_files_are_deleted_directly(self, media):
+        (media / 'users').mkdir()
+        (media / 'users' / 'old.jpg').write_bytes(b'legacy')
+        default_storage.delete('users/old.jpg')
+        assert not (media / 'users' / 'old.jpg').exists()
+
+    def test_deleted_user_releases_avatar(self, user, media, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            user.avatar = image_file()
+            user.save()
+        user.refresh_from_db()
+        with django_capture_on_commit_callbacks(execute=True):
+            user.delete()
+        assert set(self.refcounts().values()) == {0}
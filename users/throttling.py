@@ -0,0 +1,103 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+COUNTER_KEY = "throttle:{scope}:{kind}:{ident}:{window}"
+SHED_KEY = "throttle:shed:{scope}:{kind}"
+
+THROTTLE_KINDS = ("ip", "email", "endpoint")
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60); период задаётся первой буквой: s, m, h, d."""
+    num, period = rate.split("/")
+    return int(num), {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+
+
+def _incr(key, timeout):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=timeout):
+            return 1
+        return cache.incr(key)
+
+
+def get_shed_stats():
+    """Сколько запросов отклонено по каждой области (scope) и виду ограничения."""
+    scopes = sorted({rate.split(".")[0] for rate in api_settings.DEFAULT_THROTTLE_RATES if "." in rate})
+    keys = {(scope, kind): SHED_KEY.format(scope=scope, kind=kind) for scope in scopes for kind in THROTTLE_KINDS}
+    values = cache.get_many(keys.values())
+    return {scope: {kind: values.get(keys[(scope, kind)], 0) for kind in THROTTLE_KINDS} for scope in scopes}
+
+
+class AuthRateThrottle(BaseThrottle):
+    """
+    Ограничение частоты для открытых эндпоинтов аутентификации (вход, регистрация, сброс пароля).
+
+    Счётчики — скользящее окно из двух фиксированных окон в общем кэше: O(1) памяти и запросов
+    на ключ. Лимиты берутся из DEFAULT_THROTTLE_RATES по ключам "<throttle_scope>.ip",
+    "<throttle_scope>.email" и "<throttle_scope>.endpoint" — по IP клиента, по email из тела
+    запроса и общий на эндпоинт. Решение принимается по значению, которое вернул атомарный incr
+    текущего окна, поэтому одновременные запросы не проходят лимит вместе; отклонённый запрос
+    возвращает свои инкременты, чтобы не расходовать общий лимит.
+    Проверка выполняется до сериализатора, то есть до хэширования пароля и запросов к БД.
+    """
+
+    timer = time.time
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        self.wait_seconds = None
+        if not self.scope:
+            return True
+
+        now = self.timer()
+        limits = []
+        for kind, ident in self.get_idents(request).items():
+            rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{self.scope}.{kind}")
+            if ident is None or rate is None:
+                continue
+            num_requests, duration = parse_rate(rate)
+            window = int(now // duration)
+            current = COUNTER_KEY.format(scope=self.scope, kind=kind, ident=ident, window=window)
+            previous = COUNTER_KEY.format(scope=self.scope, kind=kind, ident=ident, window=window - 1)
+            limits.append((kind, num_requests, duration, current, previous))
+        if not limits:
+            return True
+
+        # Предыдущие окна закрыты и уже не меняются, их можно прочитать заранее
+        previous_counts = cache.get_many([limit[4] for limit in limits])
+        incremented = []
+        for kind, num_requests, duration, current, previous in limits:
+            # Счётчик окна нужен ещё одно окно после его окончания — как «предыдущий»
+            count = _incr(current, 2 * duration)
+            incremented.append(current)
+            # Доля предыдущего окна, которая ещё попадает в скользящее окно длиной duration
+            overlap = 1 - (now % duration) / duration
+            # count уже включает этот запрос
+            if previous_counts.get(previous, 0) * overlap + count - 1 >= num_requests:
+                for key in incremented:
+                    try:
+                        cache.decr(key)
+                    except ValueError:
+                        pass
+                _incr(SHED_KEY.format(scope=self.scope, kind=kind), None)
+                self.wait_seconds = duration - now % duration
+                return False
+        return True
+
+    def get_idents(self, request):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        return {
+            "ip": self.get_ident(request),
+            # Email в ключе кэша — хэшем: произвольная строка от клиента не должна попадать в ключ как есть
+            "email": hashlib.sha1(str(email).strip().lower().encode()).hexdigest() if email else None,
+            "endpoint": "all",
+        }
+
+    def wait(self):
+        return self.wait_seconds
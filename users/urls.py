@@ -1,10 +1,7 @@
 from django.urls import path
-from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.views import (TokenObtainPairView,
-                                            TokenRefreshView)
 
 from users.apps import UsersConfig
-from users.views import UserCreateAPIView
+from users.views import LoginView, RefreshTokenView, UserCreateAPIView
 
 from . import views
 
@@ -12,20 +9,13 @@ app_name = UsersConfig.name
 
 urlpatterns = [
     path("register/", UserCreateAPIView.as_view(), name="register"),
-    path(
-        "login/",
-        TokenObtainPairView.as_view(permission_classes=(AllowAny,)),
-        name="login",
-    ),
-    path(
-        "token/refresh/",
-        TokenRefreshView.as_view(permission_classes=(AllowAny,)),
-        name="token_refresh",
-    ),
+    path("login/", LoginView.as_view(), name="login"),
+    path("token/refresh/", RefreshTokenView.as_view(), name="token_refresh"),
     path("reset_password/", views.ResetPasswordView.as_view(), name="reset_password"),
     path(
         "reset_password_confirm/",
         views.ResetPasswordConfirmView.as_view(),
         name="reset_password_confirm",
     ),
+    path("throttle_stats/", views.ThrottleStatsView.as_view(), name="throttle_stats"),
 ]
@@ -1,32 +1,52 @@
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from rest_framework import status
 from rest_framework.generics import CreateAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from config import settings
-from config.settings import EMAIL_HOST_USER
 from users.models import User
+from users.outbox import enqueue_email
 from users.serializers import UserSerializer
+from users.throttling import AuthRateThrottle, get_shed_stats
+
+
+class LoginView(TokenObtainPairView):
+    permission_classes = (AllowAny,)
+    throttle_classes = (AuthRateThrottle,)
+    throttle_scope = "login"
+    query_budget = {"post": 1}  # пользователь по email
+
+
+class RefreshTokenView(TokenRefreshView):
+    permission_classes = (AllowAny,)
+    query_budget = {"post": 0}  # новый access-токен выпускается по подписи refresh-токена, без БД
 
 
 class UserCreateAPIView(CreateAPIView):
     serializer_class = UserSerializer
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
+    throttle_classes = (AuthRateThrottle,)
+    throttle_scope = "register"
+    query_budget = {"post": 7}  # Максимум запросов к БД (config.middleware.QueryCountMiddleware, тесты)
 
     def perform_create(self, serializer):
-        user = serializer.save(is_active=True)
-        user.set_password(user.password)
-        user.save()
+        # Пароль хэшируется до сохранения, чтобы пользователь записывался одним INSERT
+        serializer.save(is_active=True, password=make_password(serializer.validated_data["password"]))
 
 
 class ResetPasswordView(APIView):
+    throttle_classes = (AuthRateThrottle,)
+    throttle_scope = "reset_password"
+    query_budget = {"post": 2}
+
     def post(self, request):
         email = request.data.get("email")
         try:
@@ -39,13 +59,11 @@ class ResetPasswordView(APIView):
 
         reset_link = f"{self.request.scheme}://{self.request.get_host()}{settings.PASSWORD_RESET_URL.format(uid=uid, token=token)}"
 
-        # Отправка письма (необходимо настроить почтовый сервис)
-        send_mail(
+        # Письмо отправит воркер deliver_outbox, запрос не ждёт почтовый сервер
+        enqueue_email(
             subject="Сброс пароля",
-            message=f"Ссылка для сброса пароля: {reset_link}",
-            from_email=EMAIL_HOST_USER,
-            recipient_list=[user.email],
-            fail_silently=False,
+            body=f"Ссылка для сброса пароля: {reset_link}",
+            recipients=[user.email],
         )
 
         return Response(
@@ -55,6 +73,8 @@ class ResetPasswordView(APIView):
 
 
 class ResetPasswordConfirmView(APIView):
+    query_budget = {"post": 2}
+
     def post(self, request):
         uid = request.data.get("uid")
         token = request.data.get("token")
@@ -75,3 +95,13 @@ class ResetPasswordConfirmView(APIView):
                 {"error": "Ссылка для сброса пароля недействительна."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+class ThrottleStatsView(APIView):
+    """Счётчики запросов, отклонённых ограничением частоты (users.throttling)."""
+
+    permission_classes = (IsAdminUser,)
+    query_budget = {"get": 1}  # пользователь, если его нет в кэше аутентификации
+
+    def get(self, request):
+        return Response(get_shed_stats())